@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Copyright (c) 2018 Cisco Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs the ucsm_config.yml roles against the UCSM simulator and reports their cost.
+
+Each task of a role is rendered with the role vars and run in this process
+against a UCSMSimulator seeded from fixtures/ucsm_seed.json.  For every role
+the XML API round trips, request and response bytes and the wall time are
+reported, so a change to a module or module_utils can be measured without a
+UCS domain:
+
+    python bench/ucsm_bench.py --latency 0.02 --roles network server
+    python bench/ucsm_bench.py --runs 2 --json /tmp/bench.json
+
+With --runs 2 the second run shows the cost of an already configured domain.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from ucsm_sim import UCSMSimulator
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+UCSM_CONFIG_DIR = os.path.dirname(BENCH_DIR)
+ROLES = ['admin', 'equipment', 'network', 'storage', 'server']
+
+
+def use_repo_module_utils():
+    # modules import ansible.module_utils.remote_management.ucs and ansible.module_utils.cisco_ucs
+    import ansible.module_utils
+    ansible.module_utils.__path__.insert(0, os.path.join(UCSM_CONFIG_DIR, 'utils'))
+
+
+class TaskRunner():
+    """Renders role tasks and runs their modules in process, like the plan compiler and the UCS worker do."""
+
+    def __init__(self, host, port, extra_vars=None):
+        from ansible.module_utils.remote_management.ucs_compiler import UCSRoleRenderer
+        from ansible.module_utils.remote_management.ucs_worker import UCSModuleRunner
+
+        self.host = host
+        self.port = port
+        self.renderer = UCSRoleRenderer(extra_vars)
+        self.runner = UCSModuleRunner([os.path.join(UCSM_CONFIG_DIR, 'library')])
+
+    def connection_args(self, module_name):
+        if module_name.startswith('cisco_ucs'):
+            return dict(ucs_ip=self.host, ucs_port=self.port, ucs_secure=False)
+        return dict(hostname=self.host, port=self.port, use_ssl=False, use_proxy=False)
+
+    def run_module(self, module_name, args):
+        try:
+            return self.runner.run_module(module_name, dict(args, **self.connection_args(module_name)))
+        except Exception as e:
+            return dict(failed=True, msg='%s: %s' % (type(e).__name__, e))
+
+
+def run_role(runner, simulator, role):
+    simulator.reset_stats()
+    start = time.time()
+    runs = failed = 0
+    for task_name, module_name, args in runner.renderer.role_tasks(os.path.join(UCSM_CONFIG_DIR, 'roles', role)):
+        result = runner.run_module(module_name, args)
+        runs += 1
+        if result.get('failed'):
+            failed += 1
+            print('  %s: %s failed: %s' % (role, module_name, result.get('msg')), file=sys.stderr)
+    report = simulator.totals()
+    report.update(role=role, wall_time=round(time.time() - start, 3), module_runs=runs, failed=failed)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--roles', nargs='+', default=ROLES, choices=ROLES)
+    parser.add_argument('--fixture', default=os.path.join(BENCH_DIR, 'fixtures', 'ucsm_seed.json'))
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every XML API request')
+    parser.add_argument('--runs', type=int, default=1, help='times the roles are applied to the same simulator')
+    parser.add_argument('--json', help='write the reports to this file')
+    args = parser.parse_args()
+
+    for name in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+        os.environ.pop(name, None)
+    use_repo_module_utils()
+
+    simulator = UCSMSimulator(args.fixture, latency=args.latency)
+    host, port = simulator.start()
+    runner = TaskRunner(host, port, dict(ucs_ip=host, ucs_username='admin', ucs_password='password'))
+
+    reports = []
+    try:
+        for run in range(1, args.runs + 1):
+            for role in args.roles:
+                report = run_role(runner, simulator, role)
+                report['run'] = run
+                reports.append(report)
+    finally:
+        simulator.stop()
+
+    print('%-4s %-10s %8s %8s %12s %12s %10s' % ('run', 'role', 'modules', 'trips', 'req bytes', 'resp bytes', 'wall s'))
+    for report in reports:
+        print('%-4d %-10s %8d %8d %12d %12d %10.3f' % (
+            report['run'], report['role'], report['module_runs'], report['round_trips'],
+            report['request_bytes'], report['response_bytes'], report['wall_time']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
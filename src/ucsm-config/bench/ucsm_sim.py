@@ -0,0 +1,348 @@
+# Copyright (c) 2018 Cisco Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In-process fake UCS Manager XML API endpoint.
+
+Serves aaaLogin, aaaRefresh, aaaLogout, configResolveDn(s),
+configResolveClass(es), configResolveChildren and configConfMos over HTTP on
+/nuova, which is enough for ucsmsdk and the modules in library/.  Managed
+objects are kept in memory as dn -> (xml tag, xml attributes) and seeded from
+a JSON fixture of the form {"mos": {"<dn>": {"class": "<xml tag>", ...}}}.
+
+Port endpoints that are committed or removed set the role of their etherPIo,
+as UCSM derives it, so a second run of the equipment role finds its ports
+configured.
+
+Every request is counted per XML method with its request and response size,
+and can be delayed by a fixed latency to stand in for a remote UCSM.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class UCSMError(Exception):
+
+    def __init__(self, code, descr):
+        Exception.__init__(self, descr)
+        self.code = code
+        self.descr = descr
+
+
+class MOStore():
+    """dn indexed store of managed objects with their children."""
+
+    def __init__(self):
+        self.mos = {}
+        self.children = {}
+        self.lock = threading.RLock()
+
+    def load(self, path):
+        with open(path) as f:
+            fixture = json.load(f)
+        for dn, attrs in sorted(fixture.get('mos', {}).items()):
+            attrs = dict(attrs)
+            self.put(attrs.pop('class'), dn, attrs)
+
+    @staticmethod
+    def parent_dn(dn, rn=None):
+        if rn and dn.endswith(rn):
+            return dn[:len(dn) - len(rn)].rstrip('/')
+        return dn.rsplit('/', 1)[0] if '/' in dn else ''
+
+    def put(self, tag, dn, attrs):
+        with self.lock:
+            if dn in self.mos:
+                self.mos[dn][1].update(attrs)
+                return
+            rn = attrs.get('rn') or dn.rsplit('/', 1)[-1]
+            attrs = dict(attrs, dn=dn, rn=rn)
+            self.mos[dn] = (tag, attrs)
+            self.children.setdefault(self.parent_dn(dn, rn), []).append(dn)
+
+    def remove(self, dn):
+        with self.lock:
+            for child_dn in list(self.children.get(dn, [])):
+                self.remove(child_dn)
+            self.children.pop(dn, None)
+            if dn in self.mos:
+                tag, attrs = self.mos.pop(dn)
+                siblings = self.children.get(self.parent_dn(dn, attrs['rn']), [])
+                if dn in siblings:
+                    siblings.remove(dn)
+
+    def element(self, dn, hierarchy=False):
+        tag, attrs = self.mos[dn]
+        elem = ET.Element(tag, attrs)
+        if hierarchy:
+            for child_dn in self.children.get(dn, []):
+                elem.append(self.element(child_dn, True))
+        return elem
+
+    def by_class(self, tag):
+        return [dn for dn, (mo_tag, attrs) in self.mos.items() if mo_tag.lower() == tag.lower()]
+
+
+# dns of the server and uplink port endpoints, with the role they give the Fabric Interconnect port
+PORT_ENDPOINTS = [
+    (re.compile(r'^fabric/server/sw-(\w+)/slot-(\d+)-port-(\d+)$'), 'server'),
+    (re.compile(r'^fabric/lan/(\w+)/phys-slot-(\d+)-port-(\d+)$'), 'network'),
+]
+
+
+def filter_match(filter_elem, attrs):
+    if filter_elem is None:
+        return True
+    op = filter_elem.tag
+    if op == 'and':
+        return all(filter_match(child, attrs) for child in filter_elem)
+    if op == 'or':
+        return any(filter_match(child, attrs) for child in filter_elem)
+    if op == 'not':
+        return not filter_match(filter_elem[0], attrs)
+    value = attrs.get(filter_elem.get('property'))
+    expected = filter_elem.get('value')
+    if value is None:
+        return False
+    if op == 'eq':
+        return value == expected
+    if op == 'ne':
+        return value != expected
+    if op == 'wcard':
+        return re.search(expected, value) is not None
+    if op in ('gt', 'ge', 'lt', 'le'):
+        try:
+            value, expected = float(value), float(expected)
+        except ValueError:
+            pass
+        return {'gt': value > expected, 'ge': value >= expected,
+                'lt': value < expected, 'le': value <= expected}[op]
+    raise UCSMError('101', 'unsupported filter %s' % op)
+
+
+class UCSMSimulator():
+    """Fake UCSM answering the XML API from an MOStore."""
+
+    def __init__(self, fixture=None, latency=0.0, refresh_period=600, version='3.2(3a)'):
+        self.store = MOStore()
+        if fixture:
+            self.store.load(fixture)
+        self.latency = latency
+        self.refresh_period = refresh_period
+        self.version = version
+        self.cookies = set()
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    # HTTP endpoint
+
+    def start(self, host='127.0.0.1', port=0):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                request = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                response = simulator.process(request)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/xml')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.server = Server((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.server.server_address
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {}
+
+    def totals(self):
+        with self.stats_lock:
+            return dict(
+                round_trips=sum(entry['count'] for entry in self.stats.values()),
+                request_bytes=sum(entry['request_bytes'] for entry in self.stats.values()),
+                response_bytes=sum(entry['response_bytes'] for entry in self.stats.values()),
+                methods=dict((method, dict(entry)) for method, entry in self.stats.items()),
+            )
+
+    # XML API
+
+    def process(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            elem = ET.fromstring(request)
+        except ET.ParseError:
+            return b'<error errorCode="101" errorDescr="malformed request" />'
+
+        method = elem.tag
+        out = ET.Element(method, dict(cookie=elem.get('cookie', ''), response='yes'))
+        try:
+            handler = getattr(self, 'm_' + method, None)
+            if handler is None:
+                raise UCSMError('101', 'unsupported method %s' % method)
+            cookie = elem.get('inCookie') if method.startswith('aaa') else elem.get('cookie')
+            if method != 'aaaLogin' and cookie not in self.cookies:
+                raise UCSMError('552', 'Authorization required')
+            handler(elem, out)
+        except UCSMError as e:
+            out = ET.Element(method, dict(cookie=elem.get('cookie', ''), response='yes',
+                                          errorCode=e.code, errorDescr=e.descr))
+        response = ET.tostring(out)
+
+        with self.stats_lock:
+            entry = self.stats.setdefault(method, dict(count=0, request_bytes=0, response_bytes=0))
+            entry['count'] += 1
+            entry['request_bytes'] += len(request)
+            entry['response_bytes'] += len(response)
+        return response
+
+    def m_aaaLogin(self, elem, out):
+        cookie = uuid.uuid4().hex
+        self.cookies.add(cookie)
+        out.attrib.update(outCookie=cookie, outRefreshPeriod=str(self.refresh_period), outPriv='admin',
+                          outDomains='', outChannel='noencssl', outEvtChannel='noencssl',
+                          outSessionId=cookie[:8], outVersion=self.version, outName=elem.get('inName', ''))
+
+    def m_aaaRefresh(self, elem, out):
+        self.cookies.discard(elem.get('inCookie'))
+        self.m_aaaLogin(elem, out)
+
+    def m_aaaLogout(self, elem, out):
+        self.cookies.discard(elem.get('inCookie'))
+        out.set('outStatus', 'success')
+
+    def m_configResolveDn(self, elem, out):
+        hierarchy = elem.get('inHierarchical') == 'true'
+        out_config = ET.SubElement(out, 'outConfig')
+        dn = elem.get('dn')
+        if dn in self.store.mos:
+            out_config.append(self.store.element(dn, hierarchy))
+
+    def m_configResolveDns(self, elem, out):
+        hierarchy = elem.get('inHierarchical') == 'true'
+        out_configs = ET.SubElement(out, 'outConfigs')
+        out_unresolved = ET.SubElement(out, 'outUnresolved')
+        for dn_elem in elem.iter('dn'):
+            dn = dn_elem.get('value')
+            if dn in self.store.mos:
+                out_configs.append(self.store.element(dn, hierarchy))
+            else:
+                ET.SubElement(out_unresolved, 'dn', dict(value=dn))
+
+    def m_configResolveClass(self, elem, out):
+        hierarchy = elem.get('inHierarchical') == 'true'
+        in_filter = elem.find('inFilter')
+        filter_elem = in_filter[0] if in_filter is not None and len(in_filter) else None
+        out_configs = ET.SubElement(out, 'outConfigs')
+        for dn in sorted(self.store.by_class(elem.get('classId'))):
+            if filter_match(filter_elem, self.store.mos[dn][1]):
+                out_configs.append(self.store.element(dn, hierarchy))
+
+    def m_configResolveClasses(self, elem, out):
+        hierarchy = elem.get('inHierarchical') == 'true'
+        out_configs = ET.SubElement(out, 'outConfigs')
+        for class_id in elem.iter('classId'):
+            for dn in sorted(self.store.by_class(class_id.get('value'))):
+                out_configs.append(self.store.element(dn, hierarchy))
+
+    def m_configResolveChildren(self, elem, out):
+        hierarchy = elem.get('inHierarchical') == 'true'
+        class_id = elem.get('classId')
+        in_filter = elem.find('inFilter')
+        filter_elem = in_filter[0] if in_filter is not None and len(in_filter) else None
+        out_configs = ET.SubElement(out, 'outConfigs')
+        for dn in self.store.children.get(elem.get('inDn'), []):
+            tag, attrs = self.store.mos[dn]
+            if class_id and tag.lower() != class_id.lower():
+                continue
+            if filter_match(filter_elem, attrs):
+                out_configs.append(self.store.element(dn, hierarchy))
+
+    def m_configConfMos(self, elem, out):
+        out_configs = ET.SubElement(out, 'outConfigs')
+        with self.store.lock:
+            for pair in elem.iter('pair'):
+                dn = pair.get('key')
+                self.apply(pair[0], MOStore.parent_dn(dn, pair[0].get('rn')), dn)
+                pair_out = ET.SubElement(out_configs, 'pair', dict(key=dn))
+                if dn in self.store.mos:
+                    pair_out.append(self.store.element(dn, True))
+
+    def m_configConfMo(self, elem, out):
+        out_config = ET.SubElement(out, 'outConfig')
+        in_config = elem.find('inConfig')
+        dn = elem.get('dn')
+        with self.store.lock:
+            self.apply(in_config[0], MOStore.parent_dn(dn, in_config[0].get('rn')), dn)
+            if dn in self.store.mos:
+                out_config.append(self.store.element(dn, True))
+
+    def apply(self, mo_elem, parent_dn, dn=None):
+        attrs = dict(mo_elem.attrib)
+        status = attrs.pop('status', '')
+        dn = attrs.get('dn') or dn or (parent_dn + '/' + attrs['rn'] if parent_dn else attrs['rn'])
+        if 'deleted' in status or 'removed' in status:
+            if dn not in self.store.mos and 'deleted' in status:
+                raise UCSMError('103', 'object %s does not exist' % dn)
+            self.store.remove(dn)
+            self.derive_port_role(dn, False)
+            return
+        if 'created' in status and 'modified' not in status and dn in self.store.mos:
+            raise UCSMError('103', 'object %s already exists' % dn)
+        attrs.pop('childAction', None)
+        self.store.put(mo_elem.tag, dn, attrs)
+        self.derive_port_role(dn, True)
+        for child in mo_elem:
+            self.apply(child, dn)
+
+    def derive_port_role(self, dn, exists):
+        for pattern, role in PORT_ENDPOINTS:
+            match = pattern.match(dn)
+            if match:
+                switch_id, slot_id, port_id = match.groups()
+                port_dn = 'sys/switch-%s/slot-%s/switch-ether/port-%s' % (switch_id, slot_id, port_id)
+                if port_dn in self.store.mos:
+                    self.store.mos[port_dn][1].update(ifRole=role if exists else 'unknown', epDn=dn if exists else '')
+                return
@@ -112,8 +112,14 @@ def _argument_connection():
         ucs_username=dict(default="admin", type='str'),
         ucs_password=dict(type='str', no_log=True),
         ucs_port=dict(default=None),
-        ucs_secure=dict(default=None),
-        ucs_proxy=dict(default=None)
+        ucs_secure=dict(default=None, type='bool'),
+        ucs_proxy=dict(default=None),
+        ucs_session_cache=dict(default=False, type='bool'),
+        ucs_session_cache_dir=dict(default='~/.ansible/ucs_session_cache', type='path'),
+        ucs_perf=dict(default=False, type='bool'),
+        ucs_perf_trace_file=dict(type='path'),
+        ucs_worker=dict(default=False, type='bool'),
+        ucs_worker_socket=dict(default='~/.ansible/ucs_worker.sock', type='path')
     )
 
 
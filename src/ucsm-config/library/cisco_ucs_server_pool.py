@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 
+import re
+
 from ansible.module_utils.basic import *
 ANSIBLE_METADATA = {'metadata_version': '1.0',
                     'status': ['preview'],
@@ -27,6 +29,21 @@ options:
         - {"name" : pool-name
             "servers" : { 7, 8, ...}
             "blades" : { "1/1", "1/2", ...}
+            "qualification" : {"min_memory" : 384, "cpu_model" : "Gold", ...}
+        - servers are rack unit ids, blades are "chassis/slot"
+        - qualification adds the servers that meet all of its criteria, evaluated
+          against one bulk read of the server inventory
+          - model, cpu_model, adapter_model: regular expressions searched in the
+            server, CPU and adapter models
+          - min_memory (GB), min_cpus, min_cores, min_disks
+          - exclude_pools: pools in org_dn whose members are left out, so that
+            servers can be split between pools
+          - max_servers: the most servers added, current members are kept first
+        - members that are no longer listed or qualified are removed, the pool is
+          brought to its members in one commit; earlier versions only added
+          members and left the others in the pool
+        - descr is only set when it is given, the description of an existing
+          pool is kept otherwise
         required: true
     org_dn:
         description: org dn
@@ -51,6 +68,20 @@ EXAMPLES = '''
     ucs_ip: "192.168.1.1"
     ucs_username: "admin"
     ucs_password: "password"
+
+- name: master nodes, three blades with 384 GB that are not app nodes
+  cisco_ucs_server_pool:
+    pool:
+      name: master-pool
+      qualification:
+        min_memory: 384
+        cpu_model: "Gold"
+        min_disks: 2
+        exclude_pools: [app-pool]
+        max_servers: 3
+    ucs_ip: "192.168.1.1"
+    ucs_username: "admin"
+    ucs_password: "password"
 '''
 
 
@@ -77,8 +108,14 @@ def _argument_connection():
         ucs_username=dict(default="admin", type='str'),
         ucs_password=dict(type='str', no_log=True),
         ucs_port=dict(default=None),
-        ucs_secure=dict(default=None),
-        ucs_proxy=dict(default=None)
+        ucs_secure=dict(default=None, type='bool'),
+        ucs_proxy=dict(default=None),
+        ucs_session_cache=dict(default=False, type='bool'),
+        ucs_session_cache_dir=dict(default='~/.ansible/ucs_session_cache', type='path'),
+        ucs_perf=dict(default=False, type='bool'),
+        ucs_perf_trace_file=dict(type='path'),
+        ucs_worker=dict(default=False, type='bool'),
+        ucs_worker_socket=dict(default='~/.ansible/ucs_worker.sock', type='path')
     )
 
 
@@ -104,51 +141,117 @@ def _get_mo_params(params):
     return args
 
 
+def _server_id(mo):
+    # "chassis/slot" for pooled blades, the rack unit id for pooled rack servers
+    if mo.get_class_id() == 'ComputePooledSlot':
+        return '%s/%s' % (mo.chassis_id, mo.slot_id)
+    return str(mo.id)
+
+
+def _matches(pattern, values):
+    return any(re.search(pattern, value or '') for value in values)
+
+
+def _qualifies(entry, qual):
+    if qual.get('model') and not _matches(qual['model'], [entry['model']]):
+        return False
+    if qual.get('cpu_model') and not _matches(qual['cpu_model'], [entry['cpu_model']]):
+        return False
+    if qual.get('adapter_model') and not _matches(qual['adapter_model'], entry['adapter_models']):
+        return False
+    # memory is reported in MB, min_memory is in GB
+    if entry['memory'] < int(qual.get('min_memory') or 0) * 1024:
+        return False
+    if entry['cpus'] < int(qual.get('min_cpus') or 0) or entry['cores'] < int(qual.get('min_cores') or 0):
+        return False
+    return entry['disks'] >= int(qual.get('min_disks') or 0)
+
+
+def _id_key(server_id):
+    return [int(part) if part.isdigit() else part for part in server_id.split('/')]
+
+
+def _wanted_members(pool, mos, members, org_dn):
+    from ansible.module_utils.remote_management.ucs_inventory import build_inventory
+
+    wanted = set(str(ser) for ser in pool.get("servers") or [])
+    wanted.update(str(b) for b in pool.get("blades") or [])
+    qual = pool.get("qualification")
+    if not qual:
+        return wanted
+
+    excluded = set()
+    for name in qual.get("exclude_pools") or []:
+        excluded.update(members.get(org_dn + '/compute-pool-' + name, {}))
+    inventory = build_inventory(mos)
+    qualified = [entry['id'] for entry in inventory['servers']
+                 if entry['id'] not in excluded and _qualifies(entry, qual)]
+    if qual.get("max_servers"):
+        # current members are kept first, so re-running does not move servers between pools
+        current = members.get(org_dn + '/compute-pool-' + pool['name'], {})
+        qualified.sort(key=lambda server_id: (server_id not in current, _id_key(server_id)))
+        qualified = qualified[:int(qual["max_servers"])]
+    wanted.update(qualified)
+    return wanted
+
+
 def setup_serverpool(server, module):
     from ucsmsdk.mometa.compute.ComputePool import ComputePool
     from ucsmsdk.mometa.compute.ComputePooledSlot import ComputePooledSlot
     from ucsmsdk.mometa.compute.ComputePooledRackUnit import ComputePooledRackUnit
-    from ucsmsdk.mometa.compute.ComputeRackUnit import ComputeRackUnit
-    from ucsmsdk.mometa.fabric.FabricComputeSlotEp import FabricComputeSlotEp
+    from ansible.module_utils.remote_management.ucs_inventory import COMPONENT_CLASSES, SERVER_CLASSES
 
     ansible = module.params
-    args_mo  =  _get_mo_params(ansible)
-    
+    args_mo = _get_mo_params(ansible)
+
     changed = False
-    exists = False
     pool = args_mo['pool']
-    mo = server.query_dn(args_mo['org_dn']+'/compute-pool-'+ pool['name'])
-    if mo:
-        exists = True
+    pool_dn = args_mo['org_dn'] + '/compute-pool-' + pool['name']
     if ansible['state'] == 'absent':
-        if exists:
+        mo = server.query_dn(pool_dn)
+        if mo:
             changed = True
             if not module.check_mode:
                 server.remove_mo(mo)
                 server.commit()
-    else:
-        if not exists:
-            changed = True
-            if not module.check_mode:
-                # create if mo does not already exist
-                if not "descr" in pool:
-                    pool["descr"] = "" 
-                nmo = ComputePool(parent_mo_or_dn=args_mo['org_dn'],
-                                 name=pool["name"],
-                                 descr=pool["descr"])
-                if "servers" in pool: 
-                    for ser in pool["servers"]:
-                        ComputePooledRackUnit(
-                            parent_mo_or_dn=nmo,
-                            id=str(ser))
-                if "blades" in pool: 
-                    for b in pool["blades"]:
-                        ComputePooledSlot(parent_mo_or_dn=nmo, 
-                	slot_id=re.sub("\/\d","", b),
-                        chassis_id=re.sub("\d\/","", b))
-		server.add_mo(nmo, True)
-                server.commit()
-    return changed
+        return changed, {}
+
+    # the pools, their members and, to evaluate the qualification, the inventory are read in one request
+    class_ids = ['ComputePool', 'ComputePooledSlot', 'ComputePooledRackUnit']
+    if pool.get("qualification"):
+        class_ids.extend(SERVER_CLASSES + COMPONENT_CLASSES)
+    mos = server.query_classids(*class_ids)
+    members = {}
+    for mo in mos['ComputePooledSlot'] + mos['ComputePooledRackUnit']:
+        members.setdefault(mo.dn[:len(mo.dn) - len(mo.rn)].rstrip('/'), {})[_server_id(mo)] = mo
+    exists = any(mo.dn == pool_dn for mo in mos['ComputePool'])
+    current = members.get(pool_dn, {})
+    wanted = _wanted_members(pool, mos, members, args_mo['org_dn'])
+
+    # the description is only managed when it is given
+    descr = pool.get("descr")
+    props = dict(descr=descr) if descr is not None else {}
+    added = sorted(wanted - set(current), key=_id_key)
+    removed = sorted(set(current) - wanted, key=_id_key)
+    descr_changed = exists and descr is not None and \
+        [mo.descr for mo in mos['ComputePool'] if mo.dn == pool_dn][0] != descr
+    changed = not exists or descr_changed or bool(added) or bool(removed)
+    if changed and not module.check_mode:
+        # the new members are added and the old ones removed in one commit
+        for server_id in removed:
+            server.remove_mo(current[server_id])
+        nmo = ComputePool(parent_mo_or_dn=args_mo['org_dn'],
+                          name=pool["name"],
+                          **props)
+        for server_id in added:
+            if '/' in server_id:
+                chassis_id, slot_id = server_id.split('/', 1)
+                ComputePooledSlot(parent_mo_or_dn=nmo, chassis_id=chassis_id, slot_id=slot_id)
+            else:
+                ComputePooledRackUnit(parent_mo_or_dn=nmo, id=server_id)
+        server.add_mo(nmo, True)
+        server.commit()
+    return changed, dict(members=sorted(wanted, key=_id_key), added=added, removed=removed)
 
 
 def setup(server, module):
@@ -156,7 +259,8 @@ def setup(server, module):
     err = False
 
     try:
-        result["changed"] = setup_serverpool(server, module)
+        result["changed"], membership = setup_serverpool(server, module)
+        result.update(membership)
     except Exception as e:
         err = True
         result["msg"] = "setup error: %s " % str(e)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_apply_plan
+short_description: Applies a compiled configConfMos plan to Cisco UCS Manager
+description:
+- Applies a configConfMos document compiled offline from the ucsm-config roles by
+  C(python -m ansible.module_utils.remote_management.ucs_compiler).
+- The plan is compared with a snapshot of the org-root, fabric/lan, fabric/san, fabric/server and sys subtrees,
+  see the snapshot options.  Objects whose properties already match are left out and the rest is sent in one configConfMos request.
+- The snapshot is discarded after a change, so it is taken again by the next module that uses it.
+- Examples can be used with the UCS Platform Emulator U(https://communities.cisco.com/ucspe).
+extends_documentation_fragment: ucs
+options:
+  plan_file:
+    description:
+    - Filename (absolute path) of the compiled configConfMos document.
+    required: yes
+    type: path
+  max_pairs:
+    description:
+    - Largest number of pairs sent in one configConfMos request.
+    - With the default 0, all changed pairs are sent in one request.
+    type: int
+    default: 0
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.6'
+'''
+
+EXAMPLES = r'''
+- name: Compile the roles on the controller
+  command: python -m ansible.module_utils.remote_management.ucs_compiler --library library --output /tmp/ucsm_plan.xml
+  delegate_to: localhost
+  run_once: yes
+
+- name: Apply the plan
+  ucs_apply_plan:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    plan_file: /tmp/ucsm_plan.xml
+'''
+
+RETURN = r'''
+pairs:
+    description: Number of pairs in the plan.
+    returned: success
+    type: int
+    sample: 42
+changed_dns:
+    description: Top-level dns of the pairs that differed from UCS Manager and were sent.
+    returned: success
+    type: list
+    sample: ["org-root/mac-pool-mac-A", "fabric/lan/net-vlan100"]
+requests:
+    description: Number of configConfMos requests sent.
+    returned: success
+    type: int
+    sample: 1
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSnapshot, UCSSnapshotHandle, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_compiler import UCSPlan, element_to_mo, is_removal
+
+
+def main():
+    argument_spec = ucs_argument_spec
+    argument_spec.update(
+        plan_file=dict(type='path', required=True),
+        max_pairs=dict(type='int', default=0),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+    )
+    ucs = UCSModule(module)
+
+    err = False
+    changed = False
+
+    try:
+        plan = UCSPlan.load(module.params['plan_file'])
+        snapshot = UCSSnapshot(module.params['snapshot_dir'], module.params['hostname'], module.params['snapshot_ttl'])
+        if isinstance(ucs.login_handle, UCSSnapshotHandle):
+            snapshot_handle = ucs.login_handle
+        else:
+            snapshot_handle = snapshot.load(ucs.login_handle)
+        pairs = plan.delta(snapshot_handle.entries)
+
+        ucs.result['pairs'] = len(plan)
+        ucs.result['changed_dns'] = [dn for dn, elem in pairs]
+        ucs.result['requests'] = 0
+        changed = len(pairs) > 0
+        if changed and not module.check_mode:
+            max_pairs = module.params['max_pairs'] or len(pairs)
+            for start in range(0, len(pairs), max_pairs):
+                for dn, elem in pairs[start:start + max_pairs]:
+                    mo = element_to_mo(elem)
+                    if is_removal(elem):
+                        ucs.login_handle.remove_mo(mo)
+                    else:
+                        ucs.login_handle.add_mo(mo, True)
+                ucs.login_handle.commit()
+                ucs.result['requests'] += 1
+            snapshot.discard()
+
+    except Exception as e:
+        err = True
+        ucs.result['msg'] = "setup error: %s " % str(e)
+
+    ucs.result['changed'] = changed
+    if err:
+        module.fail_json(**ucs.result)
+    module.exit_json(**ucs.result)
+
+
+if __name__ == '__main__':
+    main()
@@ -41,12 +41,23 @@ options:
     - "You can use any characters or spaces except the following:"
     - "` (accent mark), \ (backslash), ^ (carat), \" (double quote), = (equal sign), > (greater than), < (less than), or ' (single quote)."
     aliases: [ descr ]
+  org_dn:
+    description:
+    - Org dn (distinguished name)
+    default: org-root
   boot_mode:
     description:
     - legacy, uefi
     - "single-server-single-sioc - The data path is configured through one SIOC when the chassis has single server and single SIOC or dual server and dual SIOCs."
     - "single-server-dual-sioc - When enabled, you can configure the data path through both the primary and auxiliary SIOCs when the chassis has single server and dual SIOCs."
     default: 'single-server-single-sioc'
+  boot_order:
+    description:
+    - List of boot devices, each with an order, a type of C(local_disk), C(local_lun), C(virtual_media),
+      C(cimc_mounted_dvd) or C(cimc_mounted_hdd), and for local_lun the lun image params.
+    - The boot policy is read with one hierarchical query and compared with boot_order as a tree.
+      Boot order entries and lun images that are no longer listed are removed, and changed or new entries are added,
+      in one commit.
 requirements:
 - ucsmsdk
 author:
@@ -106,7 +117,7 @@ RETURN = r'''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 import traceback
 import logging
 
@@ -133,6 +144,7 @@ def main():
     logging.basicConfig(level=logging.INFO)
     argument_spec = ucs_argument_spec
     argument_spec.update(
+        org_dn=dict(type='str', default='org-root'),
         name=dict(type='str', required=True),
         description=dict(type='str', default=''),
         state=dict(type='str', default='present', choices=['present', 'absent']),
@@ -190,10 +202,12 @@ def main():
         mo_exists = False
         parent_props_match = False
         child_props_match = True
-        dn_base = 'org-root'
+        dn_base = module.params['org_dn']
         dn = dn_base + '/boot-policy-' + module.params['name']
                 
-        mo = ucs.login_handle.query_dn(dn)
+        # boot policy and all boot order entries are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
                     
         if mo:
             mo_exists = True
@@ -211,6 +225,7 @@ def main():
                     boot_security_policy_enabled = True
             boot_order_tree = build_boot_order_tree(dn, module.params[BOOT_ORDER], boot_security_policy_enabled)
             boot_order_matches = dict()
+            stale_mos = []
 
             if mo_exists:
                 # check top-level mo props
@@ -227,12 +242,13 @@ def main():
                                                             
                 # verify boot order settings
                 if module.params.get('boot_order'):
-                    child_props_match = verify_boot_order_settings(mo, dn, boot_security_policy_enabled, boot_order_matches, boot_order_tree, ucs)
+                    lun_images = get_params(module.params[BOOT_ORDER], LOCAL_LUN) or []
+                    child_props_match = verify_boot_order_settings(dn, boot_security_policy_enabled, boot_order_matches, boot_order_tree, lun_images, stale_mos, subtree)
 
             if not (parent_props_match and child_props_match) :
                 if not module.check_mode:
-                    # if some boot order entries need to be removed remove them first
-                    check_and_remove_boot_order_entries(mo_exists, child_props_match, boot_order_matches, boot_order_tree, ucs)
+                    # stale boot order entries are removed in the same commit as the new ones are added
+                    check_and_remove_boot_order_entries(stale_mos, ucs)
 
 
                     if not parent_props_match:
@@ -322,46 +338,56 @@ def main():
         module.fail_json(**ucs.result)
     module.exit_json(**ucs.result)
 
-def verify_boot_order_settings(mo, dn, boot_security_policy_enabled, boot_order_matches, boot_order_tree, ucs):
-    child_props_match = True
-    mo_list = ucs.login_handle.query_children(in_mo=mo)
-    if mo_list :
-        for index, child in enumerate(mo_list):
-            logging.debug("boot order child : %s", child)
-
-            if child.dn ==  get_dn_path(dn, BOOT_SECURITY_DN):
-                if not is_boot_security_setting_matching(child, boot_security_policy_enabled, boot_order_matches):
-                    child_props_match = False
-            elif child.dn == get_dn_path(dn, STORAGE_DN):
-                if not is_local_storage_setting_matching(ucs, dn, child, boot_order_tree, boot_order_matches):
-                    child_props_match = False
-            else:	
-                boot_order_matches[child.dn] = True
-                order =  boot_order_tree.get(child.dn)
-                logging.info("args order: %s child.order: %s dn: %s", order, child.order, child.dn)
-                if not(order) or not(order == child.order) :
-                    child_props_match = False
-                    boot_order_matches[child.dn] = False
-    # make sure length of input boot order matches existing boot order - otherwise new items need to be added 
-    if child_props_match:
-        child_props_match = len(boot_order_matches) == len (boot_order_tree)
+def verify_boot_order_settings(dn, boot_security_policy_enabled, boot_order_matches, boot_order_tree, lun_images, stale_mos, subtree):
+    # tree diff of the boot policy subtree read by UCSSubtree against the wanted boot order, in one pass
+    storage_dn = get_dn_path(dn, STORAGE_DN)
+    local_storage_dn = get_dn_path(storage_dn, LOCAL_STORAGE_DN)
+    lun_dn = get_dn_path(dn, LOCAL_LUN_DN)
+    local_wanted = get_dn_path(dn, LOCAL_DISK_DN) in boot_order_tree or lun_dn in boot_order_tree
+    wanted_lun_images = dict((lun_image[TYPE], lun_image[LUN_NAME]) for lun_image in lun_images)
+
+    for child_dn in sorted(subtree.mos):
+        child = subtree.mos[child_dn]
+        parent_dn = child_dn[:len(child_dn) - len(child.rn)].rstrip('/')
+        logging.debug("boot order child : %s", child)
+        if child_dn == dn or any(child_dn.startswith(stale.dn + '/') for stale in stale_mos):
+            continue
+        if child_dn == get_dn_path(dn, BOOT_SECURITY_DN):
+            is_boot_security_setting_matching(child, boot_security_policy_enabled, boot_order_matches)
+        elif child_dn == storage_dn:
+            # the storage container goes with the last local boot device
+            if not local_wanted:
+                stale_mos.append(child)
+        elif parent_dn == dn or parent_dn == local_storage_dn:
+            order = boot_order_tree.get(child_dn)
+            logging.info("args order: %s child.order: %s dn: %s", order, child.order, child_dn)
+            boot_order_matches[child_dn] = bool(order) and order == child.order
+            if not order:
+                stale_mos.append(child)
+        elif parent_dn == lun_dn:
+            # lun image paths are part of the local lun entry
+            if child.type not in wanted_lun_images:
+                stale_mos.append(child)
+            if wanted_lun_images.get(child.type) != child.lun_name:
+                boot_order_matches[lun_dn] = False
+    if lun_dn in boot_order_matches:
+        existing_lun_images = [mo.type for mo in subtree.query_children(in_dn=lun_dn)]
+        if any(lun_type not in existing_lun_images for lun_type in wanted_lun_images):
+            boot_order_matches[lun_dn] = False
+
+    # every wanted entry has to exist and match, and nothing may be stale
+    child_props_match = not stale_mos and all(boot_order_matches.get(boot_order_dn) for boot_order_dn in boot_order_tree)
 
     logging.info ("Child Props Match: %s", child_props_match)
     logging.info ("Boot Order match: %s", boot_order_matches)
     return child_props_match
 
-def check_and_remove_boot_order_entries(mo_exists, child_props_match, boot_order_matches, boot_order_tree, ucs):
-    if mo_exists and not child_props_match:
-        for boot_order_match_dn in boot_order_matches.keys():
-            # if the dn doesn't exisit in the new boot order - remove it
-            if not boot_order_tree.get(boot_order_match_dn):
-                boot_order_mo = ucs.login_handle.query_dn(boot_order_match_dn)
-                logging.info("Removing Boot Order Entry: %s", boot_order_mo)
-                if boot_order_mo:
-                    ucs.login_handle.remove_mo(
-                        mo=boot_order_mo
-                    )
-                ucs.login_handle.commit()
+def check_and_remove_boot_order_entries(stale_mos, ucs):
+    for boot_order_mo in stale_mos:
+        logging.info("Removing Boot Order Entry: %s", boot_order_mo)
+        ucs.login_handle.remove_mo(
+            mo=boot_order_mo
+        )
 
 LOCAL_LUN = 'local_lun'
 LUN_IMAGE = 'lun_image'
@@ -446,24 +472,5 @@ def build_boot_order_tree(dn, boot_order, boot_security_policy_enabled):
             print(bootFrom)
     return bootOrder	
 
-def is_local_storage_setting_matching(ucs, dn, child, boot_order_tree, boot_order_match):
-    child_props_match = True
-    # org-root/boot-policy-test-boot/storage
-    if child.dn == get_dn_path(dn, STORAGE_DN):
-        mo_storage_list = ucs.login_handle.query_children(in_mo=child)
-        for index, child_storage in enumerate(mo_storage_list):
-            mo_storage_child_list = ucs.login_handle.query_children(in_mo=child_storage)
-            # org-root/boot-policy-test-boot/storage/local-storage
-            if(child_storage.dn == get_dn_path(child.dn, LOCAL_STORAGE_DN)):
-                for index, local_storage_child in enumerate(mo_storage_child_list):
-                    # 	check whether order match for local storage child
-                    order = boot_order_tree.get(local_storage_child.dn)
-                    if not(order) or not(order == local_storage_child.order) :
-                        boot_order_match[local_storage_child.dn] = False
-                        child_props_match = False
-                    else:
-                        boot_order_match[local_storage_child.dn] = True
-    return child_props_match
-                    
 if __name__ == '__main__':
     main()
@@ -77,6 +77,13 @@ options:
 	- Valid input (1-60, comma(,), hyphen(-) and no negative numbers)
     required: yes
 	default: ''
+  purge_slots:
+    description:
+    - If C(yes), disk slots of the policy that are not in slot_range are removed.
+    - The policy is read with one hierarchical query and compared slot by slot, ownership and controller reference included,
+      and only the slots that differ are sent to UCS Manager, in one commit.
+    type: bool
+    default: 'no'
 requirements:
 - ucsmsdk
 author:
@@ -115,12 +122,26 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-#
+slots_added:
+  description: Disk slots added to the policy.
+  returned: success
+  type: list
+  sample: [5, 6]
+slots_modified:
+  description: Disk slots whose ownership or controller reference was changed.
+  returned: success
+  type: list
+  sample: [1]
+slots_removed:
+  description: Disk slots removed from the policy.
+  returned: success
+  type: list
+  sample: [60]
 '''
 
 from itertools import chain
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 
 def parse_range(rng):
     parts = rng.split('-')
@@ -150,6 +171,7 @@ def main():
 		controller_id=dict(type='str', default='', choices=['1', '2']),
 		controller_type=dict(type='str', default='SAS'),
 		slot_range=dict(type='str'),
+		purge_slots=dict(type='bool', default=False),
 		state=dict(default='present', choices=['present', 'absent'], type='str'),
 	)
 	module = AnsibleModule(
@@ -171,7 +193,9 @@ def main():
 		props_match = False
 		# dn is <org_dn>/disk-zoning-policy-<name>
 		dn = module.params['org_dn'] + '/disk-zoning-policy-' + module.params['name']
-		mo = ucs.login_handle.query_dn(dn)
+		# policy, disk slots and controller references are read with one hierarchical query
+		subtree = UCSSubtree(ucs.login_handle, dn)
+		mo = subtree.query_dn(dn)
 		if mo:
 			mo_exists = True
 
@@ -186,47 +210,73 @@ def main():
 				# check top-level mo props
 				kwargs = dict(name=module.params['name'])
 				kwargs['descr'] = module.params['descr']
-				if (mo.check_prop_match(**kwargs)):
-					if module.params['slot_range']:
-						filter_zoning = '(name, ' + module.params['name'] + ' ,type="eq")'
-						mo_1 = ucs.login_handle.query_classid("LstorageDiskZoningPolicy", filter_str=filter_zoning)
-						for i in mo_1:
-							mo_2 = ucs.login_handle.query_children(in_mo=i, class_id="LStorageDiskSlot")
-							mo_3 = []
-							for j in mo_2:
-								mo_3.append(j.id)
-							mo_4 = sorted(map(int,mo_3))
-							mo_5 = list(parse_range_list(module.params['slot_range']))
-							if mo_4 == mo_5:
-								props_match = True
-					else:
-						props_match = True
-
-			if not props_match:
+				kwargs['preserve_config'] = module.params['preserve_config']
+				props_match = mo.check_prop_match(**kwargs)
+
+			# per slot diff of ownership and controller reference against the existing slots
+			wanted_ref = None
+			if module.params['ownership'] == 'dedicated':
+				wanted_ref = (module.params['server_id'], module.params['controller_id'], module.params['controller_type'])
+			existing_slots = {}
+			if mo_exists:
+				for mo_1 in subtree.query_children(in_dn=dn, class_id='LstorageDiskSlot'):
+					existing_slots[int(mo_1.id)] = mo_1
+			wanted_slots = list(parse_range_list(module.params['slot_range'])) if module.params['slot_range'] else []
+			slots_added = []
+			slots_modified = []
+			stale_refs = []
+			for slot_id in wanted_slots:
+				mo_1 = existing_slots.get(slot_id)
+				if not mo_1:
+					slots_added.append(slot_id)
+					continue
+				refs = subtree.query_children(in_mo=mo_1, class_id='LstorageControllerRef')
+				existing_refs = [(ref.server_id, ref.controller_id, ref.controller_type) for ref in refs]
+				if mo_1.ownership != module.params['ownership'] or existing_refs != ([wanted_ref] if wanted_ref else []):
+					slots_modified.append(slot_id)
+					stale_refs.extend(ref for ref in refs if (ref.server_id, ref.controller_id, ref.controller_type) != wanted_ref)
+			slots_removed = []
+			if module.params['purge_slots']:
+				slots_removed = sorted(slot_id for slot_id in existing_slots if slot_id not in wanted_slots)
+			ucs.result['slots_added'] = slots_added
+			ucs.result['slots_modified'] = slots_modified
+			ucs.result['slots_removed'] = slots_removed
+
+			if not props_match or slots_added or slots_modified or slots_removed:
 				if not module.check_mode:
-					# create if mo does not already exist
-					mo = LstorageDiskZoningPolicy(
-						parent_mo_or_dn=module.params['org_dn'],
-						name=module.params['name'],
-						descr=module.params['descr'],
-						preserve_config=module.params['preserve_config'],
-					)
-					
-					for i in list(parse_range_list(module.params['slot_range'])):
+					parent = dn
+					if not props_match:
+						# create if mo does not already exist
+						mo = LstorageDiskZoningPolicy(
+							parent_mo_or_dn=module.params['org_dn'],
+							name=module.params['name'],
+							descr=module.params['descr'],
+							preserve_config=module.params['preserve_config'],
+						)
+						parent = mo
+
+					# only the changed slots are sent
+					for mo_2 in stale_refs:
+						ucs.login_handle.remove_mo(mo_2)
+					for slot_id in slots_removed:
+						ucs.login_handle.remove_mo(existing_slots[slot_id])
+					for slot_id in slots_added + slots_modified:
 						mo_1 = LstorageDiskSlot(
-							parent_mo_or_dn=mo,
-							id=str(i),
+							parent_mo_or_dn=parent,
+							id=str(slot_id),
 							ownership=module.params['ownership'],
 							#drive_path=module.params['drive_path'],
 						)
-						if module.params['ownership'] == 'dedicated':
+						if wanted_ref:
 							mo_2 = LstorageControllerRef(
 								parent_mo_or_dn=mo_1,
 								controller_id=module.params['controller_id'],
 								server_id=module.params['server_id'],
 								controller_type=module.params['controller_type'],
 							)
-
+						if props_match:
+							ucs.login_handle.add_mo(mo_1, True)
+					if not props_match:
 						ucs.login_handle.add_mo(mo, True)
 					ucs.login_handle.commit()
 				changed = True
@@ -41,7 +41,19 @@ options:
     - "You can use any characters or spaces except the following:"
     - "` (accent mark), \ (backslash), ^ (carat), \" (double quote), = (equal sign), > (greater than), < (less than), or ' (single quote)."
     aliases: [ descr ]
-  
+  id:
+    description:
+    - The Fabric Interconnects the ports are configured on, a list of C(A) and C(B).
+    - With both, ether_ports_list is applied to both Fabric Interconnects.  C(A-B) is taken as both as well.
+    - A port can name its own Fabric Interconnects with the id key, in the same form.
+    type: list
+    required: yes
+  ether_ports_list:
+    description:
+    - List of Ethernet ports, each with slot_id, port_id and a port_type of C(server), C(network) or C(unconfigured).
+    - The roles of all ports are read with one query and only ports whose role differs are changed,
+      in one commit for all ports of both Fabric Interconnects.
+    - A port that changes from one role to another is unconfigured in the same commit.
 requirements:
 - ucsmsdk
 author:
@@ -56,21 +68,35 @@ EXAMPLES = r'''
     hostname: 172.16.143.150
     username: admin
     password: password
-    - name: "test"
-  	  id: "A"
-  	  ether_ports_list:
-  	  - name: "Port 1"
-    	port_id: "1"
-    	slot_id: "1"
-    	port_type: "network"
-  	  - name: "Port 2"
-    	port_id: "2"
-    	slot_id: "1"
-    	port_type: "server"
-      - name: "Port 9"
-    	port_id: "9"
-    	slot_id: "1"
-    	port_type: "unconfigured"
+    name: test
+    id: A
+    ether_ports_list:
+    - name: Port 1
+      port_id: '1'
+      slot_id: '1'
+      port_type: network
+    - name: Port 2
+      port_id: '2'
+      slot_id: '1'
+      port_type: server
+    - name: Port 9
+      port_id: '9'
+      slot_id: '1'
+      port_type: unconfigured
+
+- name: Configure the same ports on both fabric interconnects in one commit
+  ucs_fabric_interconnect_ports:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    name: test
+    id: [A, B]
+    ether_ports_list:
+    - name: Uplink
+      port_id: '33'
+      slot_id: '1'
+      port_type: network
+
 - name: Reset Fabric Interconnect Port Configs
   ucs_fabric_interconnect_ports:
     hostname: 172.16.143.150
@@ -81,11 +107,29 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-#
+ports:
+  description: Fabric Interconnect, slot, port, role before and role after of each port whose role was changed.
+  returned: success
+  type: list
+  sample: [{"switch_id": "A", "slot_id": "1", "port_id": "33", "from": "unknown", "to": "network"}]
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, query_classid_by_dn_prefix, ucs_argument_spec
+
+FABRIC_IDS = ['A', 'B']
+
+
+def fabric_ids(value):
+	"""Returns the Fabric Interconnect ids of a list or an A-B string, each once."""
+	ids = []
+	for item in value if isinstance(value, list) else [value]:
+		for switch_id in str(item).split('-'):
+			if switch_id not in FABRIC_IDS:
+				raise ValueError('Fabric Interconnect id %s is not one of %s' % (switch_id, ', '.join(FABRIC_IDS)))
+			if switch_id not in ids:
+				ids.append(switch_id)
+	return ids
 
 
 def main():
@@ -94,7 +138,7 @@ def main():
 		name=dict(type='str', required=True),
 		description=dict(type='str', default=''),
 		state=dict(type='str', default='present', choices=['present', 'absent']),
-		id=dict(type='str', default='NONE', choices=['A', 'B', 'NONE']),  
+		id=dict(type='list', required=True),
 		ether_ports_list=dict(type='list'),
 		fc_ports_list=dict(type='list'),
 	)
@@ -103,7 +147,11 @@ def main():
 		argument_spec,
 		supports_check_mode=True,
 		)
-		
+
+	try:
+		switch_ids = fabric_ids(module.params['id'])
+	except ValueError as e:
+		module.fail_json(msg=str(e))
 	ucs = UCSModule(module)
 
 	err = False
@@ -120,91 +168,77 @@ def main():
 	ROLE_UNKNOWN = 'unknown'
 	
 	
+	# UCS Manager reports unconfigured ports with the unknown role
+	ROLES = {ROLE_SERVER: ROLE_SERVER, ROLE_NETWORK: ROLE_NETWORK, ROLE_UNCONFIGURED: ROLE_UNKNOWN}
+
 	changed = False
 	try:
-		mo_exists = False
-		props_match = False
-		# dn is fabric/server/sw-<id>
 		dn_base = 'sys'
-		dn = dn_base + '/switch-' + module.params['id']
-		dn_fc = dn + '/slot-1'+ '/switch-fc'
-		dn_eth = dn + '/slot-1'+ '/switch-ether'
 		dn_server_base = 'fabric/server'
 		dn_network_base = 'fabric/lan'
-		
-		mo = ucs.login_handle.query_dn(dn)
-		if mo:
-			mo_exists = True
 
 		if module.params['state'] == 'absent':
-			# mo must exist but all properties do not have to match
-			if mo_exists:
-				if not module.check_mode:
-					ucs.login_handle.remove_mo(mo)
-					ucs.login_handle.commit()
-				changed = True
-		else:
-			if mo_exists:
-				# verify port settings
-				if module.params.get('ether_ports_list'):
-					ether_props_match = []
-					props_match = True
-					for index, ePort in enumerate(module.params['ether_ports_list']):
-						ether_props_match.append(False)
-						child_dn = dn_eth + '/port-' + ePort['port_id']
-						mo_1 = ucs.login_handle.query_dn(child_dn)
-						if mo_1:
-							if ePort['port_type'] == ROLE_SERVER:
-								if mo_1.if_role == ROLE_SERVER:
-									ether_props_match[index] = True
-								else:
-									props_match = False
-							elif ePort['port_type'] == ROLE_NETWORK:
-								if mo_1.if_role == ROLE_NETWORK:
-									ether_props_match[index] = True
-								else:
-									props_match = False
-							elif ePort['port_type'] == ROLE_UNCONFIGURED:
-								if mo_1.if_role == ROLE_UNKNOWN:
-									ether_props_match[index] = True
-								else:
-									props_match = False
-								
-			if not props_match:
-				if not module.check_mode:
-					for index, ePort in enumerate(module.params['ether_ports_list']):
-						if not ether_props_match[index]:
-							if ePort['port_type'] == ROLE_SERVER:
-								dn_server = dn_server_base + '/sw-' + module.params['id']
-								mo_port = FabricDceSwSrvEp(
-											parent_mo_or_dn=dn_server,
-											slot_id=ePort['slot_id'],
-											port_id=ePort['port_id']
-										)
-								ucs.login_handle.add_mo(mo_port, True)
-								ucs.login_handle.commit()
-								changed = True
-							elif ePort['port_type'] == ROLE_NETWORK:
-								dn_network = dn_network_base + '/' + module.params['id']
-								mo_port = FabricEthLanEp(
-											parent_mo_or_dn=dn_network,
-											slot_id=ePort['slot_id'],
-											port_id=ePort['port_id']
-										)
-								ucs.login_handle.add_mo(mo_port, True)
-							elif ePort['port_type'] == ROLE_UNCONFIGURED:
-								child_dn = dn_eth + '/port-' + ePort['port_id']
-								mo_1 = ucs.login_handle.query_dn(child_dn)
-								if mo_1:
-									dn_to_remove = mo_1.ep_dn
-									mo_to_remove = ucs.login_handle.query_dn(dn_to_remove)
-									if mo_to_remove:
-										ucs.login_handle.remove_mo(mo_to_remove)
-							ucs.login_handle.commit()
-							changed = True	
-
-					
-				
+			for switch_id in switch_ids:
+				# dn is sys/switch-<id>
+				mo = ucs.login_handle.query_dn(dn_base + '/switch-' + switch_id)
+				# mo must exist but all properties do not have to match
+				if mo:
+					if not module.check_mode:
+						ucs.login_handle.remove_mo(mo)
+					changed = True
+			if changed and not module.check_mode:
+				ucs.login_handle.commit()
+		elif module.params.get('ether_ports_list'):
+			# roles of every Ethernet port of both Fabric Interconnects are read with one class query
+			ether_ports = query_classid_by_dn_prefix(ucs.login_handle, 'EtherPIo', dn_base + '/switch-')
+
+			ucs.result['ports'] = []
+			for ePort in module.params['ether_ports_list']:
+				for switch_id in fabric_ids(ePort['id']) if ePort.get('id') else switch_ids:
+					if ePort['port_type'] not in ROLES:
+						raise ValueError('port_type %s of port %s is not one of %s' % (ePort['port_type'], ePort['port_id'], ', '.join(ROLES)))
+					child_dn = '%s/switch-%s/slot-%s/switch-ether/port-%s' % (dn_base, switch_id, ePort['slot_id'], ePort['port_id'])
+					mo_1 = ether_ports.get(child_dn)
+					if (mo_1.if_role if mo_1 else ROLE_UNKNOWN) == ROLES[ePort['port_type']]:
+						# a port that is not there has no role, so it is already unconfigured
+						continue
+					ucs.result['ports'].append({'switch_id': switch_id, 'slot_id': ePort['slot_id'], 'port_id': ePort['port_id'],
+												'from': mo_1.if_role if mo_1 else None, 'to': ROLES[ePort['port_type']]})
+					changed = True
+					if module.check_mode:
+						continue
+
+					if mo_1 and mo_1.if_role != ROLE_UNKNOWN and mo_1.ep_dn:
+						# the port leaves its current role in the same commit
+						if mo_1.if_role == ROLE_SERVER:
+							ucs.login_handle.remove_mo(FabricDceSwSrvEp(parent_mo_or_dn=dn_server_base + '/sw-' + switch_id,
+																		slot_id=ePort['slot_id'], port_id=ePort['port_id']))
+						elif mo_1.if_role == ROLE_NETWORK:
+							ucs.login_handle.remove_mo(FabricEthLanEp(parent_mo_or_dn=dn_network_base + '/' + switch_id,
+																	  slot_id=ePort['slot_id'], port_id=ePort['port_id']))
+						else:
+							mo_to_remove = ucs.login_handle.query_dn(mo_1.ep_dn)
+							if mo_to_remove:
+								ucs.login_handle.remove_mo(mo_to_remove)
+
+					if ePort['port_type'] == ROLE_SERVER:
+						mo_port = FabricDceSwSrvEp(
+									parent_mo_or_dn=dn_server_base + '/sw-' + switch_id,
+									slot_id=ePort['slot_id'],
+									port_id=ePort['port_id']
+								)
+						ucs.login_handle.add_mo(mo_port, True)
+					elif ePort['port_type'] == ROLE_NETWORK:
+						mo_port = FabricEthLanEp(
+									parent_mo_or_dn=dn_network_base + '/' + switch_id,
+									slot_id=ePort['slot_id'],
+									port_id=ePort['port_id']
+								)
+						ucs.login_handle.add_mo(mo_port, True)
+
+			if changed and not module.check_mode:
+				# server, uplink and unconfigure changes of both Fabric Interconnects go in one configConfMos request
+				ucs.login_handle.commit()
 
 	except Exception as e:
 		err = True
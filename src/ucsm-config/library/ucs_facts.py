@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_facts
+short_description: Gathers the server hardware inventory of Cisco UCS Manager
+description:
+- Gathers the blade and rack servers of Cisco UCS Manager with a summary of their CPUs, memory, adapters and local disks.
+- ComputeBlade, ComputeRackUnit, MemoryArray, ProcessorUnit, AdaptorUnit and StorageLocalDisk are read with one
+  configResolveClasses request.
+- The inventory is indexed by server id (chassis/slot for blades, the id for rack servers), by serial and by capability,
+  so that later tasks can select servers from the facts.
+- The inventory is cached on the controller, see I(cache_dir) and I(cache_ttl).  A module run that finds a cached
+  inventory does not log in to UCS Manager.
+- Examples can be used with the UCS Platform Emulator U(https://communities.cisco.com/ucspe).
+extends_documentation_fragment: ucs
+options:
+  cache_dir:
+    description:
+    - Directory on the controller the inventory is cached in, one file per hostname.
+    type: path
+    default: ~/.ansible/ucs_inventory
+  cache_ttl:
+    description:
+    - Seconds a cached inventory is used for.
+    - Hardware changes are not tracked, use 0 to always read the inventory from UCS Manager, e.g. after servers were added.
+    type: int
+    default: 600
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.5'
+'''
+
+EXAMPLES = r'''
+- name: Gather the server inventory
+  ucs_facts:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+
+- name: Blades with at least 384 GB of memory
+  debug:
+    msg: "{{ ucs_inventory.servers | selectattr('memory', 'ge', 393216) | map(attribute='id') | list }}"
+
+- name: Server in chassis 3, slot 1
+  debug:
+    msg: "{{ ucs_inventory.by_id['3/1'] }}"
+
+- name: Servers of a model
+  debug:
+    msg: "{{ ucs_inventory.by_capability.model['UCSB-B200-M5'] }}"
+'''
+
+RETURN = r'''
+cached:
+    description: Whether the inventory came from the cache.
+    returned: success
+    type: bool
+    sample: true
+cache_age:
+    description: Age of the inventory in seconds.
+    returned: success
+    type: int
+    sample: 42
+ansible_facts:
+  description: Facts with the server inventory.
+  returned: success
+  type: complex
+  contains:
+    ucs_inventory:
+      description: Servers and their indexes.
+      type: complex
+      contains:
+        servers:
+          description:
+          - Servers sorted by dn.  memory and memory_max are in MB, disk_size is the total size of the local disks in MB.
+          - cpu_model is the model of the first equipped CPU, adapter_models has one entry per equipped adapter.
+          type: list
+          sample: [{"dn": "sys/chassis-3/blade-1", "kind": "blade", "id": "3/1", "model": "UCSB-B200-M5",
+                    "serial": "FCH21427JKL", "vendor": "Cisco Systems Inc", "cpus": 2, "cores": 40, "threads": 80,
+                    "memory": 393216, "memory_max": 3145728, "cpu_model": "Intel(R) Xeon(R) Gold 6148 CPU @ 2.40GHz",
+                    "adapter_models": ["UCSB-MLOM-40G-04"], "disks": 2, "disk_size": 1144641, "disk_types": ["SSD"],
+                    "association": "none", "availability": "available", "assigned_to_dn": "", "oper_power": "off",
+                    "oper_state": "unassociated"}]
+        by_id:
+          description: dn of each server by its id.
+          type: dict
+          sample: {"3/1": "sys/chassis-3/blade-1", "1": "sys/rack-unit-1"}
+        by_serial:
+          description: dn of each server by its serial.
+          type: dict
+          sample: {"FCH21427JKL": "sys/chassis-3/blade-1"}
+        by_capability:
+          description:
+          - dns of the servers by model, cpu_model, adapter_models, memory and disks.
+          - The values are strings, e.g. the memory in MB or the number of disks.
+          type: dict
+          sample: {"model": {"UCSB-B200-M5": ["sys/chassis-3/blade-1"]}, "memory": {"393216": ["sys/chassis-3/blade-1"]}}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_inventory import UCS_INVENTORY_DIR, UCSInventory
+
+
+def main():
+    argument_spec = ucs_argument_spec
+    argument_spec.update(
+        cache_dir=dict(type='path', default=UCS_INVENTORY_DIR),
+        cache_ttl=dict(type='int', default=600),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+    )
+    result = {}
+    err = False
+
+    try:
+        cache = UCSInventory(module.params['cache_dir'], module.params['hostname'], module.params['cache_ttl'])
+        cached = cache.cached()
+        if cached:
+            # the cached inventory is enough, no need to log in
+            inventory, age = cached
+        else:
+            ucs = UCSModule(module)
+            result = ucs.result
+            inventory, age = cache.take(ucs.login_handle), 0
+
+        result['cached'] = cached is not None
+        result['cache_age'] = int(age)
+        result['ansible_facts'] = dict(ucs_inventory=inventory)
+
+    except Exception as e:
+        err = True
+        result['msg'] = "setup error: %s " % str(e)
+
+    result['changed'] = False
+    if err:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
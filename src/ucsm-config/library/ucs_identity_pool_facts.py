@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_identity_pool_facts
+short_description: Gathers identity pool usage and block overlaps from Cisco UCS Manager
+description:
+- Gathers the size, assigned and free identities of the IP, MAC, UUID and WWN pools on Cisco UCS Manager.
+- Reports blocks, in the same or in different pools, that share identities.
+- The blocks of each kind are read with one class query (IppoolBlock, IppoolIpV6Block, MacpoolBlock, UuidpoolBlock
+  and FcpoolBlock) and indexed in an interval tree.
+- Examples can be used with the UCS Platform Emulator U(https://communities.cisco.com/ucspe).
+extends_documentation_fragment: ucs
+options:
+  kinds:
+    description:
+    - Identity kinds to gather.
+    type: list
+    choices: [ipv4, ipv6, mac, uuid, wwn]
+    default: [ipv4, ipv6, mac, uuid, wwn]
+  org_dn:
+    description:
+    - Only report pools in this org and its sub-orgs.
+    - Overlaps are always looked for across all orgs.
+    default: org-root
+  history_file:
+    description:
+    - File on the controller the assigned count of every pool is recorded in on each run.
+    - When set, each pool gets an exhaustion forecast from the growth of its assigned count over the recorded runs.
+    type: path
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.5'
+'''
+
+EXAMPLES = r'''
+- name: Gather identity pool facts
+  ucs_identity_pool_facts:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    history_file: ~/.ansible/ucs_identity_history.json
+
+- name: Fail on overlapping blocks
+  assert:
+    that: ucs_identity_pools.overlaps | length == 0
+'''
+
+RETURN = r'''
+ansible_facts:
+  description: Facts with the identity pools.
+  returned: success
+  type: complex
+  contains:
+    ucs_identity_pools:
+      description: Pools and overlapping blocks.
+      type: complex
+      contains:
+        pools:
+          description:
+          - dn, kind, size, assigned, free, number of blocks, exhausted and exhaustion_seconds of each pool.
+          - exhaustion_seconds is the forecast time until the pool runs out, null without history or growth.
+          type: list
+          sample: [{"dn": "org-root/mac-pool-default", "kind": "mac", "size": 256, "assigned": 12, "free": 244,
+                    "blocks": 1, "exhausted": false, "exhaustion_seconds": 2592000}]
+        overlaps:
+          description: Kind, dns and number of shared identities of each pair of overlapping blocks.
+          type: list
+          sample: [{"kind": "mac", "blocks": ["org-root/mac-pool-a/block-00:25:B5:00:00:00-00:25:B5:00:00:FF",
+                    "org-root/mac-pool-b/block-00:25:B5:00:00:80-00:25:B5:00:01:7F"], "count": 128}]
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_identity import IDENTITY_KINDS, UCSIdentityIndex, load_history, store_history
+
+
+def main():
+    argument_spec = ucs_argument_spec
+    argument_spec.update(
+        kinds=dict(type='list', default=sorted(IDENTITY_KINDS), choices=sorted(IDENTITY_KINDS)),
+        org_dn=dict(type='str', default='org-root'),
+        history_file=dict(type='path'),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+    )
+    ucs = UCSModule(module)
+
+    err = False
+
+    try:
+        index = UCSIdentityIndex(ucs.login_handle, kinds=module.params['kinds'], usage=True)
+        history = load_history(module.params['history_file']) if module.params['history_file'] else None
+        org_dn = module.params['org_dn']
+        pools = [entry for entry in index.pool_usage(history)
+                 if entry['dn'].startswith(org_dn + '/')]
+        if module.params['history_file'] and not module.check_mode:
+            store_history(module.params['history_file'], history, pools)
+
+        ucs.result['ansible_facts'] = dict(ucs_identity_pools=dict(
+            pools=pools,
+            overlaps=index.overlapping_blocks(),
+        ))
+
+    except Exception as e:
+        err = True
+        ucs.result['msg'] = "setup error: %s " % str(e)
+
+    ucs.result['changed'] = False
+    if err:
+        module.fail_json(**ucs.result)
+    module.exit_json(**ucs.result)
+
+
+if __name__ == '__main__':
+    main()
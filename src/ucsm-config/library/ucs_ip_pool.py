@@ -101,6 +101,12 @@ options:
     description:
     - Org dn (distinguished name)
     default: org-root
+  overlap_check:
+    description:
+    - If C(yes), new IPv4 and IPv6 blocks are checked against the blocks of every IP pool, read with one class query,
+      before anything is committed, and the module fails if they would share identities.
+    type: bool
+    default: 'yes'
 requirements:
 - ucsmsdk
 author:
@@ -201,9 +207,9 @@ def update_ip_pool(ucs, module):
     return mo
 
 
-def match_existing_ipv4_block(ucs, dn, ipv4_block):
+def match_existing_ipv4_block(subtree, dn, ipv4_block):
     # ipv4 block specified, check properties
-    mo_1 = get_ip_block(ucs, dn, ipv4_block['first_addr'], ipv4_block['last_addr'], 'v4')
+    mo_1 = get_ip_block(subtree, dn, ipv4_block['first_addr'], ipv4_block['last_addr'], 'v4')
     if not mo_1:
         if ipv4_block['state'] == 'absent':
             return True
@@ -218,9 +224,9 @@ def match_existing_ipv4_block(ucs, dn, ipv4_block):
         return mo_1.check_prop_match(**kwargs)
 
 
-def match_existing_ipv6_block(ucs, dn, ipv6_block):
+def match_existing_ipv6_block(subtree, dn, ipv6_block):
     # ipv6 block specified, check properties
-    mo_1 = get_ip_block(ucs, dn, ipv6_block['ipv6_first_addr'], ipv6_block['ipv6_last_addr'], 'v6')
+    mo_1 = get_ip_block(subtree, dn, ipv6_block['ipv6_first_addr'], ipv6_block['ipv6_last_addr'], 'v6')
     if not mo_1:
         if ipv6_block['state'] == 'absent':
             return True
@@ -235,7 +241,7 @@ def match_existing_ipv6_block(ucs, dn, ipv6_block):
         return mo_1.check_prop_match(**kwargs)
 
 
-def remove_ip_block(ucs, dn, ip_block, ip_version):
+def remove_ip_block(ucs, subtree, dn, ip_block, ip_version):
     if ip_version == 'v6':
         first_addr = ip_block['ipv6_first_addr']
         last_addr = ip_block['ipv6_last_addr']
@@ -243,15 +249,15 @@ def remove_ip_block(ucs, dn, ip_block, ip_version):
         first_addr = ip_block['first_addr']
         last_addr = ip_block['last_addr']
 
-    mo_1 = get_ip_block(ucs, dn, first_addr, last_addr, ip_version)
+    mo_1 = get_ip_block(subtree, dn, first_addr, last_addr, ip_version)
     if mo_1:
         ucs.login_handle.remove_mo(mo_1)
         ucs.login_handle.commit()
 
 
-def update_ip_block(ucs, mo, ip_block, ip_version):
+def update_ip_block(ucs, subtree, mo, ip_block, ip_version):
 
-    remove_ip_block(ucs, mo.dn, ip_block, ip_version)
+    remove_ip_block(ucs, subtree, mo.dn, ip_block, ip_version)
     if not ip_block['state'] == 'absent':
         if ip_version == 'v6':
             from ucsmsdk.mometa.ippool.IppoolIpV6Block import IppoolIpV6Block
@@ -279,19 +285,34 @@ def update_ip_block(ucs, mo, ip_block, ip_version):
             ucs.login_handle.commit()
 
 
-def get_ip_block(ucs, pool_dn, first_addr, last_addr, ip_version):
+def get_ip_block(subtree, pool_dn, first_addr, last_addr, ip_version):
     if ip_version == 'v6':
         dn_type = '/v6block-'
     else:
         dn_type = '/block-'
 
     block_dn = pool_dn + dn_type + first_addr + '-' + last_addr
-    return ucs.login_handle.query_dn(block_dn)
+    return subtree.query_dn(block_dn)
+
+
+def check_new_blocks(ucs, module, subtree, dn):
+    from ansible.module_utils.remote_management.ucs_identity import check_block_overlaps
+
+    # only blocks that do not exist yet add identities
+    for ip_version, kind, blocks_key, first_key, last_key in [('v4', 'ipv4', 'ipv4_blocks', 'first_addr', 'last_addr'),
+                                                              ('v6', 'ipv6', 'ipv6_blocks', 'ipv6_first_addr', 'ipv6_last_addr')]:
+        blocks = [block for block in module.params[blocks_key] or [] if block['state'] == 'present']
+        if module.params[first_key] and module.params[last_key]:
+            blocks.append(module.params)
+        new_blocks = [(block[first_key], block[last_key]) for block in blocks
+                      if not get_ip_block(subtree, dn, block[first_key], block[last_key], ip_version)]
+        if new_blocks:
+            check_block_overlaps(ucs.login_handle, kind, dn, new_blocks)
 
 
 def main():
     from ansible.module_utils.basic import AnsibleModule
-    from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+    from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 
     ipv4_configuration_spec = dict(
         first_addr=dict(type='str'),
@@ -333,6 +354,7 @@ def main():
         state=dict(type='str', default='present', choices=['present', 'absent']),
         ipv4_blocks=dict(type='list', default=None, elements='dict', options=ipv4_configuration_spec),
         ipv6_blocks=dict(type='list', default=None, elements='dict', options=ipv6_configuration_spec),
+        overlap_check=dict(type='bool', default=True),
     )
 
     module = AnsibleModule(
@@ -366,7 +388,9 @@ def main():
         if module.params['ipv6_blocks'] and module.params['ipv6_first_addr']:
             raise Exception("Cannot use ipv6_blocks with ipv6_first_addr and ipv6_last_addr arguments")
 
-        mo = ucs.login_handle.query_dn(dn)
+        # pool and all ipv4/ipv6 blocks are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
         if mo:
             mo_exists = True
         if module.params['state'] == 'absent':
@@ -376,6 +400,8 @@ def main():
                     ucs.login_handle.commit()
                 changed = True
         else:
+            if module.params['overlap_check']:
+                check_new_blocks(ucs, module, subtree, dn)
             if not mo_exists:
                 if not module.check_mode:
                     mo = update_ip_pool(ucs, module)
@@ -391,13 +417,13 @@ def main():
                     # top-level props match, check next level mo/props
             if module.params['ipv4_blocks']:
                 for ipv4_block in module.params['ipv4_blocks']:
-                    if not match_existing_ipv4_block(ucs, dn, ipv4_block):
+                    if not match_existing_ipv4_block(subtree, dn, ipv4_block):
                         if not module.check_mode:
-                            update_ip_block(ucs, mo, ipv4_block, 'v4')
+                            update_ip_block(ucs, subtree, mo, ipv4_block, 'v4')
                         changed = True
             elif module.params['last_addr'] and module.params['first_addr']:
                 # ipv4 block specified, check properties
-                mo_1 = get_ip_block(ucs, dn, module.params['first_addr'], module.params['last_addr'], 'v4')
+                mo_1 = get_ip_block(subtree, dn, module.params['first_addr'], module.params['last_addr'], 'v4')
                 if mo_1:
                     kwargs = dict(subnet=module.params['subnet_mask'])
                     kwargs['def_gw'] = module.params['default_gw']
@@ -412,15 +438,15 @@ def main():
             # only check ipv6 props if the top-level and ipv4 props matched
             if module.params['ipv6_blocks']:
                 for ipv6_block in module.params['ipv6_blocks']:
-                    if not match_existing_ipv6_block(ucs, dn, ipv6_block):
+                    if not match_existing_ipv6_block(subtree, dn, ipv6_block):
                         if not module.check_mode:
-                            update_ip_block(ucs, mo, ipv6_block, 'v6')
+                            update_ip_block(ucs, subtree, mo, ipv6_block, 'v6')
                         changed = True
             elif module.params['ipv6_last_addr'] and module.params['ipv6_first_addr']:
                 # ipv6 block specified, check properties
                 block_dn = dn + '/v6block-' + module.params['ipv6_first_addr'].lower() + '-' + module.params[
                     'ipv6_last_addr'].lower()
-                mo_1 = ucs.login_handle.query_dn(block_dn)
+                mo_1 = subtree.query_dn(block_dn)
                 if mo_1:
                     kwargs = dict(prefix=module.params['ipv6_prefix'])
                     kwargs['def_gw'] = module.params['ipv6_default_gw']
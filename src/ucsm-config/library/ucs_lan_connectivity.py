@@ -96,7 +96,7 @@ RETURN = r'''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 
 
 def main():
@@ -129,7 +129,9 @@ def main():
         # dn is <org_dn>/lan-conn-pol-<name>
         dn = module.params['org_dn'] + '/lan-conn-pol-' + module.params['name']
 
-        mo = ucs.login_handle.query_dn(dn)
+        # policy and vnics are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
         if mo:
             mo_exists = True
 
@@ -159,7 +161,7 @@ def main():
                         # check vnicEther props
                         for vnic in module.params['vnic_list']:
                             child_dn = dn + '/ether-' + vnic['name']
-                            mo_1 = ucs.login_handle.query_dn(child_dn)
+                            mo_1 = subtree.query_dn(child_dn)
                             if mo_1:
                                 kwargs = dict(adaptor_profile_name=vnic['adapter_policy'])
                                 kwargs['order'] = vnic['order']
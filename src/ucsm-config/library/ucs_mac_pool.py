@@ -59,6 +59,12 @@ options:
     description:
     - The distinguished name (dn) of the organization where the resource is assigned.
     default: org-root
+  overlap_check:
+    description:
+    - If C(yes), new MAC address blocks are checked against the blocks of every MAC pool, read with one class query,
+      before anything is committed, and the module fails if they would share identities.
+    type: bool
+    default: 'yes'
 requirements:
 - ucsmsdk
 author:
@@ -92,7 +98,8 @@ RETURN = r'''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_identity import check_block_overlaps
 
 
 def main():
@@ -104,6 +111,7 @@ def main():
         order=dict(type='str', default='default', choices=['default', 'sequential']),
         first_addr=dict(type='str'),
         last_addr=dict(type='str'),
+        overlap_check=dict(type='bool', default=True),
         state=dict(default='present', choices=['present', 'absent'], type='str'),
     )
     module = AnsibleModule(
@@ -124,7 +132,9 @@ def main():
         props_match = False
         # dn is <org_dn>/mac-pool-<name>
         dn = module.params['org_dn'] + '/mac-pool-' + module.params['name']
-        mo = ucs.login_handle.query_dn(dn)
+        # pool and address blocks are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
         if mo:
             mo_exists = True
 
@@ -144,7 +154,7 @@ def main():
                     if module.params['last_addr'] and module.params['first_addr']:
                         # mac address block specified, check properties
                         block_dn = dn + '/block-' + module.params['first_addr'].upper() + '-' + module.params['last_addr'].upper()
-                        mo_1 = ucs.login_handle.query_dn(block_dn)
+                        mo_1 = subtree.query_dn(block_dn)
                         if mo_1:
                             props_match = True
                     else:
@@ -152,6 +162,8 @@ def main():
                         props_match = True
 
             if not props_match:
+                if module.params['overlap_check'] and module.params['last_addr'] and module.params['first_addr']:
+                    check_block_overlaps(ucs.login_handle, 'mac', dn, [(module.params['first_addr'], module.params['last_addr'])])
                 if not module.check_mode:
                     # create if mo does not already exist
                     mo = MacpoolPool(
@@ -35,6 +35,30 @@ options:
     description:
     - 'Filename (absolute path) of a JSON configuration file.  The JSON file should have the same fields described in the objects option.'
     - Either objects or json_config_file must be specified.
+    - The objects array of the file is parsed one top-level object at a time, so without batch or concurrency
+      only the object being applied is held in memory.
+  batch:
+    description:
+    - If C(yes), the existing subtree of each top-level object is read with one hierarchical query and compared locally.
+    - All adds, modifications and removals for every object in the list are then sent to UCS Manager in a single commit.
+    - If C(no), each object in the tree is queried and committed separately.
+    type: bool
+    default: no
+  concurrency:
+    description:
+    - Number of UCS Manager sessions used to apply the top-level objects in parallel.
+    - Each top-level object is read, compared and committed as in batch mode, on its own session.
+    - A top-level object is only applied once the top-level objects it depends on have been applied.
+    - Dependencies are found from dn containment (for example an org before the policies inside of it) and from
+      properties naming other objects in the list (for example ident_pool_name, boot_policy_name or src_templ_name).
+    - 'Additional ordering can be given with an optional "depends_on" list of dns in a top-level object.'
+    - With C(state=absent) the order is reversed.
+    - If C(1), objects are applied one after another on the module's own session.
+    - The sessions are held by forked worker processes.  Where processes can't be forked, the objects are applied one
+      after another on a single extra session.
+    - An object that takes more than 600 seconds fails, and the objects not applied yet fail with it.
+    type: int
+    default: 1
 requirements:
 - ucsmsdk
 author:
@@ -131,6 +155,38 @@ EXAMPLES = r'''
     username: admin
     password: password
     json_config_file: /ucs-config/python/ucsm/boot_policy.json
+
+- name: Configure a large JSON configuration file in a single commit
+  ucs_managed_objects:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    json_config_file: /ucs-config/python/ucsm/domain.json
+    batch: yes
+
+- name: Configure pools in parallel and the template using them afterwards
+  ucs_managed_objects:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    concurrency: 4
+    objects:
+    - module: ucsmsdk.mometa.macpool.MacpoolPool
+      class: MacpoolPool
+      properties:
+        parent_mo_or_dn: org-root
+        name: mac-A
+    - module: ucsmsdk.mometa.uuidpool.UuidpoolPool
+      class: UuidpoolPool
+      properties:
+        parent_mo_or_dn: org-root
+        name: uuid-pool
+    - module: ucsmsdk.mometa.vnic.VnicLanConnTempl
+      class: VnicLanConnTempl
+      properties:
+        parent_mo_or_dn: org-root
+        name: vnic-A
+        ident_pool_name: mac-A
 '''
 
 RETURN = r'''
@@ -138,22 +194,117 @@ RETURN = r'''
 '''
 
 from importlib import import_module
-from copy import deepcopy
 import json
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_planner import UCSPlanner
+from ansible.module_utils.remote_management.ucs_pool import UCSSessionPool
+
+
+# (module, class) to ucsmsdk class, resolved once per module run
+MO_CLASSES = {}
+
+# size of the reads from json_config_file
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def mo_class_for(managed_object):
+    key = (managed_object['module'], managed_object['class'])
+    if key not in MO_CLASSES:
+        MO_CLASSES[key] = getattr(import_module(key[0]), key[1])
+    return MO_CLASSES[key]
+
+
+def iter_config_objects(path, chunk_size=JSON_CHUNK_SIZE):
+    """Yields the elements of the top-level objects array of a JSON file one at a time.
+
+    The file is read in chunks and each element is decoded as soon as it is
+    complete, so memory is bounded by the largest top-level object instead of
+    the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+
+        def more(buf, size):
+            data = f.read(size)
+            if not data:
+                return buf, True
+            return buf + data, False
+
+        # find the objects key of the top-level JSON object, skipping strings and nested values
+        pos = 0
+        depth = 0
+        key = None
+        while True:
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError('%s has no objects array' % path)
+                buf, eof = more(buf[pos:], chunk_size)
+                pos = 0
+                continue
+            char = buf[pos]
+            if char == '"':
+                try:
+                    value, end = json.decoder.scanstring(buf, pos + 1)
+                except ValueError:
+                    if eof:
+                        raise
+                    buf, eof = more(buf[pos:], chunk_size)
+                    pos = 0
+                    continue
+                key = value if depth == 1 else None
+                pos = end
+                continue
+            if char in '{[':
+                if depth == 1 and char == '[' and key == 'objects':
+                    pos += 1
+                    break
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+            elif char not in ': \t\r\n':
+                key = None
+            pos += 1
+
+        # decode the array elements one by one
+        read_size = chunk_size
+        while True:
+            while pos < len(buf) and buf[pos] in ', \t\r\n':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError('need more data')
+                managed_object, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError('%s ends inside the objects array' % path)
+                # the element is incomplete, read more (growing reads keep large elements linear)
+                buf, eof = more(buf[pos:], read_size)
+                read_size *= 2
+                pos = 0
+                continue
+            read_size = chunk_size
+            yield managed_object
+            buf = buf[end:]
+            pos = 0
 
 
 def traverse_objects(module, ucs, managed_object, mo=''):
     props_match = False
 
-    mo_module = import_module(managed_object['module'])
-    mo_class = getattr(mo_module, managed_object['class'])
+    mo_class = mo_class_for(managed_object)
 
-    if not managed_object['properties'].get('parent_mo_or_dn'):
-        managed_object['properties']['parent_mo_or_dn'] = mo
+    # the properties are not changed, so children are traversed without copying them
+    kwargs = dict(managed_object['properties'])
+    if not kwargs.get('parent_mo_or_dn'):
+        kwargs['parent_mo_or_dn'] = mo
 
-    mo = mo_class(**managed_object['properties'])
+    mo = mo_class(**kwargs)
+    kwargs.pop('parent_mo_or_dn')
 
     existing_mo = ucs.login_handle.query_dn(mo.dn)
 
@@ -167,8 +318,6 @@ def traverse_objects(module, ucs, managed_object, mo=''):
     else:
         if existing_mo:
             # check mo props
-            kwargs = dict(managed_object['properties'])
-            kwargs.pop('parent_mo_or_dn', None)
             if existing_mo.check_prop_match(**kwargs):
                 props_match = True
 
@@ -178,11 +327,83 @@ def traverse_objects(module, ucs, managed_object, mo=''):
                 ucs.login_handle.commit()
             ucs.result['changed'] = True
 
-    if managed_object.get('children'):
-        for child in managed_object['children']:
-            # explicit deep copy of child object since traverse_objects may modify parent mo information
-            copy_of_child = deepcopy(child)
-            traverse_objects(module, ucs, copy_of_child, mo)
+    for child in managed_object.get('children') or []:
+        traverse_objects(module, ucs, child, mo)
+
+
+def flatten_objects(managed_object, parent_dn=''):
+    # returns (mo, properties) for the object and all children with parents listed before their children.
+    # mos are created detached from each other so that each one can be committed on its own.
+    nodes = []
+    stack = [(managed_object, parent_dn)]
+    while stack:
+        node, node_parent_dn = stack.pop()
+        kwargs = dict(node['properties'])
+        if not kwargs.get('parent_mo_or_dn'):
+            kwargs['parent_mo_or_dn'] = node_parent_dn
+        mo = mo_class_for(node)(**kwargs)
+        kwargs.pop('parent_mo_or_dn')
+        nodes.append((mo, kwargs))
+        # children are pushed in reverse so that they come out in file order
+        for child in reversed(node.get('children') or []):
+            stack.append((child, mo.dn))
+    return nodes
+
+
+def batch_objects(login_handle, managed_object, state, check_mode):
+    changed = False
+    nodes = flatten_objects(managed_object)
+
+    # one hierarchical query returns the existing mo and everything below it
+    subtree = UCSSubtree(login_handle, nodes[0][0].dn)
+
+    removed_dns = []
+    for mo, kwargs in nodes:
+        existing_mo = subtree.query_dn(mo.dn)
+
+        if state == 'absent':
+            # removing a parent also removes all of its children
+            if not existing_mo or [dn for dn in removed_dns if mo.dn.startswith(dn + '/')]:
+                continue
+            removed_dns.append(mo.dn)
+            if not check_mode:
+                login_handle.remove_mo(existing_mo)
+            changed = True
+        else:
+            if existing_mo and existing_mo.check_prop_match(**kwargs):
+                continue
+            if not check_mode:
+                login_handle.add_mo(mo, modify_present=True)
+            changed = True
+
+    return changed
+
+
+def concurrent_tasks(objects, state, check_mode):
+    # one session pool task per top-level object, keyed by dn
+    planner = UCSPlanner(objects)
+    # objects are removed in the reverse of the order they are created in
+    reverse = state == 'absent'
+    # fails on dependency cycles before anything is applied
+    planner.waves(reverse)
+    depends_on = planner.dependencies(reverse)
+
+    tasks = []
+    for managed_object, dn in zip(objects, planner.dns):
+        tasks.append(dict(
+            key=dn,
+            depends_on=sorted(depends_on[dn]),
+            payload=dict(managed_object=managed_object, state=state, check_mode=check_mode),
+        ))
+    return tasks
+
+
+def apply_object(login_handle, payload):
+    # runs in a session pool worker, each top-level object is committed on the worker's own session
+    changed = batch_objects(login_handle, payload['managed_object'], payload['state'], payload['check_mode'])
+    if changed and not payload['check_mode']:
+        login_handle.commit()
+    return changed
 
 
 def main():
@@ -191,6 +412,8 @@ def main():
         objects=dict(type='list'),
         json_config_file=dict(type='str'),
         state=dict(type='str', choices=['present', 'absent'], default='present'),
+        batch=dict(type='bool', default=False),
+        concurrency=dict(type='int', default=1),
     )
 
     module = AnsibleModule(
@@ -213,11 +436,33 @@ def main():
             objects = module.params['objects']
         else:
             # either objects or json_config_file will be specified, so if there is no objects option use a config file
-            with open(module.params['json_config_file']) as f:
-                objects = json.load(f)['objects']
+            objects = iter_config_objects(module.params['json_config_file'])
 
-        for managed_object in objects:
-            traverse_objects(module, ucs, managed_object)
+        if module.params['concurrency'] > 1:
+            # the planner needs every object to order them
+            objects = list(objects)
+            tasks = concurrent_tasks(objects, module.params['state'], module.check_mode)
+            with UCSSessionPool(module.params, module.params['concurrency']) as pool:
+                results = pool.run(apply_object, tasks)
+            errors = []
+            for task in tasks:
+                applied, result = results[task['key']]
+                if not applied:
+                    errors.append('%s: %s' % (task['key'], result))
+                elif result:
+                    ucs.result['changed'] = True
+            if errors:
+                raise Exception('; '.join(errors))
+        elif module.params['batch']:
+            # every object is added to the commit buffer and sent in a single configConfMos request
+            for managed_object in objects:
+                if batch_objects(ucs.login_handle, managed_object, module.params['state'], module.check_mode):
+                    ucs.result['changed'] = True
+            if ucs.result['changed'] and not module.check_mode:
+                ucs.login_handle.commit()
+        else:
+            for managed_object in objects:
+                traverse_objects(module, ucs, managed_object)
 
     except Exception as e:
         err = True
@@ -0,0 +1,242 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_pending_activities
+short_description: Acknowledges pending activities of service profiles on Cisco UCS Manager in waves
+description:
+- Acknowledges the pending activities (LsmaintAck) that changes to service profiles with a user-ack maintenance policy
+  leave on Cisco UCS Manager, see ucs_server_maintenance.
+- The pending activities are listed with one configResolveClass.  They are acknowledged in waves of I(wave_size)
+  service profiles, one commit per wave, and every wave has to finish before the next one starts, so no more than
+  I(wave_size) servers reboot at the same time.
+- A wave is finished when the pending activities of its profiles are gone and the profiles are associated and have
+  their configuration applied.  The profiles of a wave are read with one configResolveDns per check, checks follow
+  change events on the UCSM event channel or an exponential backoff of 2 to 60 seconds.
+- The association and configuration state of the profiles is recorded when the wave is acknowledged.  A profile only
+  counts as applied after its state moved away from the recorded one or its pending activity was seen running, so the
+  state from before the reboot does not finish a wave.
+- Once a wave fails or times out, the remaining waves are not acknowledged.
+- Examples can be used with the UCS Platform Emulator U(https://communities.cisco.com/ucspe).
+extends_documentation_fragment: ucs
+options:
+  org_dn:
+    description:
+    - Only pending activities of service profiles in this org and its sub-orgs are acknowledged.
+    default: org-root
+  service_profiles:
+    description:
+    - Names of the service profiles whose pending activities are acknowledged, in this order.
+    - The names are of service profiles directly in I(org_dn), profiles of the same name in its sub-orgs are left alone.
+    - By default the pending activities of all service profiles in I(org_dn) are acknowledged, ordered by dn.
+    type: list
+  wave_size:
+    description:
+    - Number of service profiles acknowledged at the same time.
+    type: int
+    default: 5
+  wait_timeout:
+    description:
+    - Seconds a wave may take to finish.
+    type: int
+    default: 1800
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.6'
+'''
+
+EXAMPLES = r'''
+- name: Acknowledge the reboots of the OpenShift nodes, ten servers at a time
+  ucs_pending_activities:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    wave_size: 10
+
+- name: List the pending activities
+  ucs_pending_activities:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+  check_mode: yes
+  register: pending
+'''
+
+RETURN = r'''
+nodes:
+  description:
+  - Name, dn, wave, status and the seconds until the wave the service profile was in finished, for each service profile
+    with a pending activity.
+  - status is C(pending) in check mode, C(applied), C(failed), C(timeout), or C(skipped) for profiles in waves after a
+    wave that did not finish.
+  returned: success
+  type: list
+  sample: [{"name": "app1", "dn": "org-root/ls-app1", "wave": 1, "status": "applied", "seconds": 412.7}]
+waves:
+  description: Number of waves acknowledged.
+  returned: success
+  type: int
+  sample: 10
+elapsed:
+  description: Seconds the module spent acknowledging and waiting.
+  returned: success
+  type: float
+  sample: 4127.3
+'''
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSStateWatch, query_classid_by_dn_prefix, ucs_argument_spec
+
+# oper_state of a pending activity that waits for the acknowledgement
+WAITING_STATES = ['waiting-for-user']
+
+# oper_state of an acknowledged activity that UCSM is working on
+RUNNING_STATES = ['pending', 'apply-pending', 'active', 'evaluation-pending', 'waiting-for-dependency']
+
+# oper_state of an acknowledged activity that is not done yet
+ACTIVE_STATES = WAITING_STATES + RUNNING_STATES + ['evaluated', 'untriggered']
+
+
+def pending_nodes(login_handle, org_dn, names):
+    acks = query_classid_by_dn_prefix(login_handle, 'LsmaintAck', org_dn + '/')
+    nodes = {}
+    for dn, mo in acks.items():
+        if mo.oper_state not in WAITING_STATES:
+            continue
+        ls_dn = dn[:len(dn) - len(mo.rn)].rstrip('/')
+        name = ls_dn.rsplit('/', 1)[-1][len('ls-'):]
+        nodes[ls_dn] = dict(name=name, dn=ls_dn, ack_dn=dn)
+    if names:
+        # sub-orgs can have profiles of the same name, names are of the profiles in org_dn
+        ls_dns = [org_dn + '/ls-' + name for name in names]
+        return [nodes[ls_dn] for ls_dn in ls_dns if ls_dn in nodes]
+    return [nodes[dn] for dn in sorted(nodes)]
+
+
+def node_state(node, ls_mo, ack_mo):
+    if ls_mo is None or ls_mo.assoc_state == 'failed' or ls_mo.config_state == 'failed-to-apply':
+        return 'failed'
+    # the profile has to be seen changing, its state from before the acknowledgement does not count
+    if (ls_mo.assoc_state, ls_mo.config_state) != node['committed_state'] or \
+            (ack_mo is not None and ack_mo.oper_state in RUNNING_STATES):
+        node['transition'] = True
+    if ack_mo is not None and ack_mo.oper_state in ACTIVE_STATES:
+        return None
+    if node['transition'] and ls_mo.assoc_state == 'associated' and ls_mo.config_state == 'applied':
+        return 'applied'
+    return None
+
+
+def run_wave(login_handle, watch, wave, timeout):
+    from ucsmsdk.mometa.lsmaint.LsmaintAck import LsmaintAck
+
+    # the state of the profiles before the acknowledgement, to tell a finished reboot from one that did not start
+    mos = login_handle.query_dns(*[node['dn'] for node in wave])
+    for node in wave:
+        ls_mo = mos.get(node['dn'])
+        node['committed_state'] = (ls_mo.assoc_state, ls_mo.config_state) if ls_mo else None
+        node['transition'] = False
+
+    start = time.time()
+    # the pending activities of a wave are acknowledged in one commit
+    for node in wave:
+        login_handle.add_mo(LsmaintAck(parent_mo_or_dn=node['dn'], admin_state='trigger-immediate'), True)
+    login_handle.commit()
+    watch.reset()
+
+    waiting = dict((node['dn'], node) for node in wave)
+    while waiting:
+        watch.wait(start + timeout - time.time())
+        mos = login_handle.query_dns(*([dn for dn in waiting] + [node['ack_dn'] for node in waiting.values()]))
+        now = time.time()
+        for dn, node in list(waiting.items()):
+            state = node_state(node, mos.get(dn), mos.get(node['ack_dn']))
+            if state is None and now - start < timeout:
+                continue
+            node['status'] = state or 'timeout'
+            node['seconds'] = round(now - start, 1)
+            del waiting[dn]
+    for node in wave:
+        node.pop('committed_state')
+        node.pop('transition')
+    return all(node['status'] == 'applied' for node in wave)
+
+
+def main():
+    argument_spec = ucs_argument_spec
+    argument_spec.update(
+        org_dn=dict(type='str', default='org-root'),
+        service_profiles=dict(type='list'),
+        wave_size=dict(type='int', default=5),
+        wait_timeout=dict(type='int', default=1800),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+    )
+    ucs = UCSModule(module)
+
+    err = False
+    changed = False
+
+    try:
+        nodes = pending_nodes(ucs.login_handle, module.params['org_dn'], module.params['service_profiles'])
+        wave_size = max(1, module.params['wave_size'])
+        waves = [nodes[index:index + wave_size] for index in range(0, len(nodes), wave_size)]
+        for number, wave in enumerate(waves, 1):
+            for node in wave:
+                node.update(wave=number, status='pending', seconds=None)
+
+        start = time.time()
+        ucs.result['waves'] = 0
+        if waves and not module.check_mode:
+            changed = True
+            watch = UCSStateWatch(ucs.login_handle, ['LsServer', 'LsmaintAck'], module.params['wait_timeout'] * len(waves))
+            try:
+                for wave in waves:
+                    ucs.result['waves'] += 1
+                    if not run_wave(ucs.login_handle, watch, wave, module.params['wait_timeout']):
+                        # capacity stays predictable, a wave that did not come back stops the rollout
+                        err = True
+                        break
+            finally:
+                watch.close()
+            for node in nodes:
+                if node['status'] == 'pending':
+                    node['status'] = 'skipped'
+        ucs.result['elapsed'] = round(time.time() - start, 1)
+        for node in nodes:
+            node.pop('ack_dn')
+        ucs.result['nodes'] = nodes
+        if err:
+            ucs.result['msg'] = "wave %d did not finish: %s" % (ucs.result['waves'], ', '.join(
+                '%s %s' % (node['name'], node['status']) for node in waves[ucs.result['waves'] - 1]
+                if node['status'] != 'applied'))
+
+    except Exception as e:
+        err = True
+        ucs.result['msg'] = "setup error: %s " % str(e)
+
+    ucs.result['changed'] = changed
+    if err:
+        module.fail_json(**ucs.result)
+    module.exit_json(**ucs.result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_plan
+short_description: Orders Cisco UCS Manager policy objects into waves that can be applied in parallel
+description:
+- Builds a dependency graph of managed objects and sorts it into waves.
+- The objects are given in the format used by ucs_managed_objects, or as the roles they are configured by.  Roles are
+  rendered with their vars and compiled offline like ucs_compiler does, the objects their tasks would commit are planned.
+- Every object in a wave only depends on objects in earlier waves, so the objects of one wave can be applied in parallel.
+- An object depends on the objects whose dn contains its own dn, on the objects named by properties anywhere in its tree
+  (for example ident_pool_name, boot_policy_name, src_templ_name or the server pool of an LsRequirement child),
+  and on the dns in its optional depends_on list.
+- Planning is done locally and does not connect to UCS Manager.
+options:
+  objects:
+    description:
+    - List of managed objects as described in ucs_managed_objects.
+    - One of objects, json_config_file or roles must be specified.
+  json_config_file:
+    description:
+    - Filename (absolute path) of a JSON configuration file with an objects list.
+    - One of objects, json_config_file or roles must be specified.
+  roles:
+    description:
+    - Names of roles in I(roles_dir), e.g. C(network) and C(server), whose objects are planned.
+    - The objects of tasks that need UCS Manager to run, e.g. associations, are left out and listed in C(skipped).
+    - One of objects, json_config_file or roles must be specified.
+    type: list
+  roles_dir:
+    description:
+    - Directory with the roles.
+    type: path
+    default: roles
+  library:
+    description:
+    - Directories with the UCS modules the tasks of the roles use.
+    type: list
+    default: [library]
+  extra_vars:
+    description:
+    - Vars the role tasks are rendered with on top of the role vars, e.g. C(ucs_ip) or host vars.
+    type: dict
+  state:
+    description:
+    - If C(present), waves are ordered for creating the objects.
+    - If C(absent), waves are ordered for removing the objects, which is the reverse order.
+    choices: [present, absent]
+    default: present
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.6'
+'''
+
+EXAMPLES = r'''
+- name: Plan pools, templates and service profiles
+  ucs_plan:
+    objects: "{{ ucs_objects }}"
+  register: plan
+
+- name: Plan the objects of the network, storage and server roles from their role vars
+  ucs_plan:
+    roles: [network, storage, server]
+    roles_dir: "{{ playbook_dir }}/roles"
+    library: ["{{ playbook_dir }}/library"]
+  register: plan
+
+- name: Apply each wave in parallel
+  ucs_managed_objects:
+    hostname: "{{ ucs_ip }}"
+    username: "{{ ucs_username }}"
+    password: "{{ ucs_password }}"
+    objects: "{{ ucs_objects }}"
+    concurrency: 4
+'''
+
+RETURN = r'''
+waves:
+    description: Lists of top-level dns, each list only depends on the lists before it.
+    returned: success
+    type: list
+    sample: [["org-root/mac-pool-mac-A", "org-root/uuid-pool-uuid"], ["org-root/lan-conn-templ-vnic-A"]]
+dependencies:
+    description: Top-level dn mapped to the dns it has to be applied after.
+    returned: success
+    type: dict
+    sample: {"org-root/lan-conn-templ-vnic-A": ["org-root/mac-pool-mac-A"], "org-root/mac-pool-mac-A": []}
+skipped:
+    description: Role tasks that could not be compiled without UCS Manager, their objects are not in the plan.
+    returned: when roles is used
+    type: list
+    sample: ["server: ucs_service_profile_association (Associate service profiles): ..."]
+'''
+
+import json
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import HAS_UCSMSDK
+from ansible.module_utils.remote_management.ucs_planner import UCSPlanner
+
+
+def role_planner(module, result):
+    from ansible.module_utils.remote_management.ucs_compiler import UCSCompiler
+
+    compiler = UCSCompiler(module.params['library'], module.params['extra_vars'])
+    for role in module.params['roles']:
+        compiler.compile_role(os.path.join(module.params['roles_dir'], role))
+    result['skipped'] = compiler.errors
+    return UCSPlanner.from_plan(compiler.plan)
+
+
+def main():
+    argument_spec = dict(
+        objects=dict(type='list'),
+        json_config_file=dict(type='str'),
+        roles=dict(type='list'),
+        roles_dir=dict(type='path', default='roles'),
+        library=dict(type='list', default=['library']),
+        extra_vars=dict(type='dict'),
+        state=dict(type='str', choices=['present', 'absent'], default='present'),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+        required_one_of=[
+            ['objects', 'json_config_file', 'roles'],
+        ],
+        mutually_exclusive=[
+            ['objects', 'json_config_file', 'roles'],
+        ],
+    )
+    if not HAS_UCSMSDK:
+        module.fail_json(msg='ucsmsdk is required for this module')
+
+    result = dict(changed=False)
+    err = False
+    try:
+        if module.params.get('roles'):
+            planner = role_planner(module, result)
+        elif module.params.get('objects'):
+            planner = UCSPlanner(module.params['objects'])
+        else:
+            with open(module.params['json_config_file']) as f:
+                planner = UCSPlanner(json.load(f)['objects'])
+
+        reverse = module.params['state'] == 'absent'
+        result['waves'] = planner.waves(reverse)
+        dependencies = planner.dependencies(reverse)
+        result['dependencies'] = dict((dn, sorted(deps)) for dn, deps in dependencies.items())
+
+    except Exception as e:
+        err = True
+        result['msg'] = "setup error: %s " % str(e)
+
+    if err:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
@@ -59,6 +59,22 @@ options:
     description:
     - The distinguished name (dn) of the organization where the resource is assigned.
     default: org-root
+  wait_for:
+    description:
+    - Wait until the service profile Association State (assoc_state) is C(associated) or C(unassociated) before returning.
+    - Changes of the service profile are watched on the UCS Manager event channel, so the module returns as soon as the state is reached.
+    - The service profile is also re-read with exponential backoff, which is the only check used when the event channel is not available.
+    - With C(associated) and a server_dn, the service profile also has to be associated with that server, so the state
+      of an earlier binding does not end the wait.
+    - After a change, the association state or server of the service profile also has to be seen changing, e.g. to
+      another server of server_pool_name, so the state from before the change does not end the wait.
+    - The module fails if the state is not reached within wait_timeout seconds or if association fails.
+    - Ignored in check mode.
+    choices: [associated, unassociated]
+  wait_timeout:
+    description:
+    - Seconds to wait for the wait_for state.
+    default: 600
 requirements:
 - ucsmsdk
 author:
@@ -78,7 +94,7 @@ EXAMPLES = r'''
     server_pool_name: Container-Pool
     restrict_migration: 'yes'
 
-- name: Attempt to change association once a minute for up to 10 minutes
+- name: Change association and wait up to 10 minutes for the service profile to be associated
   ucs_service_profile_association:
     hostname: 172.16.143.150
     username: admin
@@ -86,10 +102,8 @@ EXAMPLES = r'''
     service_profile_name: test-sp
     server_assignment: server
     server_dn: sys/chassis-2/blade-1
-  register: result
-  until: result.assign_state == 'assigned' and result.assoc_state == 'associated'
-  retries: 10
-  delay: 60
+    wait_for: associated
+    wait_timeout: 600
 
 - name: Disassociate Service Profile
   ucs_service_profile_association:
@@ -111,10 +125,16 @@ assoc_state:
   returned: success
   type: string
   sample: associated
+wait_time:
+  description: Seconds spent waiting for the wait_for state.
+  returned: when wait_for is specified and not in check mode
+  type: float
+  sample: 212.4
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+import time
+from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec, wait_for_mo_state
 
 
 def main():
@@ -127,6 +147,8 @@ def main():
         server_pool_name=dict(type='str'),
         restrict_migration=dict(type='str', default='no', choices=['yes', 'no']),
         state=dict(default='present', choices=['present', 'absent'], type='str'),
+        wait_for=dict(type='str', choices=['associated', 'unassociated']),
+        wait_timeout=dict(type='int', default=600),
     )
     module = AnsibleModule(
         argument_spec,
@@ -157,6 +179,8 @@ def main():
         pn_mo_exists = False
         pn_req_mo_exists = False
         props_match = False
+        # association of the profile before a change, the wait has to see it change
+        since = None
 
         # logical server distinguished name is <org>/ls-<name> and physical node dn appends 'pn' or 'pn-req'
         ls_dn = module.params['org_dn'] + '/ls-' + module.params['service_profile_name']
@@ -203,6 +227,7 @@ def main():
 
             if not props_match:
                 if not module.check_mode:
+                    since = dict(pn_dn=ls_mo.pn_dn, assoc_state=ls_mo.assoc_state)
                     # create if mo does not already exist in desired state
                     mo = LsServer(
                         parent_mo_or_dn=module.params['org_dn'],
@@ -239,6 +264,33 @@ def main():
                         ucs.result['assoc_state'] = ls_mo.assoc_state
                 changed = True
 
+        if module.params['wait_for'] and ls_mo_exists and not module.check_mode:
+            if module.params['state'] == 'absent' and changed:
+                since = dict(pn_dn=ls_mo.pn_dn, assoc_state=ls_mo.assoc_state)
+            match = None
+            if module.params['wait_for'] == 'associated' and module.params['server_assignment'] != 'pool':
+                # right after a new binding the profile may still be associated with the old server
+                match = dict(pn_dn=module.params['server_dn'])
+            start = time.time()
+            ls_mo, reached = wait_for_mo_state(
+                ucs.login_handle,
+                ls_dn,
+                'assoc_state',
+                [module.params['wait_for']],
+                module.params['wait_timeout'],
+                stop_values=['failed'],
+                match=match,
+                since=since,
+            )
+            ucs.result['wait_time'] = round(time.time() - start, 1)
+            if ls_mo:
+                ucs.result['assign_state'] = ls_mo.assign_state
+                ucs.result['assoc_state'] = ls_mo.assoc_state
+            if not reached:
+                err = True
+                ucs.result['msg'] = "service profile %s is %s, not %s" % (
+                    ls_dn, ucs.result['assoc_state'], module.params['wait_for'])
+
     except Exception as e:
         err = True
         ucs.result['msg'] = "setup error: %s " % str(e)
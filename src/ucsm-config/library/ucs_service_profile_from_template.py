@@ -31,7 +31,23 @@ options:
     - This name can be between 2 and 32 alphanumeric characters.
     - "You cannot use spaces or any special characters other than - (hyphen), \"_\" (underscore), : (colon), and . (period)."
     - This name must be unique across all service profiles and service profile templates within the same organization.
-    required: yes
+    - One of name, profiles or name_prefix is required.
+  profiles:
+    description:
+    - List of service profile names to create from the template (or remove) in a single commit.
+    - The same rules as for name apply to each name.
+  name_prefix:
+    description:
+    - Prefix of the names of service profiles created by UCS Manager with lsInstantiateNTemplate.
+    - UCS Manager appends a number to the prefix to name each service profile.
+    - With state C(present), profiles from source_template named with the prefix and a number, e.g. C(app1) and C(app2)
+      for C(app), are created until there are count of them.
+    - With state C(absent), all profiles from source_template named with the prefix and a number are removed.
+    - The template must be in org_dn when profiles are created with name_prefix.
+  count:
+    description:
+    - Number of service profiles with name_prefix that should exist.
+    - Required if name_prefix is used with state C(present).
   source_template:
     description:
     - The name of the service profile template used to create this serivce profile.
@@ -65,6 +81,27 @@ EXAMPLES = r'''
     name: test-sp-instance1
     source_template: test-sp
 
+- name: Configure several Service Profiles from Template in one commit
+  ucs_service_profile_from_template:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    profiles:
+    - master1
+    - master2
+    - master3
+    source_template: test-sp
+    power_state: up
+
+- name: Make sure 60 Service Profiles named worker<N> exist
+  ucs_service_profile_from_template:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    name_prefix: worker
+    count: 60
+    source_template: test-sp
+
 - name: Remove Service Profile
   ucs_service_profile_from_template:
     hostname: 172.16.143.150
@@ -75,18 +112,95 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-#
+profiles:
+  description: Name, dn, status (created, modified, unchanged, removed or absent), assoc_state and power_state of each service profile.
+  returned: success
+  type: list
+  sample: [{"name": "worker1", "dn": "org-root/ls-worker1", "status": "created", "assoc_state": "unassociated", "power_state": "up"}]
 '''
 
+import re
+
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, query_classid_by_dn_prefix, ucs_argument_spec
+
+
+def profile_matches(params, mo, power_mo):
+    # service profiles are of type 'instance'
+    kwargs = dict(src_templ_name=params['source_template'])
+    kwargs['usr_lbl'] = params['user_label']
+    kwargs['type'] = 'instance'
+    if not mo.check_prop_match(**kwargs):
+        return False
+    if params.get('power_state'):
+        return bool(power_mo and power_mo.check_prop_match(state=params['power_state']))
+    # no power state provided, use existing state as match
+    return True
+
+
+def add_profile(login_handle, params, name):
+    from ucsmsdk.mometa.ls.LsServer import LsServer
+    from ucsmsdk.mometa.ls.LsPower import LsPower
+
+    mo = LsServer(
+        parent_mo_or_dn=params['org_dn'],
+        name=name,
+        src_templ_name=params['source_template'],
+        type='instance',
+        usr_lbl=params['user_label'],
+    )
+    if params.get('power_state'):
+        admin_state = 'admin-' + params['power_state']
+        LsPower(
+            parent_mo_or_dn=mo,
+            state=admin_state,
+        )
+    login_handle.add_mo(mo, True)
+
+
+def read_profiles(login_handle, params):
+    # returns the profiles and their power settings by dn
+    org_dn = params['org_dn']
+    if params['name']:
+        # a single profile is read by dn instead of every profile of the org
+        dn = org_dn + '/ls-' + params['name']
+        mo, power_mo = login_handle.query_dn(dn), login_handle.query_dn(dn + '/power')
+        return ({dn: mo} if mo else {}), ({dn + '/power': power_mo} if power_mo else {})
+    # all profiles of the org and their power settings are read with one class query each
+    return (query_classid_by_dn_prefix(login_handle, 'LsServer', org_dn + '/ls-'),
+            query_classid_by_dn_prefix(login_handle, 'LsPower', org_dn + '/ls-'))
+
+
+def prefixed_profiles(params, servers):
+    # profiles instantiated from the template with name_prefix, named with the prefix and a number, in name order
+    name_re = re.compile('^%s[0-9]+$' % re.escape(params['name_prefix']))
+    names = []
+    for mo in servers.values():
+        if name_re.match(mo.name) and mo.src_templ_name == params['source_template'] and mo.type == 'instance':
+            names.append(mo.name)
+    return sorted(names)
+
+
+def next_names(prefix, servers, count):
+    # the names UCS Manager gives new profiles: the prefix and the lowest unused numbers
+    names = []
+    existing = set(mo.name for mo in servers.values())
+    index = 1
+    while len(names) < count:
+        if prefix + str(index) not in existing:
+            names.append(prefix + str(index))
+        index += 1
+    return names
 
 
 def main():
     argument_spec = ucs_argument_spec
     argument_spec.update(
         org_dn=dict(type='str', default='org-root'),
-        name=dict(type='str', required=True),
+        name=dict(type='str'),
+        profiles=dict(type='list'),
+        name_prefix=dict(type='str'),
+        count=dict(type='int'),
         source_template=dict(type='str', required=True),
         user_label=dict(type='str', default=''),
         power_state=dict(type='str', choices=['up', 'down']),
@@ -96,73 +210,94 @@ def main():
     module = AnsibleModule(
         argument_spec,
         supports_check_mode=True,
+        required_one_of=[
+            ['name', 'profiles', 'name_prefix'],
+        ],
+        mutually_exclusive=[
+            ['name', 'profiles', 'name_prefix'],
+        ],
     )
+    if module.params['name_prefix'] and module.params['state'] == 'present' and module.params['count'] is None:
+        module.fail_json(msg='count is required when name_prefix is used with state present')
     ucs = UCSModule(module)
 
     err = False
 
     # UCSModule creation above verifies ucsmsdk is present and exits on failure.  Additional imports are done below.
-    from ucsmsdk.mometa.ls.LsServer import LsServer
-    from ucsmsdk.mometa.ls.LsPower import LsPower
+    from ucsmsdk.ucsmethodfactory import ls_instantiate_n_template
 
     changed = False
     try:
-        mo_exists = False
-        props_match = False
-        dn = module.params['org_dn'] + '/ls-' + module.params['name']
+        org_dn = module.params['org_dn']
+        servers, powers = read_profiles(ucs.login_handle, module.params)
 
-        mo = ucs.login_handle.query_dn(dn)
-        if mo:
-            mo_exists = True
+        if module.params['name_prefix']:
+            names = prefixed_profiles(module.params, servers)
+        elif module.params['profiles']:
+            names = module.params['profiles']
+        else:
+            names = [module.params['name']]
 
+        status = {}
         if module.params['state'] == 'absent':
-            # mo must exist but all properties do not have to match
-            if mo_exists:
-                if not module.check_mode:
-                    ucs.login_handle.remove_mo(mo)
-                    ucs.login_handle.commit()
-                changed = True
+            for name in names:
+                mo = servers.get(org_dn + '/ls-' + name)
+                # mo must exist but all properties do not have to match
+                if mo:
+                    if not module.check_mode:
+                        ucs.login_handle.remove_mo(mo)
+                    status[name] = 'removed'
+                else:
+                    status[name] = 'absent'
         else:
-            if mo_exists:
-                # check top-level mo props
-                kwargs = dict(src_templ_name=module.params['source_template'])
-                kwargs['usr_lbl'] = module.params['user_label']
-                # service profiles are of type 'instance'
-                kwargs['type'] = 'instance'
-
-                if mo.check_prop_match(**kwargs):
-                    # top-level props match
-                    if module.params.get('power_state'):
-                        child_dn = dn + '/power'
-                        mo_1 = ucs.login_handle.query_dn(child_dn)
-                        if mo_1:
-                            kwargs = dict(state=module.params['power_state'])
-                            if mo_1.check_prop_match(**kwargs):
-                                props_match = True
-                    else:
-                        # no power state provided, use existing state as match
-                        props_match = True
-
-            if not props_match:
+            if module.params['name_prefix'] and len(names) < module.params['count']:
+                missing = module.params['count'] - len(names)
+                if not module.check_mode:
+                    # UCS Manager names and creates the missing profiles in one method call
+                    ucs.login_handle.process_xml_elem(ls_instantiate_n_template(
+                        ucs.login_handle.cookie,
+                        org_dn + '/ls-' + module.params['source_template'],
+                        missing,
+                        module.params['name_prefix'],
+                        org_dn,
+                    ))
+                    servers, powers = read_profiles(ucs.login_handle, module.params)
+                    new_names = [name for name in prefixed_profiles(module.params, servers) if name not in names]
+                else:
+                    new_names = next_names(module.params['name_prefix'], servers, missing)
+                for name in new_names:
+                    status[name] = 'created'
+                names = sorted(names + new_names)
+
+            for name in names:
+                dn = org_dn + '/ls-' + name
+                mo = servers.get(dn)
+                if mo and profile_matches(module.params, mo, powers.get(dn + '/power')):
+                    status.setdefault(name, 'unchanged')
+                    continue
                 if not module.check_mode:
                     # create if mo does not already exist
-                    mo = LsServer(
-                        parent_mo_or_dn=module.params['org_dn'],
-                        name=module.params['name'],
-                        src_templ_name=module.params['source_template'],
-                        type='instance',
-                        usr_lbl=module.params['user_label'],
-                    )
-                    if module.params.get('power_state'):
-                        admin_state = 'admin-' + module.params['power_state']
-                        mo_1 = LsPower(
-                            parent_mo_or_dn=mo,
-                            state=admin_state,
-                        )
-
-                    ucs.login_handle.add_mo(mo, True)
-                    ucs.login_handle.commit()
-                changed = True
+                    add_profile(ucs.login_handle, module.params, name)
+                status.setdefault(name, 'modified' if mo else 'created')
+
+        changed = any(value != 'unchanged' and value != 'absent' for value in status.values())
+        if changed and not module.check_mode:
+            # every profile change above goes in one configConfMos request
+            ucs.login_handle.commit()
+            servers, powers = read_profiles(ucs.login_handle, module.params)
+
+        ucs.result['profiles'] = []
+        for name in names:
+            dn = org_dn + '/ls-' + name
+            mo = servers.get(dn)
+            power_mo = powers.get(dn + '/power')
+            ucs.result['profiles'].append(dict(
+                name=name,
+                dn=dn,
+                status=status[name],
+                assoc_state=mo.assoc_state if mo else None,
+                power_state=power_mo.state if power_mo else None,
+            ))
 
     except Exception as e:
         err = True
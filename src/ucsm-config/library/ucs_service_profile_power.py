@@ -0,0 +1,325 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: ucs_service_profile_power
+short_description: Powers service profiles on Cisco UCS Manager in rolling batches
+description:
+- Sets the power state (LsPower) of a set of service profiles on Cisco UCS Manager and waits for the operational power
+  state (oper_power) of their servers.
+- The profiles are changed in batches of I(batch_size), one commit per batch, while no more than I(concurrency) servers
+  are changing power at the same time.  A new batch starts as soon as enough servers of the earlier batches are done.
+- The servers being waited on are read with one configResolveDns per check.  Checks follow change events of the servers
+  on the UCSM event channel, or an exponential backoff of 2 to 60 seconds without the event channel.
+- Examples can be used with the UCS Platform Emulator U(https://communities.cisco.com/ucspe).
+extends_documentation_fragment: ucs
+options:
+  service_profiles:
+    description:
+    - Names of the service profiles, in the order they are changed.
+    type: list
+    required: yes
+  org_dn:
+    description:
+    - Org dn of the service profiles.
+    default: org-root
+  power_state:
+    description:
+    - C(up) and C(down) power the servers on and off, C(soft-shut-down) shuts them down through the OS.
+    - C(cycle) powers the servers off and back on, the server is only powered on once it is off.  Without I(wait),
+      C(cycle) sets C(cycle-immediate) and UCS Manager powers the servers off and on by itself.
+    - Profiles without a server get the power states of C(cycle) committed back-to-back, so they are up once they are
+      associated.
+    - Servers that already have the operational power state of C(up), C(down) or C(soft-shut-down) are left alone.
+    choices: [up, down, soft-shut-down, cycle]
+    required: yes
+  graceful:
+    description:
+    - Power the servers off with C(soft-shut-down) for C(cycle).
+    - Requires I(wait), the servers are only powered on once the OS has shut them down.
+    type: bool
+    default: no
+  batch_size:
+    description:
+    - Number of service profiles changed in one commit.
+    - With the default 0, batches are I(concurrency) profiles.
+    type: int
+    default: 0
+  concurrency:
+    description:
+    - Largest number of servers changing power state at the same time.
+    type: int
+    default: 4
+  wait:
+    description:
+    - Wait for the operational power state of the servers.
+    - Without wait, all profiles are changed in batches of I(batch_size) without waiting in between.
+    - C(cycle) without wait uses C(cycle-immediate), see I(power_state).
+    type: bool
+    default: yes
+  wait_timeout:
+    description:
+    - Seconds a server may take to reach the power state, for C(cycle) to power off and to power on.
+    type: int
+    default: 600
+requirements:
+- ucsmsdk
+author:
+- CiscoUcs (@CiscoUcs)
+version_added: '2.6'
+'''
+
+EXAMPLES = r'''
+- name: Reboot the OpenShift app nodes, two at a time, after a BIOS policy change
+  ucs_service_profile_power:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    service_profiles: "{{ groups['app'] }}"
+    power_state: cycle
+    graceful: yes
+    concurrency: 2
+
+- name: Power on all infra nodes, four per commit
+  ucs_service_profile_power:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    service_profiles: [infra1, infra2, infra3, infra4, infra5, infra6, infra7, infra8]
+    power_state: up
+    batch_size: 4
+    concurrency: 8
+'''
+
+RETURN = r'''
+nodes:
+  description:
+  - Name, dn, server dn, status, operational power state and timings of each service profile.
+  - status is C(changed), C(unchanged), C(timeout), C(failed) or, for profiles without a server, C(unassociated).
+  - started is the second, counted from the start of the module, the profile was first changed at and seconds the time
+    its server took to reach the power state.
+  returned: success
+  type: list
+  sample: [{"name": "app1", "dn": "org-root/ls-app1", "server_dn": "sys/chassis-1/blade-1", "status": "changed",
+            "oper_power": "on", "started": 0.1, "seconds": 184.2}]
+elapsed:
+  description: Seconds the module spent changing and waiting.
+  returned: success
+  type: float
+  sample: 412.7
+'''
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSStateWatch, ucs_argument_spec
+
+SERVER_CLASSES = ['ComputeBlade', 'ComputeRackUnit']
+
+# LsPower states and the operational power state of the server they lead to, one per phase
+POWER_PHASES = {
+    'up': [('admin-up', 'on')],
+    'down': [('admin-down', 'off')],
+    'soft-shut-down': [('soft-shut-down', 'off')],
+    'cycle': [('admin-down', 'off'), ('admin-up', 'on')],
+}
+
+# phase of cycle without wait, UCSM powers the server off and on whatever its power state
+CYCLE_IMMEDIATE = ('cycle-immediate', 'on')
+
+# operational power states a server does not come back from by itself
+STOP_STATES = ['failed', 'error']
+
+
+def power_phases(params):
+    if params['power_state'] == 'cycle' and not params['wait']:
+        # nothing waits for the server to be off, UCSM cycles it in one phase
+        return [CYCLE_IMMEDIATE]
+    phases = list(POWER_PHASES[params['power_state']])
+    if params['power_state'] == 'cycle' and params['graceful']:
+        phases[0] = ('soft-shut-down', 'off')
+    return phases
+
+
+def read_nodes(login_handle, org_dn, names, phases, profile_phases):
+    # the profiles with their power settings, then their servers, are read with one configResolveDns each
+    ls_dns = [org_dn + '/ls-' + name for name in names]
+    profiles = login_handle.query_dns(*(ls_dns + [dn + '/power' for dn in ls_dns]))
+    missing = [dn for dn in ls_dns if profiles.get(dn) is None]
+    if missing:
+        raise ValueError('service profiles not found: %s' % ', '.join(missing))
+    server_dns = [profiles[dn].pn_dn for dn in ls_dns if profiles[dn].pn_dn]
+    servers = login_handle.query_dns(*server_dns) if server_dns else {}
+
+    nodes = []
+    for name, dn in zip(names, ls_dns):
+        server_dn = profiles[dn].pn_dn or None
+        server = servers.get(server_dn) if server_dn else None
+        node = dict(name=name, dn=dn, server_dn=server_dn, status='changed',
+                    oper_power=server.oper_power if server else None, started=None, seconds=None,
+                    phases=phases if server_dn else profile_phases)
+        if not server_dn:
+            power = profiles.get(dn + '/power')
+            node['status'] = 'unassociated'
+            if power and len(profile_phases) == 1 and power.state == profile_phases[0][0]:
+                node['status'] = 'unchanged'
+        elif phases in (POWER_PHASES['up'], POWER_PHASES['down'], POWER_PHASES['soft-shut-down']) and \
+                node['oper_power'] == phases[0][1]:
+            node['status'] = 'unchanged'
+        nodes.append(node)
+    return nodes
+
+
+def commit_phase(login_handle, nodes, start):
+    from ucsmsdk.mometa.ls.LsPower import LsPower
+
+    now = time.time()
+    for node in nodes:
+        login_handle.add_mo(LsPower(parent_mo_or_dn=node['dn'], state=node['phases'][node['phase']][0]), True)
+        node['phase_start'] = now
+        if node['started'] is None:
+            node['started'] = round(now - start, 1)
+            node['first_start'] = now
+    login_handle.commit()
+
+
+def roll(ucs, module, nodes):
+    """Changes the power state of nodes in rolling batches, waiting for their servers unless wait is off."""
+    params = module.params
+    concurrency = max(1, params['concurrency'])
+    batch_size = min(params['batch_size'] or concurrency, concurrency)
+    timeout = params['wait_timeout']
+    start = time.time()
+    phase_count = max(len(node['phases']) for node in nodes)
+
+    queue = [node for node in nodes if node['status'] in ('changed', 'unassociated')]
+    for node in queue:
+        node['phase'] = 0
+    inflight = {}
+    ready = []
+    watch = UCSStateWatch(ucs.login_handle, SERVER_CLASSES, timeout * phase_count) if params['wait'] else None
+    try:
+        while queue or inflight:
+            to_commit = ready
+            ready = []
+            while queue and concurrency - len(inflight) >= min(batch_size, len(queue)):
+                batch, queue = queue[:batch_size], queue[batch_size:]
+                for node in batch:
+                    # profiles without a server only get their power state set
+                    if params['wait'] and node['server_dn']:
+                        inflight[node['server_dn']] = node
+                to_commit.extend(batch)
+                if not params['wait']:
+                    break
+            if to_commit:
+                commit_phase(ucs.login_handle, to_commit, start)
+                # nodes that are not waited on get their next phases committed right away
+                rest = [node for node in to_commit if node['server_dn'] not in inflight]
+                while True:
+                    rest = [node for node in rest if node['phase'] + 1 < len(node['phases'])]
+                    if not rest:
+                        break
+                    for node in rest:
+                        node['phase'] += 1
+                    commit_phase(ucs.login_handle, rest, start)
+                if watch:
+                    watch.reset()
+            if not inflight:
+                continue
+
+            deadline = min(node['phase_start'] for node in inflight.values()) + timeout
+            watch.wait(deadline - time.time())
+            servers = ucs.login_handle.query_dns(*inflight)
+            now = time.time()
+            for server_dn, node in list(inflight.items()):
+                server = servers.get(server_dn)
+                node['oper_power'] = server.oper_power if server else None
+                if node['oper_power'] == node['phases'][node['phase']][1]:
+                    node['phase'] += 1
+                    if node['phase'] < len(node['phases']):
+                        # the next phase keeps the place of the server in the rolling window
+                        ready.append(node)
+                        continue
+                elif node['oper_power'] in STOP_STATES:
+                    node['status'] = 'failed'
+                elif now - node['phase_start'] >= timeout:
+                    node['status'] = 'timeout'
+                else:
+                    continue
+                node['seconds'] = round(now - node['first_start'], 1)
+                del inflight[server_dn]
+    finally:
+        if watch:
+            watch.close()
+        for node in nodes:
+            node.pop('phase', None)
+            node.pop('phases', None)
+            node.pop('phase_start', None)
+            node.pop('first_start', None)
+    return round(time.time() - start, 1)
+
+
+def main():
+    argument_spec = ucs_argument_spec
+    argument_spec.update(
+        service_profiles=dict(type='list', required=True),
+        org_dn=dict(type='str', default='org-root'),
+        power_state=dict(type='str', required=True, choices=['up', 'down', 'soft-shut-down', 'cycle']),
+        graceful=dict(type='bool', default=False),
+        batch_size=dict(type='int', default=0),
+        concurrency=dict(type='int', default=4),
+        wait=dict(type='bool', default=True),
+        wait_timeout=dict(type='int', default=600),
+    )
+
+    module = AnsibleModule(
+        argument_spec,
+        supports_check_mode=True,
+    )
+    if module.params['power_state'] == 'cycle' and module.params['graceful'] and not module.params['wait']:
+        module.fail_json(msg="graceful cycle requires wait, the servers are only powered on once they are off")
+    ucs = UCSModule(module)
+
+    err = False
+    changed = False
+
+    try:
+        phases = power_phases(module.params)
+        nodes = read_nodes(ucs.login_handle, module.params['org_dn'], module.params['service_profiles'], phases,
+                           POWER_PHASES[module.params['power_state']])
+        changed = any(node['status'] in ('changed', 'unassociated') for node in nodes)
+        ucs.result['elapsed'] = 0.0
+        if changed and not module.check_mode:
+            ucs.result['elapsed'] = roll(ucs, module, nodes)
+        for node in nodes:
+            node.pop('phases', None)
+        ucs.result['nodes'] = nodes
+
+        stopped = [node['name'] for node in nodes if node['status'] in ('timeout', 'failed')]
+        if stopped:
+            err = True
+            ucs.result['msg'] = "servers of %s did not reach the power state %s" % (
+                ', '.join(stopped), module.params['power_state'])
+
+    except Exception as e:
+        err = True
+        ucs.result['msg'] = "setup error: %s " % str(e)
+
+    ucs.result['changed'] = changed
+    if err:
+        module.fail_json(**ucs.result)
+    module.exit_json(**ucs.result)
+
+
+if __name__ == '__main__':
+    main()
@@ -98,11 +98,15 @@ ucs_storage_local_disk_rack:
 '''
 
 RETURN = r'''
-#
+disks_changed:
+    description: Number of disks whose state was (or in check mode would be) changed.
+    returned: success
+    type: int
+    sample: 56
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, query_classid_by_dn_prefix, ucs_argument_spec
 
 def main():
     argument_spec = ucs_argument_spec
@@ -121,6 +125,9 @@ def main():
 
     try:
         dn_base = 'sys'
+        # every disk in scope is read with one class query and matched locally against the requested ranges
+        disks = query_classid_by_dn_prefix(ucs.login_handle, 'StorageLocalDisk', dn_base + '/rack-unit-')
+        disks_changed = 0
         
         num_racks = 1
         rack_list = module.params['rack_id'].split(',')
@@ -149,7 +156,7 @@ def main():
                 for disk_num in range( disk_id_start, disk_id_start + num_disks ):
                     dn = dn_slot_base + '/disk-' + str( disk_num ) 
 
-                    existing_mo = ucs.login_handle.query_dn(dn)
+                    existing_mo = disks.get(dn)
                     if existing_mo:
                         kwargs = dict(disk_state = module.params['disk_state'])
                         if not existing_mo.check_prop_match(**kwargs):
@@ -157,8 +164,13 @@ def main():
                                 existing_mo.admin_action_trigger = "triggered"
                                 existing_mo.admin_action = module.params['disk_state']
                                 ucs.login_handle.add_mo(existing_mo, True)
-                                ucs.login_handle.commit()
-                            changed = True
+                            disks_changed += 1
+
+        if disks_changed and not module.check_mode:
+            # admin actions for all disks are sent in a single commit
+            ucs.login_handle.commit()
+        changed = disks_changed > 0
+        ucs.result['disks_changed'] = disks_changed
 
     except Exception as e:
         err = True
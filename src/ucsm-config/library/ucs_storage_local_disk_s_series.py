@@ -192,11 +192,15 @@ delay: 10
 '''
 
 RETURN = r'''
-#
+disks_changed:
+    description: Number of disks whose state was (or in check mode would be) changed.
+    returned: success
+    type: int
+    sample: 56
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, query_classid_by_dn_prefix, ucs_argument_spec
 
 def main():
     argument_spec = ucs_argument_spec
@@ -221,6 +225,9 @@ def main():
 
     try:
         dn_base = 'sys'
+        # every disk in scope is read with one class query and matched locally against the requested ranges
+        disks = query_classid_by_dn_prefix(ucs.login_handle, 'StorageLocalDisk', dn_base + '/chassis-')
+        disks_changed = 0
 
         num_chassis = 1
         chassis_list = module.params['chassis_id'].split(',')
@@ -260,7 +267,7 @@ def main():
                         for disk_num in range( disk_id_start, disk_id_start + num_disks ):
                             dn = dn_enc_base + '/disk-' + str( disk_num ) 
 
-                            existing_mo = ucs.login_handle.query_dn(dn)
+                            existing_mo = disks.get(dn)
                             if existing_mo:
                                 kwargs = dict(disk_state = module.params['disk_state'])
                                 if not existing_mo.check_prop_match(**kwargs):
@@ -268,8 +275,7 @@ def main():
                                         existing_mo.admin_action_trigger = "triggered"
                                         existing_mo.admin_action = module.params['disk_state']
                                         ucs.login_handle.add_mo(existing_mo, True)
-                                        ucs.login_handle.commit()
-                                    changed = True
+                                    disks_changed += 1
         else:
             for chassis_num in range( chassis_id_start, chassis_id_start + num_chassis ):
                 dn_chassis_base = dn_base + '/chassis-' + str( chassis_num )
@@ -277,7 +283,7 @@ def main():
                 for disk_num in range( disk_id_start, disk_id_start + num_disks ):
                     dn = dn_chassis_base + '/enc-1/disk-' + str( disk_num )
 
-                    existing_mo = ucs.login_handle.query_dn(dn)
+                    existing_mo = disks.get(dn)
                     if existing_mo:
                         kwargs = dict(disk_state = module.params['disk_state'])
                         if not existing_mo.check_prop_match(**kwargs):
@@ -285,8 +291,13 @@ def main():
                                 existing_mo.admin_action_trigger = "triggered"
                                 existing_mo.admin_action = module.params['disk_state']
                                 ucs.login_handle.add_mo(existing_mo, True)
-                                ucs.login_handle.commit()
-                            changed = True
+                            disks_changed += 1
+
+        if disks_changed and not module.check_mode:
+            # admin actions for all disks are sent in a single commit
+            ucs.login_handle.commit()
+        changed = disks_changed > 0
+        ucs.result['disks_changed'] = disks_changed
 
     except Exception as e:
         err = True
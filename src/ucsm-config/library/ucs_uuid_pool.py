@@ -65,6 +65,14 @@ options:
     description:
     - The distinguished name (dn) of the organization where the resource is assigned.
     default: org-root
+  overlap_check:
+    description:
+    - If C(yes), new UUID blocks are checked against the blocks of every UUID pool with the same prefix, read with one class query,
+      before anything is committed, and the module fails if they would share identities.
+    - The prefix UCS Manager derives for a new pool without prefix is not known beforehand, its blocks are checked against
+      the UUID pools of every prefix.
+    type: bool
+    default: 'yes'
 requirements:
 - ucsmsdk
 author:
@@ -99,6 +107,7 @@ RETURN = r'''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_identity import DERIVED_PREFIX, check_block_overlaps
 
 
 def main():
@@ -111,6 +120,7 @@ def main():
         prefix=dict(type='str', default=''),
         first_uuid=dict(type='str'),
         last_uuid=dict(type='str'),
+        overlap_check=dict(type='bool', default=True),
         state=dict(default='present', choices=['present', 'absent'], type='str'),
     )
     module = AnsibleModule(
@@ -161,6 +171,11 @@ def main():
                         props_match = True
 
             if not props_match:
+                if module.params['overlap_check'] and module.params['last_uuid'] and module.params['first_uuid']:
+                    # UUID suffixes only collide within one prefix, a prefix still to be derived is checked against all
+                    prefix = module.params['prefix'] or (mo.prefix if mo_exists else DERIVED_PREFIX)
+                    check_block_overlaps(ucs.login_handle, 'uuid', dn, [(module.params['first_uuid'], module.params['last_uuid'])],
+                                         namespace=prefix)
                 if not module.check_mode:
                     # create if mo does not already exist
                     if not module.params['prefix']:
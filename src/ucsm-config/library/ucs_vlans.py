@@ -32,7 +32,24 @@ options:
     - This name can be between 1 and 32 alphanumeric characters.
     - "You cannot use spaces or any special characters other than - (hyphen), \"_\" (underscore), : (colon), and . (period)."
     - You cannot change this name after the VLAN is created.
-    required: yes
+    - One of name, vlans or name_prefix is required.
+  vlans:
+    description:
+    - List of VLANs to configure in one commit, each a dict with name and id.
+    - Each VLAN can also have its own multicast_policy, sharing, native and state, which default to the module options.
+    - The VLANs are compared with the VLANs of the fabric read with one class query, and all creations,
+      modifications and removals are sent to UCS Manager in one configConfMos request.
+  name_prefix:
+    description:
+    - Configures a VLAN for every id in id, named name_prefix followed by the VLAN id.
+    - For example name_prefix C(tenant_) and id C(100-102,200) configure tenant_100, tenant_101, tenant_102 and tenant_200.
+  purge:
+    description:
+    - If C(yes), VLANs of the fabric that are not listed are removed in the same commit.
+    - With name_prefix only VLANs whose name starts with name_prefix are removed.
+    - The default VLAN is never removed.
+    type: bool
+    default: 'no'
   multicast_policy:
     description:
     - The multicast policy associated with this VLAN.
@@ -54,8 +71,8 @@ options:
     - You cannot create VLANs with IDs from 4030 to 4047. This range of VLAN IDs is reserved.
     - The VLAN IDs you specify must also be supported on the switch that you are using.
     - VLANs in the LAN cloud and FCoE VLANs in the SAN cloud must have different IDs.
-    - Optional if state is absent.
-    required: yes
+    - With name_prefix, a list of VLAN IDs and ranges like C(100-399,405).
+    - Required with name or name_prefix if state is present.
   sharing:
     description:
     - The Sharing Type field.
@@ -89,6 +106,29 @@ EXAMPLES = r'''
     id: '2'
     native: 'yes'
 
+- name: Configure VLANs tenant_100 to tenant_399 on fabric A
+  ucs_vlans:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    name_prefix: tenant_
+    id: 100-399
+    fabric: A
+
+- name: Configure a list of VLANs in one commit
+  ucs_vlans:
+    hostname: 172.16.143.150
+    username: admin
+    password: password
+    vlans:
+    - name: vlan2
+      id: '2'
+      native: 'yes'
+    - name: vlan3
+      id: '3'
+    - name: vlan4
+      state: absent
+
 - name: Remove VLAN
   ucs_vlans:
     hostname: 172.16.143.150
@@ -99,17 +139,82 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-#
+vlans:
+  description: Name, id, dn and status (created, modified, unchanged, removed or absent) of each VLAN configured or removed.
+  returned: success
+  type: list
+  sample: [{"name": "tenant_100", "id": "100", "dn": "fabric/lan/A/net-tenant_100", "status": "created"}]
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, query_classid_by_dn_prefix, ucs_argument_spec
+
+VLAN_PROPS = ['multicast_policy', 'sharing', 'native', 'state']
+
+
+def parse_vlan_ids(value):
+    # '100-102,200' -> ['100', '101', '102', '200']
+    ids = []
+    for part in str(value).replace(' ', '').split(','):
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        if not first.isdigit() or (sep and not last.isdigit()):
+            raise ValueError('invalid VLAN id or range %s' % part)
+        first, last = int(first), int(last) if sep else int(first)
+        if first > last:
+            raise ValueError('invalid VLAN range %s' % part)
+        for vlan_id in range(first, last + 1):
+            if not (1 <= vlan_id <= 3967 or 4048 <= vlan_id <= 4093):
+                raise ValueError('VLAN id %d is not between 1 and 3967 or 4048 and 4093' % vlan_id)
+            ids.append(str(vlan_id))
+    return ids
+
+
+def single_vlan_id(value):
+    # the id of one VLAN, checked against the same ranges as name_prefix ids
+    ids = parse_vlan_ids(value)
+    if len(ids) != 1:
+        raise ValueError('%s is not a single VLAN id' % value)
+    return ids[0]
+
+
+def wanted_vlans(params):
+    # the VLANs given by name, vlans or name_prefix, with the module options as defaults
+    defaults = dict((key, params[key]) for key in VLAN_PROPS)
+    if params['name_prefix']:
+        return [dict(defaults, name=params['name_prefix'] + vlan_id, id=vlan_id)
+                for vlan_id in parse_vlan_ids(params['id'])]
+    if params['vlans']:
+        vlans = []
+        for vlan in params['vlans']:
+            if not vlan.get('name'):
+                raise ValueError('every VLAN in vlans needs a name')
+            vlan = dict(defaults, **dict((key, value) for key, value in vlan.items() if value is not None))
+            if vlan['state'] == 'present' and not vlan.get('id'):
+                raise ValueError('VLAN %s needs an id' % vlan['name'])
+            if vlan.get('id'):
+                vlan['id'] = single_vlan_id(vlan['id'])
+            vlans.append(vlan)
+        return vlans
+    return [dict(defaults, name=params['name'], id=single_vlan_id(params['id']) if params['id'] else params['id'])]
+
+
+def vlan_matches(mo, vlan):
+    kwargs = dict(id=str(vlan['id']))
+    kwargs['default_net'] = vlan['native']
+    kwargs['sharing'] = vlan['sharing']
+    kwargs['mcast_policy_name'] = vlan['multicast_policy']
+    return mo.check_prop_match(**kwargs)
 
 
 def main():
     argument_spec = ucs_argument_spec
     argument_spec.update(
-        name=dict(type='str', required=True),
+        name=dict(type='str'),
+        vlans=dict(type='list'),
+        name_prefix=dict(type='str'),
+        purge=dict(type='bool', default=False),
         multicast_policy=dict(type='str', default=''),
         fabric=dict(type='str', default='common', choices=['common', 'A', 'B']),
         id=dict(type='str'),
@@ -121,10 +226,20 @@ def main():
     module = AnsibleModule(
         argument_spec,
         supports_check_mode=True,
-        required_if=[
-            ['state', 'present', ['id']],
+        required_one_of=[
+            ['name', 'vlans', 'name_prefix'],
+        ],
+        mutually_exclusive=[
+            ['name', 'vlans', 'name_prefix'],
         ],
     )
+    if module.params['id'] is None and (module.params['name_prefix'] or
+                                        (module.params['name'] and module.params['state'] == 'present')):
+        module.fail_json(msg='id is required with name_prefix, or with name when state is present')
+    try:
+        vlans = wanted_vlans(module.params)
+    except ValueError as e:
+        module.fail_json(msg=str(e))
     ucs = UCSModule(module)
 
     err = False
@@ -134,50 +249,60 @@ def main():
 
     changed = False
     try:
-        mo_exists = False
-        props_match = False
         # dn is fabric/lan/net-<name> for common vlans or fabric/lan/[A or B]/net-<name> for A or B
         dn_base = 'fabric/lan'
         if module.params['fabric'] != 'common':
             dn_base += '/' + module.params['fabric']
-        dn = dn_base + '/net-' + module.params['name']
 
-        mo = ucs.login_handle.query_dn(dn)
-        if mo:
-            mo_exists = True
+        if module.params['name'] and not module.params['purge']:
+            mo = ucs.login_handle.query_dn(dn_base + '/net-' + module.params['name'])
+            existing = dict([(mo.dn, mo)] if mo else [])
+        else:
+            # every VLAN of the fabric is read with one class query
+            existing = query_classid_by_dn_prefix(ucs.login_handle, 'FabricVlan', dn_base + '/net-')
 
-        if module.params['state'] == 'absent':
-            # mo must exist but all properties do not have to match
-            if mo_exists:
-                if not module.check_mode:
+        ucs.result['vlans'] = []
+        listed = set()
+        for vlan in vlans:
+            dn = dn_base + '/net-' + vlan['name']
+            listed.add(dn)
+            mo = existing.get(dn)
+            if vlan['state'] == 'absent':
+                # mo must exist but all properties do not have to match
+                if mo and not module.check_mode:
                     ucs.login_handle.remove_mo(mo)
-                    ucs.login_handle.commit()
-                changed = True
-        else:
-            if mo_exists:
-                # check top-level mo props
-                kwargs = dict(id=module.params['id'])
-                kwargs['default_net'] = module.params['native']
-                kwargs['sharing'] = module.params['sharing']
-                kwargs['mcast_policy_name'] = module.params['multicast_policy']
-                if (mo.check_prop_match(**kwargs)):
-                    props_match = True
-
-            if not props_match:
+                status = 'removed' if mo else 'absent'
+            elif mo and vlan_matches(mo, vlan):
+                status = 'unchanged'
+            else:
                 if not module.check_mode:
                     # create if mo does not already exist
-                    mo = FabricVlan(
+                    ucs.login_handle.add_mo(FabricVlan(
                         parent_mo_or_dn=dn_base,
-                        name=module.params['name'],
-                        id=module.params['id'],
-                        default_net=module.params['native'],
-                        sharing=module.params['sharing'],
-                        mcast_policy_name=module.params['multicast_policy'],
-                    )
-
-                    ucs.login_handle.add_mo(mo, True)
-                    ucs.login_handle.commit()
-                changed = True
+                        name=vlan['name'],
+                        id=str(vlan['id']),
+                        default_net=vlan['native'],
+                        sharing=vlan['sharing'],
+                        mcast_policy_name=vlan['multicast_policy'],
+                    ), True)
+                status = 'modified' if mo else 'created'
+            ucs.result['vlans'].append(dict(name=vlan['name'], id=vlan.get('id') or (mo.id if mo else None),
+                                            dn=dn, status=status))
+
+        if module.params['purge']:
+            for dn, mo in sorted(existing.items()):
+                if dn in listed or mo.name == 'default':
+                    continue
+                if module.params['name_prefix'] and not mo.name.startswith(module.params['name_prefix']):
+                    continue
+                if not module.check_mode:
+                    ucs.login_handle.remove_mo(mo)
+                ucs.result['vlans'].append(dict(name=mo.name, id=mo.id, dn=dn, status='removed'))
+
+        changed = any(vlan['status'] in ('created', 'modified', 'removed') for vlan in ucs.result['vlans'])
+        if changed and not module.check_mode:
+            # all creations, modifications and removals go in one configConfMos request
+            ucs.login_handle.commit()
 
     except Exception as e:
         err = True
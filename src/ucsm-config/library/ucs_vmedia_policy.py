@@ -91,7 +91,7 @@ RETURN = r'''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 
 import traceback
 import logging
@@ -132,7 +132,9 @@ def main():
         dn = dn_base + '/mnt-cfg-policy-' + module.params['name']
         
 
-        mo = ucs.login_handle.query_dn(dn)
+        # policy and mount entries are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
         if mo:
             mo_exists = True
 
@@ -160,7 +162,7 @@ def main():
             # check mount setting
             mount_entries = module.params.get(VMEDIA_MOUNT)
             if mount_entries:
-                child_props_match = verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_matches, ucs)
+                child_props_match = verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_matches, subtree)
                 logging.info("Child Props Match: %s", child_props_match)
                 logging.debug(mount_entry_matches)
             else:
@@ -171,7 +173,7 @@ def main():
 
                     # remove if some entries are not required
                     if mo_exists:
-                        check_and_remove_mount_entries(mo,mount_entry_matches,ucs)
+                        check_and_remove_mount_entries(mo,mount_entry_matches,ucs,subtree)
 
                     # create if mo does not already exist
                     if not parent_props_match:
@@ -217,9 +219,9 @@ def main():
         module.fail_json(**ucs.result)
     module.exit_json(**ucs.result)
 
-def check_and_remove_mount_entries(mo, mount_entry_matches, ucs):
+def check_and_remove_mount_entries(mo, mount_entry_matches, ucs, subtree):
     
-    mo_list = ucs.login_handle.query_children(in_mo=mo)
+    mo_list = subtree.query_children(in_mo=mo)
 
     for index, mo_mount_entry in enumerate(mo_list):
         match = mount_entry_matches.get(mo_mount_entry.dn)
@@ -230,7 +232,7 @@ def check_and_remove_mount_entries(mo, mount_entry_matches, ucs):
             ucs.login_handle.commit()
                 
 
-def verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_matches, ucs):
+def verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_matches, subtree):
     
     child_props_match = True
 
@@ -244,7 +246,7 @@ def verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_ma
 
         mo_child = None
         if mo:
-            mo_child = ucs.login_handle.query_dn(child_dn)
+            mo_child = subtree.query_dn(child_dn)
         
         if mo_child:
             kwargs = dict(mapping_name=name)
@@ -273,7 +275,7 @@ def verify_mount_entries(mo, dn, mount_entries, mount_entry_dict, mount_entry_ma
         
         # make sure length of input mount points matches existing mount points 
     if child_props_match:
-        mo_list = ucs.login_handle.query_children(in_mo=mo)
+        mo_list = subtree.query_children(in_mo=mo)
         child_props_match = len(mo_list) == len (mount_entry_matches)
     
     return child_props_match
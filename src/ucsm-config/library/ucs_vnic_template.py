@@ -98,6 +98,13 @@ options:
     - "  If absent, will verify VLAN is absent on template."
     - "  choices: [present, absent]"
     - "  default: present"
+    - The VLANs of the template are read with the template and only the VLANs added, removed or with a changed
+      native setting are sent to UCS Manager, in one commit.
+  purge_vlans:
+    description:
+    - If C(yes), VLANs on the template that are not in vlans_list are removed.
+    type: bool
+    default: 'no'
   cdn_source:
     description:
     - CDN Source field.
@@ -198,11 +205,30 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-#
+vlans_added:
+  description: VLANs added to the template.
+  returned: success
+  type: list
+  sample: ["vLAN-1001"]
+vlans_removed:
+  description: VLANs removed from the template.
+  returned: success
+  type: list
+  sample: ["vLAN-614"]
+vlans_native_changed:
+  description: VLANs of the template whose native setting was changed.
+  returned: success
+  type: list
+  sample: ["default"]
+vlan_delta:
+  description: Number of VLAN changes sent to UCS Manager.
+  returned: success
+  type: int
+  sample: 2
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs import UCSModule, UCSSubtree, ucs_argument_spec
 
 
 def main():
@@ -217,6 +243,7 @@ def main():
         target=dict(type='str', default='adapter', choices=['adapter', 'vm']),
         template_type=dict(type='str', default='initial-template', choices=['initial-template', 'updating-template']),
         vlans_list=dict(type='list'),
+        purge_vlans=dict(type='bool', default=False),
         cdn_source=dict(type='str', default='vnic-name', choices=['vnic-name', 'user-defined']),
         cdn_name=dict(type='str', default=''),
         mtu=dict(type='str', default='1500'),
@@ -250,7 +277,9 @@ def main():
         # dn is <org_dn>/lan-conn-templ-<name>
         dn = module.params['org_dn'] + '/lan-conn-templ-' + module.params['name']
 
-        mo = ucs.login_handle.query_dn(dn)
+        # template and vlan interfaces are read with one hierarchical query
+        subtree = UCSSubtree(ucs.login_handle, dn)
+        mo = subtree.query_dn(dn)
         if mo:
             mo_exists = True
 
@@ -290,76 +319,81 @@ def main():
                     kwargs['nw_ctrl_policy_name'] = module.params['network_control_policy']
                     kwargs['pin_to_group_name'] = module.params['pin_group']
                     kwargs['stats_policy_name'] = module.params['stats_policy']
-                if mo.check_prop_match(**kwargs):
-                    # top-level props match, check next level mo/props
-                    if not module.params.get('vlans_list'):
-                        props_match = True
-                    else:
-                        # check vlan props
-                        for vlan in module.params['vlans_list']:
-                            child_dn = dn + '/if-' + str(vlan['name'])
-                            mo_1 = ucs.login_handle.query_dn(child_dn)
-                            if vlan['state'] == 'absent':
-                                if mo_1:
-                                    props_match = False
-                                    break
-                            else:
-                                if mo_1:
-                                    kwargs = dict(default_net=vlan['native'])
-                                    if mo_1.check_prop_match(**kwargs):
-                                        props_match = True
-                                else:
-                                    props_match = False
-                                    break
+                props_match = mo.check_prop_match(**kwargs)
+
+            # VLAN changes are computed against all VLAN interfaces of the template at once
+            existing_vlans = {}
+            if mo_exists:
+                for mo_1 in subtree.query_children(in_dn=dn, class_id='VnicEtherIf'):
+                    existing_vlans[mo_1.name] = mo_1
+            wanted_vlans = {}
+            absent_vlans = set()
+            for vlan in module.params.get('vlans_list') or []:
+                if vlan['state'] == 'absent':
+                    absent_vlans.add(str(vlan['name']))
+                else:
+                    wanted_vlans[str(vlan['name'])] = vlan['native']
+            vlans_added = sorted(name for name in wanted_vlans if name not in existing_vlans)
+            vlans_native_changed = sorted(name for name in wanted_vlans if name in existing_vlans and
+                                          existing_vlans[name].default_net != wanted_vlans[name])
+            vlans_removed = sorted(name for name in existing_vlans if name in absent_vlans or
+                                   (module.params['purge_vlans'] and name not in wanted_vlans))
+            ucs.result['vlans_added'] = vlans_added
+            ucs.result['vlans_removed'] = vlans_removed
+            ucs.result['vlans_native_changed'] = vlans_native_changed
+            ucs.result['vlan_delta'] = len(vlans_added) + len(vlans_removed) + len(vlans_native_changed)
 
-            if not props_match:
+            if not props_match or ucs.result['vlan_delta']:
                 if not module.check_mode:
-                    # create if mo does not already exist
-                    # secondary template only sets non shared props
-                    if module.params['redundancy_type'] == 'secondary':
-                        mo = VnicLanConnTempl(
-                            parent_mo_or_dn=module.params['org_dn'],
-                            name=module.params['name'],
-                            descr=module.params['description'],
-                            switch_id=module.params['fabric'],
-                            redundancy_pair_type=module.params['redundancy_type'],
-                            peer_redundancy_templ_name=module.params['peer_redundancy_template'],
-                            ident_pool_name=module.params['mac_pool'],
-                        )
-                    else:
-                        mo = VnicLanConnTempl(
-                            parent_mo_or_dn=module.params['org_dn'],
-                            name=module.params['name'],
-                            descr=module.params['description'],
-                            switch_id=module.params['fabric'],
-                            redundancy_pair_type=module.params['redundancy_type'],
-                            peer_redundancy_templ_name=module.params['peer_redundancy_template'],
-                            target=module.params['target'],
-                            templ_type=module.params['template_type'],
-                            cdn_source=module.params['cdn_source'],
-                            admin_cdn_name=module.params['cdn_name'],
-                            mtu=module.params['mtu'],
-                            ident_pool_name=module.params['mac_pool'],
-                            qos_policy_name=module.params['qos_policy'],
-                            nw_ctrl_policy_name=module.params['network_control_policy'],
-                            pin_to_group_name=module.params['pin_group'],
-                            stats_policy_name=module.params['stats_policy'],
-                        )
+                    parent = dn
+                    if not props_match:
+                        # create if mo does not already exist
+                        # secondary template only sets non shared props
+                        if module.params['redundancy_type'] == 'secondary':
+                            mo = VnicLanConnTempl(
+                                parent_mo_or_dn=module.params['org_dn'],
+                                name=module.params['name'],
+                                descr=module.params['description'],
+                                switch_id=module.params['fabric'],
+                                redundancy_pair_type=module.params['redundancy_type'],
+                                peer_redundancy_templ_name=module.params['peer_redundancy_template'],
+                                ident_pool_name=module.params['mac_pool'],
+                            )
+                        else:
+                            mo = VnicLanConnTempl(
+                                parent_mo_or_dn=module.params['org_dn'],
+                                name=module.params['name'],
+                                descr=module.params['description'],
+                                switch_id=module.params['fabric'],
+                                redundancy_pair_type=module.params['redundancy_type'],
+                                peer_redundancy_templ_name=module.params['peer_redundancy_template'],
+                                target=module.params['target'],
+                                templ_type=module.params['template_type'],
+                                cdn_source=module.params['cdn_source'],
+                                admin_cdn_name=module.params['cdn_name'],
+                                mtu=module.params['mtu'],
+                                ident_pool_name=module.params['mac_pool'],
+                                qos_policy_name=module.params['qos_policy'],
+                                nw_ctrl_policy_name=module.params['network_control_policy'],
+                                pin_to_group_name=module.params['pin_group'],
+                                stats_policy_name=module.params['stats_policy'],
+                            )
+                        parent = mo
 
-                    if module.params.get('vlans_list'):
-                        for vlan in module.params['vlans_list']:
-                            if vlan['state'] == 'absent':
-                                child_dn = dn + '/if-' + str(vlan['name'])
-                                mo_1 = ucs.login_handle.query_dn(child_dn)
-                                ucs.login_handle.remove_mo(mo_1)
-                            else:
-                                mo_1 = VnicEtherIf(
-                                    parent_mo_or_dn=mo,
-                                    name=str(vlan['name']),
-                                    default_net=vlan['native'],
-                                )
+                    # only the VLAN delta is sent, with the template if its props changed
+                    for name in vlans_removed:
+                        ucs.login_handle.remove_mo(existing_vlans[name])
+                    for name in vlans_added + vlans_native_changed:
+                        mo_1 = VnicEtherIf(
+                            parent_mo_or_dn=parent,
+                            name=name,
+                            default_net=wanted_vlans[name],
+                        )
+                        if props_match:
+                            ucs.login_handle.add_mo(mo_1, True)
 
-                    ucs.login_handle.add_mo(mo, True)
+                    if not props_match:
+                        ucs.login_handle.add_mo(mo, True)
                     ucs.login_handle.commit()
                 changed = True
 
@@ -68,6 +68,13 @@ options:
     description:
     - Org dn (distinguished name)
     default: org-root
+  overlap_check:
+    description:
+    - If C(yes), new WWN blocks are checked against the blocks of every WWNN and WWPN pool, read with one class query,
+      before they are committed, and the module fails if they would share identities.
+    - The blocks are read once for all of wwn_list, and the new blocks of its entries are also checked against each other.
+    type: bool
+    default: 'yes'
 requirements:
 - ucsmsdk
 author:
@@ -117,6 +124,7 @@ RETURN = r'''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.remote_management.ucs import UCSModule, ucs_argument_spec
+from ansible.module_utils.remote_management.ucs_identity import UCSIdentityIndex, check_block_overlaps
 
 
 def main():
@@ -131,6 +139,7 @@ def main():
         last_addr=dict(type='str'),
         state=dict(type='str', default='present', choices=['present', 'absent']),
         wwn_list=dict(type='list'),
+        overlap_check=dict(type='bool', default=True),
     )
 
     # Note that use of wwn_list is an experimental feature which allows multiple resource updates with a single UCSM connection.
@@ -165,6 +174,13 @@ def main():
         else:
             # single resource specified, create list from the current params
             wwn_list = [module.params]
+        index = None
+        # new blocks of the earlier entries, the entries are also checked against each other
+        checked = []
+        if module.params['state'] == 'present' and module.params['overlap_check'] and \
+                any(wwn.get('first_addr') and wwn.get('last_addr') for wwn in wwn_list):
+            # the WWN blocks of every pool are read once for the whole list
+            index = UCSIdentityIndex(ucs.login_handle, kinds=['wwn'])
         for wwn in wwn_list:
             mo_exists = False
             props_match = False
@@ -205,6 +221,9 @@ def main():
                             props_match = True
 
                 if not props_match:
+                    if module.params['overlap_check'] and wwn.get('last_addr') and wwn.get('first_addr'):
+                        check_block_overlaps(ucs.login_handle, 'wwn', dn, [(wwn['first_addr'], wwn['last_addr'])],
+                                             index=index, checked=checked)
                     if not module.check_mode:
                         # create if mo does not already exist
                         mo = FcpoolInitiators(
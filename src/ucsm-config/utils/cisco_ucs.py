@@ -1,4 +1,6 @@
 # This file needs to be copied to ansible module_utils
+import time
+
 try:
     import ucsmsdk
     HAS_UCSMSDK = True
@@ -11,7 +13,9 @@ class UcsConnection():
     @staticmethod
     def is_login_param(param):
         return param in ["ucs_ip", "ucs_username", "ucs_password",
-                         "ucs_port", "ucs_secure", "ucs_proxy", "ucs_server"]
+                         "ucs_port", "ucs_secure", "ucs_proxy", "ucs_server",
+                         "ucs_session_cache", "ucs_session_cache_dir", "ucs_perf", "ucs_perf_trace_file",
+                         "ucs_worker", "ucs_worker_socket"]
 
     def __init__(self, module):
         if HAS_UCSMSDK is False:
@@ -20,6 +24,22 @@ class UcsConnection():
             module.fail_json(**results)
         self.module = module
         self.handle = None
+        self.session_cache = None
+        self.perf = None
+        self.warm_sessions = None
+        self.warm_key = None
+        if module.params.get('ucs_worker'):
+            from ansible.module_utils.remote_management import ucs
+            # in the worker daemon the module runs in process, elsewhere it is sent to the daemon
+            self.warm_sessions = ucs.ucs_warm_sessions
+            if self.warm_sessions is None:
+                ucs.forward_to_worker(module, module.params.get('ucs_worker_socket'))
+
+        try:
+            from ansible.module_utils.remote_management.ucs import validate_module_params
+        except Exception as e:
+            module.fail_json(msg="argument validation error: %s" % str(e))
+        validate_module_params(module)
 
     def login(self):
         ansible = self.module.params
@@ -27,7 +47,40 @@ class UcsConnection():
         if server:
             return server
 
+        from ansible.module_utils.remote_management import ucs
+        if ucs.ucs_plan_handle is not None:
+            # the plan compiler records the changes, logout leaves its handle alone
+            return ucs.ucs_plan_handle
+
         from ucsmsdk.ucshandle import UcsHandle
+        if ansible.get('ucs_perf') or ansible.get('ucs_perf_trace_file'):
+            self._start_perf()
+
+        if ansible.get('ucs_session_cache'):
+            from ansible.module_utils.remote_management.ucs import UCSSessionCache
+            self.session_cache = UCSSessionCache(ansible.get("ucs_session_cache_dir"),
+                                                 *[ansible.get(option) for option in
+                                                   ("ucs_ip", "ucs_username", "ucs_password",
+                                                    "ucs_port", "ucs_secure", "ucs_proxy")])
+            server = self.session_cache.load()
+            if server:
+                if self.perf:
+                    self.perf.attach(server)
+                self.handle = server
+                return server
+
+        if self.warm_sessions is not None:
+            from ansible.module_utils.remote_management.ucs import UCSWarmSessions
+            self.warm_key = UCSWarmSessions.key(*[ansible.get(option) for option in
+                                                  ("ucs_ip", "ucs_username", "ucs_password",
+                                                   "ucs_port", "ucs_secure", "ucs_proxy")])
+            server = self.warm_sessions.get(self.warm_key)
+            if server:
+                if self.perf:
+                    self.perf.attach(server)
+                self.handle = server
+                return server
+
         results = {}
         try:
             server = UcsHandle(ip=ansible["ucs_ip"],
@@ -36,13 +89,34 @@ class UcsConnection():
                                port=ansible["ucs_port"],
                                secure=ansible["ucs_secure"],
                                proxy=ansible["ucs_proxy"])
+            if self.perf:
+                self.perf.attach(server)
             server.login()
         except Exception as e:
             results["msg"] = str(e)
             self.module.fail_json(**results)
+        if self.session_cache:
+            self.session_cache.refreshed = time.time()
+        if self.warm_key:
+            self.warm_sessions.put(self.warm_key, server)
         self.handle = server
         return server
 
+    def _start_perf(self):
+        from ansible.module_utils.remote_management.ucs import UCSPerf
+        self.perf = UCSPerf(getattr(self.module, '_name', None),
+                            self.module.params.get('ucs_perf_trace_file'))
+
+        # modules build their own result dicts, so the summary is added on exit
+        def with_perf(exit_method):
+            def wrapper(**kwargs):
+                kwargs['perf'] = self.perf.summary
+                exit_method(**kwargs)
+            return wrapper
+
+        self.module.exit_json = with_perf(self.module.exit_json)
+        self.module.fail_json = with_perf(self.module.fail_json)
+
     def logout(self):
         server = self.module.params.get('ucs_server')
         if server:
@@ -50,7 +124,16 @@ class UcsConnection():
             # do not logout
             return False
 
+        if self.handle and self.perf:
+            self.perf.detach(self.handle)
+        if self.handle and self.warm_key:
+            # the worker daemon keeps the session for the next module run
+            return False
         if self.handle:
+            if self.session_cache:
+                # keep the session open on UCSM for the next module
+                self.session_cache.store(self.handle)
+                return False
             self.handle.logout()
             return True
         return False
@@ -68,4 +68,60 @@ options:
     - If use_proxy is no, specfies proxy to be used for connection.
       e.g. 'http://proxy.xy.z:8080'
     type: str
+  session_cache:
+    description:
+    - If C(yes), the UCS Manager session is kept open after the module finishes and is stored on the controller.
+    - Later modules using the same hostname, username, password, port and protocol reuse the stored session instead of logging in again.
+    - The session is refreshed while in use and is discarded once its refresh period has expired.
+    - A session that is discarded or replaced, e.g. after a password change, is logged out of UCS Manager.
+    type: bool
+    default: no
+  session_cache_dir:
+    description:
+    - Directory on the controller where cached UCS Manager sessions are stored.
+    - One file per hostname, username, port and protocol, the password is only kept as a salted HMAC.
+    type: path
+    default: ~/.ansible/ucs_session_cache
+  snapshot:
+    description:
+    - If C(yes), queries in check mode are answered from a local snapshot of UCS Manager instead of live queries.
+    - The snapshot holds the org-root, fabric/lan, fabric/san, fabric/server and sys subtrees and is stored compressed on the controller.
+    - It is taken again when it is older than snapshot_ttl or when UCS Manager has logged a configuration change since it was taken.
+    type: bool
+    default: no
+  snapshot_dir:
+    description:
+    - Directory on the controller where UCS Manager snapshots are stored.
+    type: path
+    default: ~/.ansible/ucs_snapshot
+  snapshot_ttl:
+    description:
+    - Seconds a snapshot is used before it is taken again.
+    type: int
+    default: 900
+  perf:
+    description:
+    - If C(yes), every UCS Manager XML API call is timed and a summary is returned in C(perf).
+    - The summary has the call count, latency histogram and request and response bytes per XML method,
+      and the count and time per dn or class touched.
+    type: bool
+    default: no
+  perf_trace_file:
+    description:
+    - File on the controller that every XML API call is appended to as a JSON line.
+    - Setting it also enables C(perf).
+    type: path
+  worker:
+    description:
+    - If C(yes), the module sends its arguments to the UCS worker listening on C(worker_socket) and returns its result.
+    - The worker keeps ucsmsdk imported and the UCS Manager sessions logged in between modules, start it with
+      C(python -m ansible.module_utils.remote_management.ucs_worker --library <library dir>).
+    - If no worker is listening, the module warns and runs by itself.
+    type: bool
+    default: no
+  worker_socket:
+    description:
+    - Unix socket of the UCS worker.
+    type: path
+    default: ~/.ansible/ucs_worker.sock
 '''
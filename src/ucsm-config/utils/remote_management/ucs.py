@@ -27,6 +27,16 @@
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 
+import binascii
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+import tempfile
+import threading
+import time
 
 try:
     import ucsmsdk
@@ -34,6 +44,16 @@ try:
 except:
     HAS_UCSMSDK = False
 
+UCS_SESSION_CACHE_DIR = '~/.ansible/ucs_session_cache'
+UCS_SNAPSHOT_DIR = '~/.ansible/ucs_snapshot'
+UCS_WORKER_SOCKET = '~/.ansible/ucs_worker.sock'
+
+# set to a UCSWarmSessions by the UCS worker daemon, modules then keep their sessions open between runs
+ucs_warm_sessions = None
+
+# set to a UCSPlanHandle by the plan compiler, modules then record their changes in a plan instead of logging in
+ucs_plan_handle = None
+
 ucs_argument_spec = dict(
     hostname=dict(type='str', required=True),
     username=dict(type='str', default='admin'),
@@ -42,49 +62,750 @@ ucs_argument_spec = dict(
     use_ssl=dict(type='bool', default=True),
     use_proxy=dict(type='bool', default=True),
     proxy=dict(type='str', default=None),
+    session_cache=dict(type='bool', default=False),
+    session_cache_dir=dict(type='path', default=UCS_SESSION_CACHE_DIR),
+    snapshot=dict(type='bool', default=False),
+    snapshot_dir=dict(type='path', default=UCS_SNAPSHOT_DIR),
+    snapshot_ttl=dict(type='int', default=900),
+    perf=dict(type='bool', default=False),
+    perf_trace_file=dict(type='path'),
+    worker=dict(type='bool', default=False),
+    worker_socket=dict(type='path', default=UCS_WORKER_SOCKET),
 )
 
 
+def query_classid_by_dn_prefix(login_handle, class_id, dn_prefix):
+    """Returns a dn to managed object index of every class_id object whose dn starts with dn_prefix.
+
+    The objects are read with one filtered configResolveClass instead of a
+    configResolveDn per object.  dn_prefix is matched literally, e.g. a dot
+    in an org or VLAN name prefix only matches a dot.
+    """
+    mo_list = login_handle.query_classid(class_id, filter_str='(dn, "^%s", type="re")' % re.escape(dn_prefix))
+    return dict((mo.dn, mo) for mo in mo_list)
+
+
+def wait_for_mo_state(login_handle, dn, prop, values, timeout, stop_values=(), delay=2, max_delay=60, match=None,
+                      since=None):
+    """Waits until the prop of the object at dn has one of values, or one of stop_values.
+
+    With match, a dict of property values, one of values only counts once the
+    object also has those, e.g. the pn_dn of the server a service profile is
+    being associated with, so a state left over from before a change is not
+    taken for the new one.  With since, a dict of the property values the
+    object had before the change, one of values only counts once the object
+    was seen without them, so a state UCSM has not started to change yet does
+    not end the wait.
+
+    The object is watched on the UCSM event channel (eventSubscribe) and
+    re-read as soon as a change event for it arrives.  The re-reads also run
+    on an exponential backoff from delay to max_delay seconds, which is all
+    that is left when the event channel can't be opened.
+
+    Returns the last object read (None if it does not exist) and whether prop
+    reached one of values before timeout seconds passed.
+    """
+    deadline = time.time() + timeout
+    changed = threading.Event()
+    event_handle = None
+    moved = not since
+    try:
+        while True:
+            changed.clear()
+            mo = login_handle.query_dn(dn)
+            value = getattr(mo, prop, None) if mo else None
+            if mo and not moved:
+                moved = not mo.check_prop_match(**since)
+            if value in values and moved and (not match or mo.check_prop_match(**match)):
+                return mo, True
+            if value in stop_values:
+                return mo, False
+            time_left = deadline - time.time()
+            if time_left <= 0:
+                return mo, False
+            if mo and not event_handle:
+                event_handle = _watch_mo(login_handle, mo, timeout, changed.set)
+                if event_handle:
+                    # a change may have been missed before the watch started
+                    continue
+            changed.wait(min(delay, time_left))
+            delay = min(delay * 2, max_delay)
+    finally:
+        if event_handle:
+            event_handle.clean()
+
+
+def _watch_mo(login_handle, mo, timeout, callback):
+    """Calls callback on every change event of mo, returns None if the event channel can't be used."""
+    try:
+        from ucsmsdk.ucseventhandler import UcsEventHandle
+
+        event_handle = UcsEventHandle(login_handle)
+        event_handle.add(managed_object=mo, timeout_sec=timeout, call_back=lambda mce: callback())
+        return event_handle
+    except Exception:
+        return None
+
+
+def _watch_classes(login_handle, class_ids, timeout, callback):
+    """Calls callback on every change event of an object of class_ids, returns None if the event channel can't be used."""
+    try:
+        from ucsmsdk.ucseventhandler import UcsEventHandle
+
+        event_handle = UcsEventHandle(login_handle)
+        for class_id in class_ids:
+            event_handle.add(class_id=class_id, timeout_sec=timeout, call_back=lambda mce: callback())
+        return event_handle
+    except Exception:
+        return None
+
+
+class UCSStateWatch():
+    """Paces a module that waits on the state of many objects at once.
+
+    The module re-reads its objects after every wait().  A change event of an
+    object of class_ids on the UCSM event channel ends the wait early, the
+    waits also follow an exponential backoff from delay to max_delay seconds,
+    which is all that is left when the event channel can't be opened.
+    reset() starts the backoff over, e.g. after committing new changes.
+    """
+
+    def __init__(self, login_handle, class_ids, timeout, delay=2, max_delay=60):
+        self.first_delay = self.delay = delay
+        self.max_delay = max_delay
+        self.changed = threading.Event()
+        self.event_handle = _watch_classes(login_handle, class_ids, timeout, self.changed.set)
+
+    def reset(self):
+        self.delay = self.first_delay
+
+    def wait(self, time_left):
+        # an event that arrived since the last wait ends this one at once
+        self.changed.wait(max(0, min(self.delay, time_left)))
+        self.changed.clear()
+        self.delay = min(self.delay * 2, self.max_delay)
+
+    def close(self):
+        if self.event_handle:
+            self.event_handle.clean()
+            self.event_handle = None
+
+
+def ucs_login(params, perf=None):
+    """Returns a UcsHandle logged in with the connection options in params.
+
+    If perf (a UCSPerf) is given, it records the calls from aaaLogin on.
+    """
+    from ucsmsdk.ucshandle import UcsHandle
+
+    # use_proxy=yes (default) and proxy=None (default) should be using the system defined proxy
+    # use_proxy=yes (default) and proxy=value should use the provided proxy
+    # use_proxy=no (user) should not be using a proxy
+    if params['use_proxy']:
+        proxy = params['proxy']
+    else:
+        # force no proxy to be used.  Note that proxy=None in UcsHandle will
+        # use the system proxy so we must set to something else
+        proxy = {}
+
+    handle = UcsHandle(ip=params['hostname'],
+                       username=params['username'],
+                       password=params['password'],
+                       port=params['port'],
+                       secure=params['use_ssl'],
+                       proxy=proxy)
+    if perf:
+        perf.attach(handle)
+    handle.login()
+    return handle
+
+
+class UCSSessionCache():
+    """Controller side store of UCSM sessions keyed by hostname, username, port and protocol.
+
+    A session is saved with UcsHandle.freeze() (minus the password) when a
+    module finishes and is restored by the next module that talks to the same
+    UCSM as the same user with the same password, port and protocol.  The file
+    name does not depend on the password, the entry holds an HMAC of the
+    password and the other connection options with a random salt, and an
+    entry that does not match them is logged out and replaced.  The cookie is
+    refreshed with aaaRefresh once half of its refresh period has passed and
+    dropped once the period is over.
+    """
+
+    def __init__(self, cache_dir, hostname, username, password, port=None, use_ssl=None, *options):
+        self.cache_dir = os.path.expanduser(cache_dir or UCS_SESSION_CACHE_DIR)
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        # options are the other connection options, e.g. the proxy, they are only compared through the HMAC
+        self.secret = json.dumps([password] + list(options), sort_keys=True, default=str)
+        key = hashlib.sha1(repr((hostname, username, port, use_ssl)).encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.cache_dir, key + '.json')
+        # time the cached cookie was last issued by aaaLogin or aaaRefresh
+        self.refreshed = None
+
+    def digest(self, salt):
+        return hmac.new(salt.encode('utf-8'), self.secret.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def matches(self, entry):
+        return hmac.compare_digest(entry.get('auth', ''), self.digest(entry.get('salt', '')))
+
+    def load(self):
+        from ucsmsdk.ucsmethodfactory import aaa_refresh
+
+        entry = self.read()
+        if entry is None:
+            return None
+
+        self.refreshed = entry.get('refreshed', 0)
+        age = time.time() - self.refreshed
+        if not self.matches(entry) or age >= entry.get('refresh_period', 0):
+            self.discard(entry)
+            return None
+
+        try:
+            handle = self.unfreeze(entry)
+            cookie = handle.cookie
+            if age >= entry['refresh_period'] / 2:
+                # aaaRefresh responses update the handle cookie in place
+                handle.process_xml_elem(aaa_refresh(cookie, self.username, self.password))
+            else:
+                # validates the cookie and only logs in again if UCSM rejects it
+                handle.login()
+            if handle.cookie != cookie:
+                self.refreshed = time.time()
+                self.store(handle)
+        except Exception:
+            self.discard(entry)
+            return None
+        return handle
+
+    def unfreeze(self, entry):
+        from ucsmsdk.ucshandle import UcsHandle
+
+        frozen = json.loads(entry['handle'])
+        frozen['password'] = self.password
+        return UcsHandle.unfreeze(json.dumps(frozen))
+
+    def store(self, handle):
+        current = self.read()
+        if current is not None and json.loads(current['handle']).get('cookie') != handle.cookie:
+            if self.matches(current) and time.time() - current.get('refreshed', 0) < current.get('refresh_period', 0):
+                # another module stored a live session first, it is kept and this one is closed
+                self.logout(handle)
+                return False
+            self.logout_entry(current)
+        frozen = json.loads(handle.freeze())
+        frozen.pop('password', None)
+        salt = binascii.hexlify(os.urandom(16)).decode('ascii')
+        entry = dict(
+            hostname=self.hostname,
+            username=self.username,
+            salt=salt,
+            auth=self.digest(salt),
+            refreshed=self.refreshed or time.time(),
+            refresh_period=int(handle.refresh_period or 0),
+            handle=json.dumps(frozen),
+        )
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def discard(self, entry=None):
+        # the cookie of a dropped entry is logged out, so no session is left open on UCSM
+        if entry is not None:
+            self.logout_entry(entry)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def logout_entry(self, entry):
+        try:
+            self.logout(self.unfreeze(entry))
+        except Exception:
+            pass
+
+    @staticmethod
+    def logout(handle):
+        try:
+            handle.logout()
+        except Exception:
+            pass
+
+
+class UCSPerf():
+    """Per XML API method call statistics of a UcsHandle.
+
+    attach() wraps the post_xml method of a handle, which every query,
+    commit and login goes through, and records the method, the dn or class
+    it touched, its latency and the request and response sizes.  summary is
+    updated in place, so it can be put in a module result before the calls
+    are made.  With trace_file every call is also appended to the file as a
+    JSON line.
+    """
+
+    # upper bounds of the latency histogram buckets in milliseconds
+    BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    TAG_RE = re.compile(br'<(\w+)')
+    TARGET_RE = re.compile(br'(?: dn| inDn| classId| key|<dn value)="([^"]*)"')
+
+    def __init__(self, module_name=None, trace_file=None):
+        self.module_name = module_name
+        self.trace_file = trace_file
+        self.summary = dict(calls=0, time=0.0, request_bytes=0, response_bytes=0, methods={}, targets={})
+
+    def attach(self, handle):
+        # a warm handle may still carry the wrapper of an earlier module run
+        post_xml = getattr(handle, '_untimed_post_xml', handle.post_xml)
+        handle._untimed_post_xml = post_xml
+
+        def timed_post_xml(xml_str, read=True, timeout=None):
+            start = time.time()
+            response = post_xml(xml_str, read=read, timeout=timeout)
+            self.record(xml_str, response if read else None, start, time.time() - start)
+            return response
+
+        handle.post_xml = timed_post_xml
+        return handle
+
+    def detach(self, handle):
+        if hasattr(handle, '_untimed_post_xml'):
+            handle.post_xml = handle._untimed_post_xml
+            del handle._untimed_post_xml
+
+    def record(self, xml_str, response, start, latency):
+        if not isinstance(xml_str, bytes):
+            xml_str = xml_str.encode('utf-8')
+        match = self.TAG_RE.search(xml_str)
+        method = match.group(1).decode('utf-8') if match else 'unknown'
+        # configConfMos and configResolveDns carry several dns, the other query methods one dn or class
+        targets = sorted(set(value.decode('utf-8') for value in self.TARGET_RE.findall(xml_str)))
+        request_bytes = len(xml_str)
+        response_bytes = len(response) if response else 0
+
+        summary = self.summary
+        summary['calls'] += 1
+        summary['time'] = round(summary['time'] + latency, 6)
+        summary['request_bytes'] += request_bytes
+        summary['response_bytes'] += response_bytes
+
+        entry = summary['methods'].setdefault(method, dict(count=0, time=0.0, request_bytes=0, response_bytes=0,
+                                                           histogram=dict()))
+        entry['count'] += 1
+        entry['time'] = round(entry['time'] + latency, 6)
+        entry['request_bytes'] += request_bytes
+        entry['response_bytes'] += response_bytes
+        bucket = next(('<=%dms' % bound for bound in self.BUCKETS if latency * 1000 <= bound), '>%dms' % self.BUCKETS[-1])
+        entry['histogram'][bucket] = entry['histogram'].get(bucket, 0) + 1
+
+        for target in targets:
+            target_entry = summary['targets'].setdefault(target, dict(count=0, time=0.0))
+            target_entry['count'] += 1
+            target_entry['time'] = round(target_entry['time'] + latency, 6)
+
+        if self.trace_file:
+            line = dict(ts=round(start, 6), module=self.module_name, method=method, targets=targets,
+                        latency=round(latency, 6), request_bytes=request_bytes, response_bytes=response_bytes)
+            try:
+                with open(os.path.expanduser(self.trace_file), 'a') as f:
+                    f.write(json.dumps(line) + '\n')
+            except (IOError, OSError):
+                self.trace_file = None
+
+
+class UCSWarmSessions():
+    """Logged in UcsHandles kept open by a long lived process between module runs.
+
+    Handles are keyed by the connection options and password, and are logged
+    in again once half of their refresh period has passed, so a module never
+    gets a cookie that is about to expire.
+    """
+
+    def __init__(self):
+        self.handles = {}
+
+    @staticmethod
+    def key(*options):
+        return hashlib.sha1(repr(options).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        if key not in self.handles:
+            return None
+        handle, login_time = self.handles[key]
+        if time.time() - login_time < int(handle.refresh_period or 0) / 2:
+            return handle
+        self.discard(key)
+        return None
+
+    def put(self, key, handle):
+        if key not in self.handles:
+            self.handles[key] = (handle, time.time())
+
+    def discard(self, key):
+        handle, login_time = self.handles.pop(key)
+        try:
+            handle.logout()
+        except Exception:
+            pass
+
+    def close(self):
+        for key in list(self.handles):
+            self.discard(key)
+
+
+def forward_to_worker(module, socket_path):
+    """Runs the module in the UCS worker daemon and exits with its result.
+
+    Returns False without exiting if no worker is listening on socket_path,
+    so the module can run by itself.
+    """
+    from ansible.module_utils.basic import _load_params
+    from ansible.module_utils.remote_management.ucs_worker import worker_request
+
+    # the worker validates the arguments as given to the module, with the internal _ansible_ ones
+    args = _load_params()
+    name = args.get('_ansible_module_name') or module._name
+    try:
+        result = worker_request(socket_path, dict(module=name.split('.')[-1], args=args))
+    except (IOError, OSError, ValueError) as e:
+        module.warn('UCS worker at %s is not available (%s), running in the module process' % (socket_path, e))
+        return False
+    result.pop('invocation', None)
+    if result.pop('failed', False):
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+def validate_module_params(module):
+    """Fails the module if ucsmsdk would reject one of its arguments, before it logs in."""
+    try:
+        from ansible.module_utils.remote_management.ucs_validate import placeholders, validate_params
+
+        errors = validate_params(module._name.split('.')[-1], module.params)
+        unset = sorted(set(placeholders(module.params)))
+    except Exception as e:
+        module.fail_json(msg='argument validation error: %s' % str(e))
+    if errors:
+        module.fail_json(msg='invalid arguments: %s' % '; '.join(errors))
+    if unset:
+        module.warn('placeholders of the role vars are not set: %s' % ', '.join(unset))
+
+
+class UCSSnapshot():
+    """Controller side compressed dump of the UCSM configuration and equipment trees.
+
+    The org-root, fabric/lan, fabric/san, fabric/server and sys subtrees are read with one
+    hierarchical configResolveDn each and kept in a gzipped JSON file per
+    hostname.  A snapshot is used while it is younger than ttl seconds and no
+    configuration change (aaaModLR audit record) has been logged on UCSM since
+    it was taken, otherwise it is taken again.
+    """
+
+    ROOTS = ('org-root', 'fabric/lan', 'fabric/san', 'fabric/server', 'sys')
+
+    def __init__(self, snapshot_dir, hostname, ttl):
+        self.snapshot_dir = os.path.expanduser(snapshot_dir or UCS_SNAPSHOT_DIR)
+        self.ttl = ttl
+        key = hashlib.sha1(hostname.encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.snapshot_dir, key + '.json.gz')
+        # set to True when load() had to query UCSM for a new snapshot
+        self.taken = False
+
+    def load(self, login_handle):
+        """Returns a UCSSnapshotHandle for login_handle, taking a new snapshot if needed."""
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                entry = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            entry = None
+
+        if entry and (time.time() - entry['taken'] >= self.ttl or self.changed_since(login_handle, entry['ucsm_time'])):
+            entry = None
+        if not entry:
+            entry = self.take(login_handle)
+            self.store(entry)
+            self.taken = True
+        return UCSSnapshotHandle(login_handle, entry['mos'])
+
+    def changed_since(self, login_handle, ucsm_time):
+        # every configuration change is logged as an aaaModLR audit record
+        records = login_handle.query_classid('AaaModLR', filter_str='(created, "%s", type="gt")' % ucsm_time)
+        return len(records) > 0
+
+    def take(self, login_handle):
+        # the UCSM clock is used for the change check, so local clock skew does not matter
+        ucsm_time = login_handle.query_dn('sys').current_time
+        mos = []
+        for root in self.ROOTS:
+            for mo in login_handle.query_dn(root, hierarchy=True):
+                elem = mo.to_xml()
+                mos.append([elem.tag, dict(elem.attrib, rn=mo.rn)])
+        return dict(taken=time.time(), ucsm_time=ucsm_time, mos=mos)
+
+    def store(self, entry):
+        try:
+            if not os.path.isdir(self.snapshot_dir):
+                os.makedirs(self.snapshot_dir, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir)
+            os.close(fd)
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(json.dumps(entry).encode('utf-8'))
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class UCSSnapshotHandle():
+    """UcsHandle stand-in that answers queries under the UCSSnapshot roots from a snapshot.
+
+    query_dn, query_classid(s) and query_children are resolved against the
+    snapshot, managed objects are only built from the stored XML attributes
+    when they are first looked up.  Queries the snapshot can't answer and
+    every other attribute are passed on to the login handle.
+    """
+
+    FILTER_RE = re.compile(r'^\((\w+), "(.*)", type="(eq|re)"\)$')
+
+    def __init__(self, login_handle, mos):
+        self.login_handle = login_handle
+        self.entries = {}
+        self.child_dns = {}
+        self.class_dns = {}
+        self.mos = {}
+        for tag, attrib in mos:
+            dn = attrib['dn']
+            self.entries[dn] = (tag, attrib)
+            parent_dn = dn[:len(dn) - len(attrib['rn'])].rstrip('/')
+            self.child_dns.setdefault(parent_dn, []).append(dn)
+            self.class_dns.setdefault(tag.lower(), []).append(dn)
+
+    def __getattr__(self, name):
+        return getattr(self.login_handle, name)
+
+    def covers(self, dn):
+        return any(dn == root or dn.startswith(root + '/') for root in UCSSnapshot.ROOTS)
+
+    def mo(self, dn):
+        if dn not in self.mos:
+            import xml.etree.ElementTree as ET
+            from ucsmsdk import ucscoreutils, ucsgenutils
+
+            tag, attrib = self.entries[dn]
+            elem = ET.Element(tag, attrib)
+            mo = ucscoreutils.get_ucs_obj(ucsgenutils.word_u(tag), elem)
+            mo.from_xml(elem)
+            self.mos[dn] = mo
+        return self.mos[dn]
+
+    def query_dn(self, dn, hierarchy=False, need_response=False, timeout=None):
+        if need_response or not self.covers(dn):
+            return self.login_handle.query_dn(dn, hierarchy=hierarchy, need_response=need_response, timeout=timeout)
+        if hierarchy:
+            return [self.mo(mo_dn) for mo_dn in self.entries if mo_dn == dn or mo_dn.startswith(dn + '/')]
+        if dn in self.entries:
+            return self.mo(dn)
+        return None
+
+    def query_classid(self, class_id=None, filter_str=None, hierarchy=False, need_response=False, timeout=None):
+        match = self.FILTER_RE.match(filter_str) if filter_str else None
+        if not class_id or hierarchy or need_response or (filter_str and not match):
+            return self.login_handle.query_classid(class_id=class_id, filter_str=filter_str, hierarchy=hierarchy,
+                                                   need_response=need_response, timeout=timeout)
+        mo_list = []
+        for dn in self.class_dns.get(class_id.lower(), []):
+            if match:
+                prop, value, filter_type = match.groups()
+                mo_value = getattr(self.mo(dn), prop, None)
+                if mo_value is None:
+                    continue
+                if filter_type == 'eq' and mo_value != value:
+                    continue
+                if filter_type == 're' and not re.search(value, mo_value):
+                    continue
+            mo_list.append(self.mo(dn))
+        return mo_list
+
+    def query_classids(self, *class_ids):
+        return dict((class_id, self.query_classid(class_id)) for class_id in class_ids)
+
+    def query_children(self, in_mo=None, in_dn=None, class_id=None, filter_str=None, hierarchy=False, timeout=None):
+        parent_dn = in_mo.dn if in_mo else in_dn
+        if not parent_dn or filter_str or hierarchy or not self.covers(parent_dn):
+            return self.login_handle.query_children(in_mo=in_mo, in_dn=in_dn, class_id=class_id, filter_str=filter_str,
+                                                    hierarchy=hierarchy, timeout=timeout)
+        mo_list = [self.mo(dn) for dn in self.child_dns.get(parent_dn, [])]
+        if class_id:
+            mo_list = [mo for mo in mo_list if mo.get_class_id().lower() == class_id.lower()]
+        return mo_list
+
+
 class UCSModule():
 
     def __init__(self, module):
         self.module = module
         self.result = {}
+        self.login_handle = None
+        self.session_cache = None
+        self.snapshot = None
+        self.perf = None
+        self.warm_key = None
+        if self.module.params.get('worker') and ucs_warm_sessions is None:
+            forward_to_worker(self.module, self.module.params.get('worker_socket'))
         if not HAS_UCSMSDK:
             self.module.fail_json(msg='ucsmsdk is required for this module')
+        validate_module_params(self.module)
         self.login()
 
     def __del__(self):
         self.logout()
 
     def login(self):
-        from ucsmsdk.ucshandle import UcsHandle
+        if ucs_plan_handle is not None:
+            self.login_handle = ucs_plan_handle
+            return
 
-        # use_proxy=yes (default) and proxy=None (default) should be using the system defined proxy
-        # use_proxy=yes (default) and proxy=value should use the provided proxy
-        # use_proxy=no (user) should not be using a proxy
-        if self.module.params['use_proxy']:
-            proxy = self.module.params['proxy']
-        else:
-            # force no proxy to be used.  Note that proxy=None in UcsHandle will
-            # use the system proxy so we must set to something else
-            proxy = {}
+        handle = None
+        if self.module.params.get('perf') or self.module.params.get('perf_trace_file'):
+            self.perf = UCSPerf(getattr(self.module, '_name', None), self.module.params.get('perf_trace_file'))
+            self.result['perf'] = self.perf.summary
 
-        try:
-            handle = UcsHandle(ip=self.module.params['hostname'],
-                               username=self.module.params['username'],
-                               password=self.module.params['password'],
-                               port=self.module.params['port'],
-                               secure=self.module.params['use_ssl'],
-                               proxy=proxy)
-            handle.login()
-        except Exception as e:
-            self.result['msg'] = str(e)
-            self.module.fail_json(**self.result)
+        if self.module.params.get('session_cache'):
+            self.session_cache = UCSSessionCache(self.module.params.get('session_cache_dir'),
+                                                 *[self.module.params.get(option) for option in
+                                                   ('hostname', 'username', 'password', 'port', 'use_ssl', 'use_proxy', 'proxy')])
+            handle = self.session_cache.load()
+
+        if ucs_warm_sessions is not None:
+            self.warm_key = UCSWarmSessions.key(*[self.module.params.get(option) for option in
+                                                  ('hostname', 'username', 'password', 'port', 'use_ssl', 'use_proxy', 'proxy')])
+            handle = ucs_warm_sessions.get(self.warm_key)
+
+        if handle and self.perf:
+            self.perf.attach(handle)
+
+        if not handle:
+            try:
+                handle = ucs_login(self.module.params, self.perf)
+            except Exception as e:
+                self.result['msg'] = str(e)
+                self.module.fail_json(**self.result)
+            if self.session_cache:
+                self.session_cache.refreshed = time.time()
+            if self.warm_key:
+                ucs_warm_sessions.put(self.warm_key, handle)
         self.login_handle = handle
 
+        if self.module.params.get('snapshot') and self.module.check_mode:
+            # check mode only reads, so queries can be answered from the snapshot
+            self.snapshot = UCSSnapshot(self.module.params.get('snapshot_dir'),
+                                        self.module.params['hostname'],
+                                        self.module.params.get('snapshot_ttl'))
+            try:
+                self.login_handle = self.snapshot.load(handle)
+            except Exception as e:
+                self.result['msg'] = 'snapshot error: %s' % str(e)
+                self.module.fail_json(**self.result)
+
     def logout(self):
+        if self.login_handle is not None and self.login_handle is ucs_plan_handle:
+            self.login_handle = None
+            return False
+        if isinstance(self.login_handle, UCSSnapshotHandle):
+            self.login_handle = self.login_handle.login_handle
+        if self.login_handle and self.perf:
+            self.perf.detach(self.login_handle)
+        if self.login_handle and self.warm_key:
+            # the worker daemon keeps the session for the next module run
+            self.login_handle = None
+            return False
         if self.login_handle:
+            if self.session_cache:
+                # keep the session open on UCSM for the next module
+                self.session_cache.store(self.login_handle)
+                self.login_handle = None
+                return False
             self.login_handle.logout()
+            self.login_handle = None
             return True
         return False
+
+
+class UCSSubtree():
+    """In-memory dn to managed object index of a UCS Manager subtree.
+
+    The object at dn and everything below it are read with a single
+    hierarchical configResolveDn.  query_dn and query_children mirror the
+    UcsHandle methods of the same name and answer from the index, so a module
+    can compare a policy and all of its children against the desired state
+    without a round trip per child.  Lookups outside of the subtree fall back
+    to the login handle.
+    """
+
+    def __init__(self, login_handle, dn):
+        self.login_handle = login_handle
+        self.dn = dn
+        self.mos = {}
+        self.child_mos = {}
+        for mo in login_handle.query_dn(dn, hierarchy=True):
+            self.mos[mo.dn] = mo
+            parent_dn = mo.dn[:len(mo.dn) - len(mo.rn)].rstrip('/')
+            self.child_mos.setdefault(parent_dn, []).append(mo)
+
+    def __contains__(self, dn):
+        return dn in self.mos
+
+    def exists(self):
+        return self.dn in self.mos
+
+    def in_subtree(self, dn):
+        return dn == self.dn or dn.startswith(self.dn + '/')
+
+    def query_dn(self, dn):
+        if not self.in_subtree(dn):
+            return self.login_handle.query_dn(dn)
+        return self.mos.get(dn)
+
+    def query_children(self, in_mo=None, in_dn=None, class_id=None):
+        if in_mo:
+            parent_dn = in_mo.dn
+        elif in_dn:
+            parent_dn = in_dn
+        else:
+            raise ValueError('Provide in_mo or in_dn.')
+        if not self.in_subtree(parent_dn):
+            return self.login_handle.query_children(in_dn=parent_dn, class_id=class_id)
+
+        mo_list = self.child_mos.get(parent_dn, [])
+        if class_id:
+            mo_list = [mo for mo in mo_list if mo.get_class_id().lower() == class_id.lower()]
+        return list(mo_list)
+
+    def prop_match(self, dn, **kwargs):
+        # True if the object at dn exists and has all of the given property values
+        mo = self.query_dn(dn)
+        return mo is not None and mo.check_prop_match(**kwargs)
@@ -0,0 +1,402 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign whatever license you want.
+#
+# Copyright (c) 2018 Cisco Systems
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF
+# THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Offline compiler of the ucsm-config roles into one configConfMos document.
+
+The tasks of each role are rendered with the role vars and their modules are
+run in process against a UCSPlanHandle instead of UCS Manager.  The handle
+answers queries from the objects recorded so far and records what the modules
+add_mo, set_mo and remove_mo on commit.  The result is the configuration of
+the roles as configConfMos pairs, built by the ucsmsdk mometa classes of the
+modules, in task order:
+
+    python -m ansible.module_utils.remote_management.ucs_compiler --library library --output plan.xml
+
+The plan starts from an empty domain.  Modules that change objects UCS
+Manager creates by itself (the timezone, the PSU policy) need them to exist,
+--seed takes a UCSSnapshot file whose objects are treated as existing, and
+the plan then only holds what the roles change on top of it.
+
+ucs_apply_plan diffs the document against a UCSSnapshot of the domain and
+sends the pairs that differ, in one configConfMos by default.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import sys
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from ansible.module_utils.remote_management.ucs import UCSSnapshot, UCSSnapshotHandle
+
+ROLES = ['admin', 'equipment', 'network', 'storage', 'server']
+TASK_KEYWORDS = ['name', 'with_items', 'with_list', 'loop', 'when', 'register', 'tags']
+
+# the tasks log in with these, compiling never connects to UCS Manager
+CONNECTION_VARS = dict(ucs_ip='plan', ucs_username='admin', ucs_password='plan')
+
+# XML attributes that name an object or the operation on it instead of configuring it
+NAMING_ATTRIBUTES = ('dn', 'rn', 'status', 'childAction')
+
+
+def element_dn(elem, parent_dn=''):
+    return elem.get('dn') or parent_dn + '/' + elem.get('rn')
+
+
+def is_removal(elem):
+    status = elem.get('status') or ''
+    return 'deleted' in status or 'removed' in status
+
+
+def merge_element(target, source):
+    # source is applied after target: its properties win and its children are merged by dn
+    target_dn = element_dn(target)
+    target.attrib.update(source.attrib)
+    children = dict((element_dn(child, target_dn), child) for child in target)
+    for child in source:
+        child_dn = element_dn(child, target_dn)
+        if child_dn in children and not is_removal(child):
+            merge_element(children[child_dn], child)
+            continue
+        if child_dn in children:
+            target.remove(children[child_dn])
+        target.append(child)
+
+
+def load_seed(path):
+    """Returns the objects of a UCSSnapshot file in the form UCSSnapshotHandle is built from."""
+    import gzip
+    import json
+
+    with gzip.open(os.path.expanduser(path), 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))['mos']
+
+
+def element_to_mo(elem):
+    """Returns the ucsmsdk managed object, with children, of a configConfMos pair element."""
+    from ucsmsdk import ucscoreutils, ucsgenutils
+
+    mo = ucscoreutils.get_ucs_obj(ucsgenutils.word_u(elem.tag), elem)
+    mo.from_xml(elem)
+    # from_xml leaves the objects clean and commit only writes dirty properties
+    stack = [mo]
+    while stack:
+        node = stack.pop()
+        node.mark_dirty()
+        stack.extend(node.child)
+    return mo
+
+
+class UCSPlan():
+    """Ordered configConfMos pairs keyed by the dn of their top-level object."""
+
+    def __init__(self):
+        self.pairs = OrderedDict()
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def record(self, dn, elem):
+        if dn in self.pairs:
+            merge_element(self.pairs[dn], elem)
+        else:
+            self.pairs[dn] = elem
+
+    def remove(self, dn, elem=None):
+        """Drops dn and everything below it from the plan.  elem, a removal element, is recorded for objects of the seed."""
+        for pair_dn in list(self.pairs):
+            if pair_dn == dn or pair_dn.startswith(dn + '/'):
+                del self.pairs[pair_dn]
+            elif dn.startswith(pair_dn + '/'):
+                self.remove_child(self.pairs[pair_dn], pair_dn, dn)
+        if elem is not None:
+            self.pairs[dn] = elem
+
+    def remove_child(self, elem, elem_dn, dn):
+        for child in list(elem):
+            child_dn = element_dn(child, elem_dn)
+            if child_dn == dn:
+                elem.remove(child)
+            elif dn.startswith(child_dn + '/'):
+                self.remove_child(child, child_dn, dn)
+
+    def objects(self):
+        count = 0
+        for elem in self.pairs.values():
+            count += sum(1 for node in elem.iter())
+        return count
+
+    def to_xml_str(self, pairs=None, cookie=''):
+        """Returns the configConfMos document of pairs, a list of (dn, element), or of the whole plan."""
+        from ucsmsdk.ucsbasetype import ConfigMap
+        from ucsmsdk.ucsmethodfactory import config_conf_mos
+
+        method = config_conf_mos(cookie, ConfigMap(), False)
+        in_configs = method.find('inConfigs')
+        for dn, elem in self.pairs.items() if pairs is None else pairs:
+            ET.SubElement(in_configs, 'pair', dict(key=dn)).append(elem)
+        return ET.tostring(method)
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_xml_str())
+
+    @classmethod
+    def load(cls, path):
+        plan = cls()
+        for pair in ET.parse(path).getroot().iter('pair'):
+            plan.pairs[pair.get('key')] = pair[0]
+        return plan
+
+    def delta(self, entries):
+        """Returns (dn, element) of the pairs that differ from entries, a UCSSnapshotHandle.entries index.
+
+        Objects whose properties all match are dropped from the elements, a
+        pair is kept as long as it or one of its children has to change.
+        Objects outside of the snapshot roots are always kept.
+        """
+        pairs = []
+        for dn, elem in self.pairs.items():
+            changed = self.changed_element(elem, dn, entries)
+            if changed is not None:
+                pairs.append((dn, changed))
+        return pairs
+
+    def changed_element(self, elem, dn, entries):
+        covered = any(dn == root or dn.startswith(root + '/') for root in UCSSnapshot.ROOTS)
+        current = entries.get(dn)
+        if is_removal(elem):
+            return elem if current is not None or not covered else None
+
+        children = []
+        for child in elem:
+            changed_child = self.changed_element(child, element_dn(child, dn), entries)
+            if changed_child is not None:
+                children.append(changed_child)
+        if current is not None and not children and \
+                all(current[1].get(name) == value for name, value in elem.attrib.items() if name not in NAMING_ATTRIBUTES):
+            return None
+
+        changed = ET.Element(elem.tag, elem.attrib)
+        changed.extend(children)
+        return changed
+
+
+class UCSPlanHandle(UCSSnapshotHandle):
+    """UcsHandle stand-in that records commits into a UCSPlan.
+
+    Queries are answered from the objects committed so far, so a module sees
+    the objects of earlier tasks like it would on UCS Manager.  add_mo,
+    set_mo and remove_mo go to the commit buffer of a UcsHandle that is never
+    logged in.  Queries that can't be answered without UCS Manager raise
+    ValueError.
+    """
+
+    def __init__(self, plan, mos=()):
+        from ucsmsdk.ucshandle import UcsHandle
+
+        UCSSnapshotHandle.__init__(self, UcsHandle('plan', '', ''), mos)
+        self.plan = plan
+        self.seed_dns = set(self.entries)
+
+    def covers(self, dn):
+        return True
+
+    def offline(self, what):
+        raise ValueError('%s can not be compiled into a plan' % what)
+
+    def query_dn(self, dn, hierarchy=False, need_response=False, timeout=None):
+        if need_response:
+            self.offline('configResolveDn with need_response')
+        return UCSSnapshotHandle.query_dn(self, dn, hierarchy=hierarchy)
+
+    def query_classid(self, class_id=None, filter_str=None, hierarchy=False, need_response=False, timeout=None):
+        if not class_id or hierarchy or need_response or (filter_str and not self.FILTER_RE.match(filter_str)):
+            self.offline('configResolveClass %s %s' % (class_id, filter_str or ''))
+        return UCSSnapshotHandle.query_classid(self, class_id, filter_str)
+
+    def query_children(self, in_mo=None, in_dn=None, class_id=None, filter_str=None, hierarchy=False, timeout=None):
+        if filter_str or hierarchy or not (in_mo or in_dn):
+            self.offline('configResolveChildren %s' % (filter_str or ''))
+        return UCSSnapshotHandle.query_children(self, in_mo=in_mo, in_dn=in_dn, class_id=class_id)
+
+    def process_xml_elem(self, elem, timeout=None):
+        self.offline(elem.tag)
+
+    def commit(self, tag=None, timeout=None):
+        mo_dict = dict(self.login_handle._get_commit_buf(tag))
+        self.login_handle.commit_buffer_discard(tag)
+        for dn, mo in mo_dict.items():
+            elem = mo.to_xml()
+            if is_removal(elem):
+                self.plan.remove(dn, elem if dn in self.seed_dns else None)
+                self.unindex(dn)
+            else:
+                self.plan.record(dn, elem)
+                self.index(elem, dn, mo.rn)
+
+    def index(self, elem, dn, rn):
+        attrib = dict((name, value) for name, value in elem.attrib.items() if name != 'status')
+        attrib.update(dn=dn, rn=rn)
+        if dn in self.entries:
+            attrib = dict(self.entries[dn][1], **attrib)
+        else:
+            self.child_dns.setdefault(dn[:len(dn) - len(rn)].rstrip('/'), []).append(dn)
+            self.class_dns.setdefault(elem.tag.lower(), []).append(dn)
+        self.entries[dn] = (elem.tag, attrib)
+        self.mos.pop(dn, None)
+        for child in elem:
+            child_dn = element_dn(child, dn)
+            if is_removal(child):
+                self.unindex(child_dn)
+            else:
+                self.index(child, child_dn, child_dn[len(dn) + 1:])
+
+    def unindex(self, dn):
+        for child_dn in list(self.child_dns.get(dn, [])):
+            self.unindex(child_dn)
+        self.child_dns.pop(dn, None)
+        if dn not in self.entries:
+            return
+        tag, attrib = self.entries.pop(dn)
+        self.mos.pop(dn, None)
+        self.child_dns[dn[:len(dn) - len(attrib['rn'])].rstrip('/')].remove(dn)
+        self.class_dns[tag.lower()].remove(dn)
+
+
+class UCSRoleRenderer():
+    """Renders the tasks of roles into module names and arguments, without running them."""
+
+    def __init__(self, extra_vars=None):
+        import jinja2
+
+        self.env = jinja2.Environment()
+        self.context = dict(CONNECTION_VARS, **(extra_vars or {}))
+
+    def render(self, value, context):
+        if isinstance(value, dict):
+            return dict((key, self.render(item, context)) for key, item in value.items())
+        if isinstance(value, list):
+            return [self.render(item, context) for item in value]
+        if not isinstance(value, str) or '{{' not in value:
+            return value
+        stripped = value.strip()
+        if stripped.startswith('{{') and stripped.endswith('}}') and stripped.count('{{') == 1:
+            # a lone expression keeps its type, like Ansible does for lists and dicts
+            return self.env.compile_expression(stripped[2:-2])(**context)
+        return self.env.from_string(value).render(**context)
+
+    def role_tasks(self, role_dir):
+        """Yields task name, module name and arguments of every module run of the role, loops unrolled."""
+        import yaml
+
+        with open(os.path.join(role_dir, 'vars', 'main.yml')) as f:
+            context = dict(self.context, **(yaml.safe_load(f) or {}))
+        with open(os.path.join(role_dir, 'tasks', 'main.yml')) as f:
+            tasks = yaml.safe_load(f) or []
+        for task in tasks:
+            for module_name, args in self.task_runs(task, context):
+                yield task.get('name') or '', module_name, args
+
+    def task_runs(self, task, context):
+        module_name = [key for key in task if key not in TASK_KEYWORDS][0]
+        loop = task.get('with_items', task.get('with_list', task.get('loop')))
+        if loop is None:
+            items = [None]
+        else:
+            items = []
+            for item in self.render(loop, context):
+                items.extend(item if 'with_items' in task and isinstance(item, list) else [item])
+
+        for item in items:
+            item_context = dict(context, item=item)
+            if 'when' in task and not self.env.compile_expression(task['when'])(**item_context):
+                continue
+            yield module_name, self.render(task[module_name] or {}, item_context)
+
+
+class UCSCompiler(UCSRoleRenderer):
+    """Renders role tasks and runs their modules against a UCSPlanHandle."""
+
+    def __init__(self, library, extra_vars=None, seed=()):
+        from ansible.module_utils.remote_management.ucs_worker import UCSModuleRunner
+
+        UCSRoleRenderer.__init__(self, extra_vars)
+        self.runner = UCSModuleRunner(library)
+        self.plan = UCSPlan()
+        self.handle = UCSPlanHandle(self.plan, seed)
+        self.errors = []
+
+    def compile_role(self, role_dir):
+        for task_name, module_name, args in self.role_tasks(role_dir):
+            self.compile_task(os.path.basename(role_dir), task_name, module_name, args)
+
+    def compile_task(self, role, task_name, module_name, args):
+        from ansible.module_utils.remote_management import ucs
+
+        ucs.ucs_plan_handle = self.handle
+        try:
+            result = self.runner.run_module(module_name, args)
+        except Exception as e:
+            result = dict(failed=True, msg='%s: %s' % (type(e).__name__, e))
+        finally:
+            ucs.ucs_plan_handle = None
+            # what a failed module left uncommitted must not end up in the commit of the next one
+            self.handle.login_handle.commit_buffer_discard()
+        if result.get('failed'):
+            self.errors.append('%s: %s (%s): %s' % (role, module_name, task_name, result.get('msg')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compiles the ucsm-config roles into one configConfMos document.')
+    parser.add_argument('--roles', nargs='+', default=ROLES, help='roles to compile, in order')
+    parser.add_argument('--roles-dir', default='roles', help='directory with the roles')
+    parser.add_argument('--library', action='append', help='directory with the UCS modules (default: library)')
+    parser.add_argument('--vars', action='append', default=[], help='YAML file with extra vars, e.g. host_vars')
+    parser.add_argument('--seed', help='UCSSnapshot file with the objects the plan starts from')
+    parser.add_argument('--output', required=True, help='file the configConfMos document is written to')
+    args = parser.parse_args()
+
+    import yaml
+
+    extra_vars = {}
+    for path in args.vars:
+        with open(path) as f:
+            extra_vars.update(yaml.safe_load(f) or {})
+    compiler = UCSCompiler(args.library or ['library'], extra_vars, load_seed(args.seed) if args.seed else ())
+    for role in args.roles:
+        compiler.compile_role(os.path.join(args.roles_dir, role))
+    compiler.plan.write(args.output)
+
+    print('%s: %d pairs, %d objects' % (args.output, len(compiler.plan), compiler.plan.objects()))
+    for error in compiler.errors:
+        print('failed: %s' % error, file=sys.stderr)
+    return 1 if compiler.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (c) 2016 Red Hat Inc.
+# (c) 2017 Cisco Systems Inc.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+import binascii
+import json
+import os
+import socket
+import time
+
+# identity kinds: block class, pool class and the rn prefix of the pool
+IDENTITY_KINDS = {
+    'ipv4': ('IppoolBlock', 'IppoolPool', 'ip-pool-'),
+    'ipv6': ('IppoolIpV6Block', 'IppoolPool', 'ip-pool-'),
+    'mac': ('MacpoolBlock', 'MacpoolPool', 'mac-pool-'),
+    'uuid': ('UuidpoolBlock', 'UuidpoolPool', 'uuid-pool-'),
+    'wwn': ('FcpoolBlock', 'FcpoolInitiators', 'wwn-pool-'),
+}
+
+# samples of assigned identities kept per pool for the exhaustion forecast
+HISTORY_SAMPLES = 100
+
+# UUID prefix of a new pool whose prefix UCS Manager derives, pools store the derived prefix instead
+DERIVED_PREFIX = 'derived'
+
+
+def identity_to_int(kind, value):
+    """Returns the integer an IP, MAC, UUID suffix or WWN identity stands for."""
+    value = value.strip()
+    if kind == 'ipv4':
+        return int(binascii.hexlify(socket.inet_pton(socket.AF_INET, value)), 16)
+    if kind == 'ipv6':
+        return int(binascii.hexlify(socket.inet_pton(socket.AF_INET6, value)), 16)
+    # MACs and WWNs are colon separated hex bytes, UUID suffixes are XXXX-XXXXXXXXXXXX
+    return int(value.replace(':', '').replace('-', ''), 16)
+
+
+class IntervalTree():
+    """Static interval tree over closed integer intervals.
+
+    The intervals are kept sorted by start and viewed as an implicit balanced
+    binary tree, each node knowing the largest end below it, so finding the
+    intervals that overlap a range takes O(log n + k).
+    """
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self.max_end = [None] * len(self.intervals)
+        self._build(0, len(self.intervals) - 1)
+
+    def _build(self, lo, hi):
+        if lo > hi:
+            return None
+        mid = (lo + hi) // 2
+        ends = [self.intervals[mid][1], self._build(lo, mid - 1), self._build(mid + 1, hi)]
+        self.max_end[mid] = max(end for end in ends if end is not None)
+        return self.max_end[mid]
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlaps(self, first, last):
+        """Returns the (first, last, data) intervals that share at least one value with first to last."""
+        found = []
+        stack = [(0, len(self.intervals) - 1)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < first:
+                # nothing below this node reaches first
+                continue
+            stack.append((lo, mid - 1))
+            start, end, data = self.intervals[mid]
+            if start <= last:
+                if end >= first:
+                    found.append(self.intervals[mid])
+                stack.append((mid + 1, hi))
+        return sorted(found, key=lambda interval: (interval[0], interval[1]))
+
+    def overlapping_pairs(self):
+        """Returns every pair of intervals that overlap, with a sweep over the sorted intervals."""
+        pairs = []
+        active = []
+        for interval in self.intervals:
+            active = [other for other in active if other[1] >= interval[0]]
+            pairs.extend((other, interval) for other in active)
+            active.append(interval)
+        return pairs
+
+
+class UCSIdentityIndex():
+    """Index of the identity blocks of every pool in UCS Manager.
+
+    The blocks of each identity kind are read with one class query and put in
+    an IntervalTree per namespace (UUID suffixes only collide within one UUID
+    prefix), so overlaps between pools are found without UCS Manager reporting
+    duplicate identities when profiles are associated.
+    """
+
+    def __init__(self, login_handle, kinds=None, usage=False):
+        self.login_handle = login_handle
+        self.kinds = list(kinds or sorted(IDENTITY_KINDS))
+        self.pools = {}
+        self.blocks = {}
+        self.trees = {}
+        pool_classes = set()
+        for kind in self.kinds:
+            block_class, pool_class, pool_rn = IDENTITY_KINDS[kind]
+            if (usage or kind == 'uuid') and pool_class not in pool_classes:
+                pool_classes.add(pool_class)
+                # pool objects carry the size, the assigned count and the UUID prefix
+                for mo in login_handle.query_classid(pool_class):
+                    self.pools[mo.dn] = mo
+            self.blocks[kind] = [self.block(kind, mo) for mo in login_handle.query_classid(block_class)]
+            self.build(kind)
+
+    def namespace(self, kind, pool_dn):
+        if kind != 'uuid':
+            return ''
+        pool = self.pools.get(pool_dn)
+        return pool.prefix if pool is not None else ''
+
+    def block(self, kind, mo, pool_dn=None):
+        pool_dn = pool_dn or mo.dn[:len(mo.dn) - len(mo.rn)].rstrip('/')
+        first = identity_to_int(kind, mo.r_from)
+        last = identity_to_int(kind, mo.to)
+        return dict(dn=mo.dn, pool_dn=pool_dn, kind=kind, namespace=self.namespace(kind, pool_dn),
+                    r_from=mo.r_from, to=mo.to, first=min(first, last), last=max(first, last))
+
+    def build(self, kind):
+        intervals = {}
+        for block in self.blocks[kind]:
+            intervals.setdefault(block['namespace'], []).append((block['first'], block['last'], block))
+        for namespace, namespace_intervals in intervals.items():
+            self.trees[(kind, namespace)] = IntervalTree(namespace_intervals)
+
+    def overlaps(self, kind, pool_dn, r_from, to, exclude_dn=None, namespace=None):
+        """Returns the blocks that share identities with r_from to to, except the block at exclude_dn.
+
+        namespace is the UUID prefix of a pool that does not exist yet.  With
+        DERIVED_PREFIX the prefix is not known before UCS Manager derives it,
+        so the blocks of every prefix are checked.
+        """
+        first, last = sorted([identity_to_int(kind, r_from), identity_to_int(kind, to)])
+        if namespace is None:
+            namespace = self.namespace(kind, pool_dn)
+        if kind == 'uuid' and namespace == DERIVED_PREFIX:
+            trees = [tree for (tree_kind, tree_namespace), tree in sorted(self.trees.items()) if tree_kind == kind]
+        else:
+            trees = [self.trees[(kind, namespace)]] if (kind, namespace) in self.trees else []
+        found = []
+        for tree in trees:
+            found.extend(data for start, end, data in tree.overlaps(first, last) if data['dn'] != exclude_dn)
+        return found
+
+    def overlapping_blocks(self):
+        """Returns every pair of blocks, in the same or in different pools, that share identities."""
+        overlaps = []
+        for (kind, namespace), tree in sorted(self.trees.items()):
+            for (first, last, block), (other_first, other_last, other) in tree.overlapping_pairs():
+                overlaps.append(dict(kind=kind, blocks=[block['dn'], other['dn']],
+                                     count=min(last, other_last) - max(first, other_first) + 1))
+        return overlaps
+
+    def pool_usage(self, history=None):
+        """Returns size, assigned and free identities per pool, with a forecast when history is given.
+
+        history maps pool dns to [time, assigned] samples; the forecast is
+        the number of seconds until the pool runs out at the rate the
+        assigned count grew over the samples.
+        """
+        now = time.time()
+        usage = []
+        for kind in self.kinds:
+            block_class, pool_class, pool_rn = IDENTITY_KINDS[kind]
+            for dn, pool in sorted(self.pools.items()):
+                if not pool.rn.startswith(pool_rn):
+                    continue
+                blocks = [block for block in self.blocks[kind] if block['pool_dn'] == dn]
+                if kind in ('ipv4', 'ipv6') and not blocks:
+                    # ip pools hold ipv4 and ipv6 blocks, report the kinds they have
+                    continue
+                # ip pools count ipv4 and ipv6 addresses together, so their size comes from the blocks
+                size = sum(block['last'] - block['first'] + 1 for block in blocks)
+                if kind not in ('ipv4', 'ipv6') and int(pool.size or 0):
+                    size = int(pool.size)
+                assigned = int(pool.assigned or 0)
+                entry = dict(dn=dn, kind=kind, size=size, assigned=assigned, free=max(size - assigned, 0),
+                             blocks=len(blocks), exhausted=assigned >= size, exhaustion_seconds=None)
+                samples = (history or {}).get(dn) or []
+                if samples:
+                    first_time, first_assigned = samples[0]
+                    rate = (assigned - first_assigned) / float(now - first_time) if now > first_time else 0
+                    if rate > 0:
+                        entry['exhaustion_seconds'] = int(entry['free'] / rate)
+                usage.append(entry)
+        return usage
+
+
+def load_history(path):
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_history(path, history, usage):
+    # appends the assigned count of every pool and keeps the last HISTORY_SAMPLES samples
+    now = time.time()
+    for entry in usage:
+        samples = history.setdefault(entry['dn'], [])
+        samples.append([now, entry['assigned']])
+        del samples[:-HISTORY_SAMPLES]
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f)
+    os.rename(tmp_path, path)
+
+
+def check_block_overlaps(login_handle, kind, pool_dn, blocks, namespace=None, index=None, checked=None):
+    """Raises ValueError if any (r_from, to) of blocks shares identities with a block of another pool or of the list.
+
+    Used by the pool modules before they commit new blocks.  A block that
+    already exists in pool_dn with the same range is not reported against
+    itself.  Modules that check several pools pass the UCSIdentityIndex of
+    kind, so the blocks are read once, and checked, a list of the (pool_dn,
+    r_from, to) blocks of the earlier calls that the blocks are also checked
+    against and that they are added to.
+    """
+    if index is None:
+        index = UCSIdentityIndex(login_handle, kinds=[kind])
+    conflicts = []
+    for position, (r_from, to) in enumerate(blocks):
+        for block in index.overlaps(kind, pool_dn, r_from, to, namespace=namespace):
+            if block['pool_dn'] == pool_dn and (block['r_from'].lower(), block['to'].lower()) == (r_from.lower(), to.lower()):
+                continue
+            conflicts.append('%s-%s overlaps %s' % (r_from, to, block['dn']))
+        first, last = sorted([identity_to_int(kind, r_from), identity_to_int(kind, to)])
+        for other_from, other_to in blocks[position + 1:]:
+            other_first, other_last = sorted([identity_to_int(kind, other_from), identity_to_int(kind, other_to)])
+            if first <= other_last and other_first <= last:
+                conflicts.append('%s-%s overlaps %s-%s' % (r_from, to, other_from, other_to))
+        for other_dn, other_from, other_to in checked or []:
+            other_first, other_last = sorted([identity_to_int(kind, other_from), identity_to_int(kind, other_to)])
+            if first <= other_last and other_first <= last:
+                conflicts.append('%s-%s overlaps %s-%s of %s' % (r_from, to, other_from, other_to, other_dn))
+    if checked is not None:
+        checked.extend((pool_dn, r_from, to) for r_from, to in blocks)
+    if conflicts:
+        raise ValueError('identity block overlap: %s' % '; '.join(conflicts))
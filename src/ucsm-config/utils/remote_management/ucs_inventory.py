@@ -0,0 +1,181 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (c) 2016 Red Hat Inc.
+# (c) 2017 Cisco Systems Inc.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+UCS_INVENTORY_DIR = '~/.ansible/ucs_inventory'
+
+SERVER_CLASSES = ('ComputeBlade', 'ComputeRackUnit')
+COMPONENT_CLASSES = ('MemoryArray', 'ProcessorUnit', 'AdaptorUnit', 'StorageLocalDisk')
+
+# the capability indexes of the inventory and the server property they are keyed by
+CAPABILITIES = ('model', 'cpu_model', 'adapter_models', 'memory', 'disks')
+
+
+def to_int(value):
+    # UCSM reports unknown sizes and counts as 'unspecified' or 'not-applicable'
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_equipped(mo):
+    return mo.presence.startswith('equipped')
+
+
+def server_entry(mo):
+    if mo.get_class_id() == 'ComputeBlade':
+        kind, server_id = 'blade', '%s/%s' % (mo.chassis_id, mo.slot_id)
+    else:
+        kind, server_id = 'rack', mo.id
+    return dict(dn=mo.dn, kind=kind, id=server_id, model=mo.model, serial=mo.serial, vendor=mo.vendor,
+                cpus=to_int(mo.num_of_cpus), cores=to_int(mo.num_of_cores), threads=to_int(mo.num_of_threads),
+                memory=to_int(mo.total_memory), association=mo.association, availability=mo.availability,
+                assigned_to_dn=mo.assigned_to_dn, oper_power=mo.oper_power, oper_state=mo.oper_state,
+                cpu_model='', memory_max=0, adapter_models=[], disks=0, disk_size=0, disk_types=[])
+
+
+def server_dn(servers, dn):
+    # the server a component belongs to is the longest dn prefix that is a server
+    parts = dn.split('/')
+    for end in range(len(parts) - 1, 1, -1):
+        prefix = '/'.join(parts[:end])
+        if prefix in servers:
+            return prefix
+    return None
+
+
+def build_inventory(mos):
+    """Returns the compact inventory of mos, a class id to managed objects dict of the inventory classes.
+
+    Every server has its own properties and a summary of its components:
+    the model of its first equipped CPU, the maximum memory of its memory
+    arrays, the models of its adapters and the count, total size (MB) and
+    types of its local disks.  Servers are indexed by id (chassis/slot for
+    blades, the rack unit id for rack servers), by serial and by each of the
+    CAPABILITIES.
+    """
+    servers = {}
+    for class_id in SERVER_CLASSES:
+        for mo in mos.get(class_id, []):
+            servers[mo.dn] = server_entry(mo)
+
+    array_memory = {}
+    for class_id in COMPONENT_CLASSES:
+        for mo in sorted(mos.get(class_id, []), key=lambda mo: mo.dn):
+            dn = server_dn(servers, mo.dn)
+            if dn is None:
+                continue
+            server = servers[dn]
+            if class_id == 'MemoryArray':
+                server['memory_max'] += to_int(mo.max_capacity)
+                array_memory[dn] = array_memory.get(dn, 0) + to_int(mo.curr_capacity)
+            elif not is_equipped(mo):
+                continue
+            elif class_id == 'ProcessorUnit':
+                server['cpu_model'] = server['cpu_model'] or mo.model
+            elif class_id == 'AdaptorUnit':
+                server['adapter_models'].append(mo.model)
+            elif class_id == 'StorageLocalDisk':
+                server['disks'] += 1
+                server['disk_size'] += to_int(mo.size)
+                if mo.device_type not in server['disk_types']:
+                    server['disk_types'].append(mo.device_type)
+
+    for dn, memory in array_memory.items():
+        # total_memory is only reported once a server is discovered
+        servers[dn]['memory'] = servers[dn]['memory'] or memory
+
+    inventory = dict(servers=[servers[dn] for dn in sorted(servers)], by_id={}, by_serial={},
+                     by_capability=dict((capability, {}) for capability in CAPABILITIES))
+    for server in inventory['servers']:
+        inventory['by_id'][server['id']] = server['dn']
+        if server['serial']:
+            inventory['by_serial'][server['serial']] = server['dn']
+        for capability in CAPABILITIES:
+            values = server[capability] if isinstance(server[capability], list) else [server[capability]]
+            for value in set(values) - set(['']):
+                inventory['by_capability'][capability].setdefault(str(value), []).append(server['dn'])
+    return inventory
+
+
+class UCSInventory():
+    """Controller side cache of the server inventory of a UCS Manager.
+
+    The servers and their memory arrays, CPUs, adapters and local disks are
+    read with one configResolveClasses and kept as a compact inventory (see
+    build_inventory) in a gzipped JSON file per hostname, which is used while
+    it is younger than ttl seconds.  Hardware changes are not audited like
+    configuration changes, so the age is the only check.
+    """
+
+    def __init__(self, cache_dir, hostname, ttl):
+        self.cache_dir = os.path.expanduser(cache_dir or UCS_INVENTORY_DIR)
+        self.ttl = ttl
+        key = hashlib.sha1(hostname.encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.cache_dir, key + '.json.gz')
+
+    def cached(self):
+        """Returns the cached inventory and its age in seconds, or None if there is none younger than ttl."""
+        if self.ttl <= 0:
+            return None
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                entry = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            return None
+        age = time.time() - entry['taken']
+        if age >= self.ttl:
+            return None
+        return entry['inventory'], age
+
+    def take(self, login_handle):
+        mos = login_handle.query_classids(*(SERVER_CLASSES + COMPONENT_CLASSES))
+        inventory = build_inventory(mos)
+        self.store(dict(taken=time.time(), inventory=inventory))
+        return inventory
+
+    def store(self, entry):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            os.close(fd)
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(json.dumps(entry).encode('utf-8'))
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            return False
+        return True
@@ -0,0 +1,210 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (c) 2016 Red Hat Inc.
+# (c) 2017 Cisco Systems Inc.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from importlib import import_module
+
+# properties that name another policy object, mapped to the rn prefix of the object they name.
+# UCS Manager resolves these names in the org of the referencing object first and then in each parent org.
+REFERENCE_RN_PREFIXES = {
+    'bios_profile_name': 'bios-prof-',
+    'boot_policy_name': 'boot-policy-',
+    'disk_zoning_policy_name': 'disk-zoning-policy-',
+    'host_fw_policy_name': 'fw-host-pack-',
+    'lan_conn_policy_name': 'lan-conn-pol-',
+    'local_disk_policy_name': 'local-disk-config-',
+    'maint_policy_name': 'maint-',
+    'nw_ctrl_policy_name': 'nwctrl-',
+    'nw_templ_name': 'lan-conn-templ-',
+    'power_policy_name': 'power-policy-',
+    'qos_policy_name': 'ep-qos-',
+    'san_conn_policy_name': 'san-conn-pol-',
+    'scrub_policy_name': 'scrub-',
+    'sol_policy_name': 'sol-',
+    'src_templ_name': 'ls-',
+    'stats_policy_name': 'thr-policy-',
+    'storage_profile_name': 'profile-',
+    'vmedia_policy_name': 'mnt-cfg-policy-',
+}
+
+# properties whose target depends on the class they are set on
+CLASS_REFERENCE_RN_PREFIXES = {
+    ('LsServer', 'ident_pool_name'): 'uuid-pool-',
+    ('VnicEther', 'adaptor_profile_name'): 'eth-profile-',
+    ('VnicEther', 'ident_pool_name'): 'mac-pool-',
+    ('VnicFc', 'adaptor_profile_name'): 'fc-profile-',
+    ('VnicFc', 'ident_pool_name'): 'wwn-pool-',
+    ('VnicFc', 'nw_templ_name'): 'san-conn-templ-',
+    ('VnicFcNode', 'ident_pool_name'): 'wwn-pool-',
+    ('VnicLanConnTempl', 'ident_pool_name'): 'mac-pool-',
+    ('VnicLanConnTempl', 'peer_redundancy_templ_name'): 'lan-conn-templ-',
+    ('VnicSanConnTempl', 'ident_pool_name'): 'wwn-pool-',
+    ('VnicSanConnTempl', 'peer_redundancy_templ_name'): 'san-conn-templ-',
+    ('LsRequirement', 'name'): 'compute-pool-',
+    ('LstorageDasScsiLun', 'local_disk_policy_name'): 'disk-group-config-',
+}
+
+# vlans and vsans are named by interfaces and live in the fabric, not in an org
+FABRIC_REFERENCE_DNS = {
+    'VnicEtherIf': ['fabric/lan/net-', 'fabric/lan/A/net-', 'fabric/lan/B/net-'],
+    'VnicFcIf': ['fabric/san/net-', 'fabric/san/A/net-', 'fabric/san/B/net-'],
+}
+
+
+def object_nodes(managed_object, parent_dn=''):
+    """Returns (class_id, dn, properties) for a managed object and all of its children.
+
+    managed_object uses the module/class/properties/children format of ucs_managed_objects.
+    """
+    mo_class = getattr(import_module(managed_object['module']), managed_object['class'])
+    kwargs = dict(managed_object['properties'])
+    if not kwargs.get('parent_mo_or_dn'):
+        kwargs['parent_mo_or_dn'] = parent_dn
+    mo = mo_class(**kwargs)
+
+    nodes = [(managed_object['class'], mo.dn, managed_object['properties'])]
+    for child in managed_object.get('children') or []:
+        nodes.extend(object_nodes(child, mo.dn))
+    return nodes
+
+
+def mo_nodes(mo):
+    """Returns (class_id, dn, properties) for a ucsmsdk managed object and all of its children that are not removed."""
+    if 'deleted' in (getattr(mo, 'status', None) or '') or 'removed' in (getattr(mo, 'status', None) or ''):
+        return []
+    properties = dict((prop, getattr(mo, prop, None)) for prop in mo.prop_meta)
+    nodes = [(mo.get_class_id(), mo.dn, properties)]
+    for child in mo.child:
+        nodes.extend(mo_nodes(child))
+    return nodes
+
+
+def org_dns(dn):
+    # orgs searched when resolving a name referenced from dn, nearest first
+    parts = dn.split('/')
+    orgs = []
+    for index in range(len(parts), 0, -1):
+        if parts[index - 1].startswith('org-'):
+            orgs.append('/'.join(parts[:index]))
+    return orgs
+
+
+class UCSPlanner():
+    """Dependency graph of top-level UCS Manager policy objects.
+
+    An object depends on the top-level objects whose dn contains its own dn,
+    on the objects named by reference properties anywhere in its tree (for
+    example ident_pool_name, boot_policy_name or the pool named by an
+    LsRequirement), and on the dns in its optional depends_on list.  Only
+    objects that are part of the plan are considered, anything else is
+    assumed to already exist on UCS Manager.
+    """
+
+    def __init__(self, objects):
+        self.dns = []
+        self.depends_on = {}
+        # dn of every planned object and child -> dn of the top-level object it is configured by
+        self.owners = {}
+        self.build((object_nodes(managed_object), managed_object.get('depends_on')) for managed_object in objects)
+
+    @classmethod
+    def from_plan(cls, plan):
+        """Returns the planner of the pairs of a UCSPlan, e.g. of the roles compiled by UCSCompiler."""
+        from ansible.module_utils.remote_management.ucs_compiler import element_to_mo
+
+        planner = cls([])
+        trees = (mo_nodes(element_to_mo(elem)) for elem in plan.pairs.values())
+        planner.build((object_tree, None) for object_tree in trees if object_tree)
+        return planner
+
+    def build(self, trees):
+        # trees are the nodes of each top-level object, top-level object first, with its depends_on list
+        nodes = {}
+        for object_tree, depends_on in trees:
+            dn = object_tree[0][1]
+            if dn in self.depends_on:
+                raise ValueError('%s is configured by more than one top-level object' % dn)
+            self.dns.append(dn)
+            self.depends_on[dn] = set(depends_on or [])
+            nodes[dn] = object_tree
+            for class_id, node_dn, properties in object_tree:
+                self.owners.setdefault(node_dn, dn)
+
+        for dn in nodes:
+            for other_dn in self.dns:
+                if dn.startswith(other_dn + '/'):
+                    self.depends_on[dn].add(other_dn)
+            for class_id, node_dn, properties in nodes[dn]:
+                for target_dn in self.references(class_id, node_dn, properties):
+                    owner = self.owners.get(target_dn)
+                    if owner and owner != dn:
+                        self.depends_on[dn].add(owner)
+
+    def references(self, class_id, dn, properties):
+        # dns that a property of the object at dn may name, nearest org first
+        candidates = []
+        for prop, value in properties.items():
+            if value in (None, '') or prop == 'parent_mo_or_dn':
+                continue
+            if prop == 'name' and class_id in FABRIC_REFERENCE_DNS:
+                candidates.extend(prefix + str(value) for prefix in FABRIC_REFERENCE_DNS[class_id])
+                continue
+            rn_prefix = CLASS_REFERENCE_RN_PREFIXES.get((class_id, prop), REFERENCE_RN_PREFIXES.get(prop))
+            if rn_prefix:
+                for org_dn in org_dns(dn):
+                    target_dn = org_dn + '/' + rn_prefix + str(value)
+                    if target_dn in self.owners:
+                        candidates.append(target_dn)
+                        break
+        return candidates
+
+    def dependencies(self, reverse=False):
+        """Returns {dn: set of dns it has to be applied after}.  With reverse, the order for removal."""
+        if not reverse:
+            return dict((dn, set(deps) & set(self.dns)) for dn, deps in self.depends_on.items())
+        required_by = dict((dn, set()) for dn in self.dns)
+        for dn, deps in self.depends_on.items():
+            for other_dn in deps:
+                if other_dn in required_by:
+                    required_by[other_dn].add(dn)
+        return required_by
+
+    def waves(self, reverse=False):
+        """Topologically sorts the objects into lists of dns that can be applied in parallel."""
+        remaining = self.dependencies(reverse)
+        waves = []
+        while remaining:
+            wave = [dn for dn in self.dns if dn in remaining and not remaining[dn]]
+            if not wave:
+                raise ValueError('dependency cycle between %s' % ', '.join(sorted(remaining)))
+            waves.append(wave)
+            for dn in wave:
+                del remaining[dn]
+            for deps in remaining.values():
+                deps.difference_update(wave)
+        return waves
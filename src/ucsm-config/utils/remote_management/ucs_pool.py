@@ -0,0 +1,194 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (c) 2016 Red Hat Inc.
+# (c) 2017 Cisco Systems Inc.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+import multiprocessing
+from multiprocessing.util import Finalize
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ansible.module_utils.remote_management.ucs import ucs_login
+
+# per worker process session, set up by _init_worker
+_worker_session = {}
+
+
+def _init_worker(params, sessions):
+    try:
+        handle = ucs_login(params)
+    except Exception as e:
+        # raising here would make the pool restart the worker forever, report the error per task instead
+        _worker_session['error'] = str(e)
+        return
+    _worker_session['handle'] = handle
+    # the parent logs the session out if it has to terminate the worker, Finalize does not run then
+    sessions.put(handle.freeze())
+    Finalize(None, handle.logout, exitpriority=10)
+
+
+def _run_task(func, payload):
+    if 'error' in _worker_session:
+        return False, 'login error: %s' % _worker_session['error']
+    return _apply(func, _worker_session['handle'], payload)
+
+
+def _apply(func, handle, payload):
+    try:
+        return True, func(handle, payload)
+    except Exception as e:
+        return False, str(e)
+
+
+def _fork_context():
+    # tasks carry functions of the module's __main__, which only a forked worker can unpickle
+    if not hasattr(multiprocessing, 'get_context') or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+
+class UCSSessionPool():
+    """Bounded pool of worker processes that each hold their own UCS Manager session.
+
+    ucsmsdk serializes every request made from one process with a module level
+    lock, so concurrent requests need separate processes rather than threads.
+
+    run() takes tasks as dicts with a unique 'key', a 'payload' passed to func
+    together with the worker's login handle, and an optional 'depends_on' list
+    of keys.  A task is only started once every task it depends on has
+    finished successfully; independent tasks run in parallel up to the pool
+    size.
+
+    Without the fork start method the tasks run one after the other on a
+    single session in this process.  A task that has not returned after
+    timeout seconds, e.g. because its worker died, fails together with the
+    tasks that were still to run, and the pool is stopped.
+    """
+
+    def __init__(self, params, size, timeout=600):
+        self.params = params
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.pool = None
+        # frozen login handles of the workers
+        self.sessions = None
+        # login handle of the serial fallback
+        self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.pool:
+            # workers log out from their Finalize hook on a clean exit
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.sessions = None
+        if self.handle:
+            self.handle.logout()
+            self.handle = None
+
+    def terminate(self):
+        from ucsmsdk.ucshandle import UcsHandle
+
+        self.pool.terminate()
+        self.pool = None
+        # SIGTERM skips the Finalize hooks of the workers, their sessions are logged out from here
+        while not self.sessions.empty():
+            try:
+                UcsHandle.unfreeze(self.sessions.get()).logout()
+            except Exception:
+                pass
+        self.sessions = None
+
+    def submit(self, func, key, payload, done):
+        if self.pool is None:
+            done.put((key, _apply(func, self.handle, payload)))
+            return
+        self.pool.apply_async(_run_task, (func, payload),
+                              callback=lambda result, key=key: done.put((key, result)),
+                              # results that fail to pickle and errors of the pool itself end up here
+                              error_callback=lambda e, key=key: done.put((key, (False, str(e)))))
+
+    def run(self, func, tasks):
+        keys = set(task['key'] for task in tasks)
+        if self.pool is None and self.handle is None:
+            context = _fork_context()
+            if context:
+                self.sessions = context.SimpleQueue()
+                self.pool = context.Pool(min(self.size, len(tasks)) or 1, _init_worker, (self.params, self.sessions))
+            else:
+                self.handle = ucs_login(self.params)
+
+        pending = dict((task['key'], task) for task in tasks)
+        running = set()
+        results = {}
+        done = queue.Queue()
+
+        while pending or running:
+            progress = True
+            while progress:
+                progress = False
+                for key, task in list(pending.items()):
+                    depends_on = [dep for dep in task.get('depends_on') or [] if dep in keys and dep != key]
+                    failed = [dep for dep in depends_on if dep in results and not results[dep][0]]
+                    if failed:
+                        results[key] = (False, 'not applied, dependency %s failed' % failed[0])
+                        del pending[key]
+                        progress = True
+                    elif all(dep in results for dep in depends_on):
+                        self.submit(func, key, task['payload'], done)
+                        running.add(key)
+                        del pending[key]
+
+            if not running:
+                # nothing can make progress, the remaining tasks depend on each other
+                for key in pending:
+                    results[key] = (False, 'not applied, dependency cycle')
+                break
+
+            try:
+                key, result = done.get(timeout=self.timeout)
+            except queue.Empty:
+                # a worker died or hangs, its session and the pool can't be trusted any more
+                for key in running:
+                    results[key] = (False, 'no result after %d seconds' % self.timeout)
+                for key in pending:
+                    results[key] = (False, 'not applied, session pool stopped')
+                self.terminate()
+                break
+            running.discard(key)
+            results[key] = result
+
+        return results
@@ -0,0 +1,349 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign whatever license you want.
+#
+# Copyright (c) 2018 Cisco Systems
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF
+# THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Local validation of UCS module arguments against the ucsmsdk property metadata.
+
+UCS Manager only rejects a bad value (a descr with a forbidden character, a
+malformed MAC address, a VLAN id out of range) when the module commits, after
+it has logged in and queried.  MODULE_PROPS maps the arguments of the modules
+to the managed object property they are written to, and validate_params
+checks them against the pattern, value set and ranges ucsmsdk has for that
+property.  UCSModule and UcsConnection call it before logging in.
+
+The vars of whole roles can be checked before a run, without UCS Manager:
+
+    python -m ansible.module_utils.remote_management.ucs_validate --roles-dir roles
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import re
+import sys
+
+# module -> argument -> (class id, property) the argument is written to.
+# a dotted argument is a key of the dicts in a list or dict argument.
+MODULE_PROPS = {
+    'ucs_boot_policy': {
+        'name': ('LsbootPolicy', 'name'),
+        'description': ('LsbootPolicy', 'descr'),
+        'boot_mode': ('LsbootPolicy', 'boot_mode'),
+        'enforce_vnic_name': ('LsbootPolicy', 'enforce_vnic_name'),
+        'reboot_on_update': ('LsbootPolicy', 'reboot_on_update'),
+    },
+    'ucs_compute_chassis_discovery_policy': {
+        'description': ('ComputeChassisDiscPolicy', 'descr'),
+        'action': ('ComputeChassisDiscPolicy', 'action'),
+        'link_aggregation_pref': ('ComputeChassisDiscPolicy', 'link_aggregation_pref'),
+        'multicast_hw_hash': ('ComputeChassisDiscPolicy', 'multicast_hw_hash'),
+    },
+    'ucs_compute_psu_policy': {
+        'redundancy': ('ComputePsuPolicy', 'redundancy'),
+    },
+    'ucs_disk_group_policy': {
+        'name': ('LstorageDiskGroupConfigPolicy', 'name'),
+        'description': ('LstorageDiskGroupConfigPolicy', 'descr'),
+        'raid_level': ('LstorageDiskGroupConfigPolicy', 'raid_level'),
+        'num_drives': ('LstorageDiskGroupQualifier', 'num_drives'),
+        'drive_type': ('LstorageDiskGroupQualifier', 'drive_type'),
+        'num_ded_hot_spares': ('LstorageDiskGroupQualifier', 'num_ded_hot_spares'),
+        'num_glob_hot_spares': ('LstorageDiskGroupQualifier', 'num_glob_hot_spares'),
+        'min_drive_size': ('LstorageDiskGroupQualifier', 'min_drive_size'),
+        'manual_disks.slot_num': ('LstorageLocalDiskConfigRef', 'slot_num'),
+        'manual_disks.role': ('LstorageLocalDiskConfigRef', 'role'),
+        'manual_disks.span_id': ('LstorageLocalDiskConfigRef', 'span_id'),
+    },
+    'ucs_fabric_eth_lan_pc': {
+        'name': ('FabricEthLanPc', 'name'),
+        'descr': ('FabricEthLanPc', 'descr'),
+        'port_id': ('FabricEthLanPc', 'port_id'),
+        'admin_speed': ('FabricEthLanPc', 'admin_speed'),
+        'lacp_policy_name': ('FabricEthLanPc', 'lacp_policy_name'),
+    },
+    'ucs_fabric_interconnect_ports': {
+        'ether_ports_list.slot_id': ('FabricDceSwSrvEp', 'slot_id'),
+        'ether_ports_list.port_id': ('FabricDceSwSrvEp', 'port_id'),
+    },
+    'ucs_host_firmware_packages': {
+        'name': ('FirmwareComputeHostPack', 'name'),
+        'descr': ('FirmwareComputeHostPack', 'descr'),
+    },
+    'ucs_ip_pool': {
+        'name': ('IppoolPool', 'name'),
+        'descr': ('IppoolPool', 'descr'),
+        'first_addr': ('IppoolBlock', 'r_from'),
+        'last_addr': ('IppoolBlock', 'to'),
+        'subnet_mask': ('IppoolBlock', 'subnet'),
+        'default_gw': ('IppoolBlock', 'def_gw'),
+        'primary_dns': ('IppoolBlock', 'prim_dns'),
+        'secondary_dns': ('IppoolBlock', 'sec_dns'),
+        'ipv4_blocks.first_addr': ('IppoolBlock', 'r_from'),
+        'ipv4_blocks.last_addr': ('IppoolBlock', 'to'),
+        'ipv4_blocks.subnet_mask': ('IppoolBlock', 'subnet'),
+        'ipv4_blocks.default_gw': ('IppoolBlock', 'def_gw'),
+    },
+    'ucs_lan_connectivity': {
+        'name': ('VnicLanConnPolicy', 'name'),
+        'description': ('VnicLanConnPolicy', 'descr'),
+        'vnic_list.name': ('VnicEther', 'name'),
+        'vnic_list.vnic_template': ('VnicEther', 'nw_templ_name'),
+        'vnic_list.adapter_policy': ('VnicEther', 'adaptor_profile_name'),
+        'vnic_list.order': ('VnicEther', 'order'),
+    },
+    'ucs_local_lun': {
+        'size': ('LstorageDasScsiLun', 'size'),
+        'expand_to_avail': ('LstorageDasScsiLun', 'expand_to_avail'),
+    },
+    'ucs_mac_pool': {
+        'name': ('MacpoolPool', 'name'),
+        'descr': ('MacpoolPool', 'descr'),
+        'first_addr': ('MacpoolBlock', 'r_from'),
+        'last_addr': ('MacpoolBlock', 'to'),
+    },
+    'ucs_service_profile_from_template': {
+        'name': ('LsServer', 'name'),
+        'source_template': ('LsServer', 'src_templ_name'),
+        'user_label': ('LsServer', 'usr_lbl'),
+    },
+    'ucs_service_profile_template': {
+        'name': ('LsServer', 'name'),
+        'description': ('LsServer', 'descr'),
+        'bios_policy': ('LsServer', 'bios_profile_name'),
+        'boot_policy': ('LsServer', 'boot_policy_name'),
+        'host_firmware_package': ('LsServer', 'host_fw_policy_name'),
+        'mgmt_ip_pool': ('LsServer', 'ext_ip_pool_name'),
+        'uuid_pool': ('LsServer', 'ident_pool_name'),
+        'vmedia_policy': ('LsServer', 'vmedia_policy_name'),
+        'template_type': ('LsServer', 'type'),
+        'user_label': ('LsServer', 'usr_lbl'),
+        'storage_profile': ('LstorageProfileBinding', 'storage_profile_name'),
+        'lan_connectivity_policy': ('VnicConnDef', 'lan_conn_policy_name'),
+        'server_pool': ('LsRequirement', 'name'),
+    },
+    'ucs_storage_profile': {
+        'name': ('LstorageProfile', 'name'),
+        'descr': ('LstorageProfile', 'descr'),
+    },
+    'ucs_timezone': {
+        'description': ('CommDateTime', 'descr'),
+        'timezone': ('CommDateTime', 'timezone'),
+    },
+    'ucs_uuid_pool': {
+        'name': ('UuidpoolPool', 'name'),
+        'description': ('UuidpoolPool', 'descr'),
+        'prefix': ('UuidpoolPool', 'prefix'),
+        'first_uuid': ('UuidpoolBlock', 'r_from'),
+        'last_uuid': ('UuidpoolBlock', 'to'),
+    },
+    'ucs_vlans': {
+        'name': ('FabricVlan', 'name'),
+        'sharing': ('FabricVlan', 'sharing'),
+        'native': ('FabricVlan', 'default_net'),
+        'multicast_policy': ('FabricVlan', 'mcast_policy_name'),
+        'vlans.name': ('FabricVlan', 'name'),
+        'vlans.id': ('FabricVlan', 'id'),
+    },
+    'ucs_vmedia_policy': {
+        'name': ('CimcvmediaMountConfigPolicy', 'name'),
+        'description': ('CimcvmediaMountConfigPolicy', 'descr'),
+        'mounts.name': ('CimcvmediaConfigMountEntry', 'mapping_name'),
+        'mounts.device': ('CimcvmediaConfigMountEntry', 'device_type'),
+        'mounts.protocol': ('CimcvmediaConfigMountEntry', 'mount_protocol'),
+        'mounts.remote_ip': ('CimcvmediaConfigMountEntry', 'remote_ip_address'),
+        'mounts.file': ('CimcvmediaConfigMountEntry', 'image_file_name'),
+        'mounts.path': ('CimcvmediaConfigMountEntry', 'image_path'),
+    },
+    'ucs_vnic_template': {
+        'name': ('VnicLanConnTempl', 'name'),
+        'description': ('VnicLanConnTempl', 'descr'),
+        'mtu': ('VnicLanConnTempl', 'mtu'),
+        'mac_pool': ('VnicLanConnTempl', 'ident_pool_name'),
+        'qos_policy': ('VnicLanConnTempl', 'qos_policy_name'),
+        'network_control_policy': ('VnicLanConnTempl', 'nw_ctrl_policy_name'),
+        'peer_redundancy_template': ('VnicLanConnTempl', 'peer_redundancy_templ_name'),
+        'vlans_list.name': ('VnicEtherIf', 'name'),
+    },
+    'ucs_vsans': {
+        'vsan_list.name': ('FabricVsan', 'name'),
+        'vsan_list.vsan_id': ('FabricVsan', 'id'),
+        'vsan_list.vlan_id': ('FabricVsan', 'fcoe_vlan'),
+    },
+    'ucs_wwn_pool': {
+        'wwn_list.name': ('FcpoolInitiators', 'name'),
+        'wwn_list.descr': ('FcpoolInitiators', 'descr'),
+        'wwn_list.first_addr': ('FcpoolBlock', 'r_from'),
+        'wwn_list.last_addr': ('FcpoolBlock', 'to'),
+    },
+    'cisco_ucs_dns': {
+        'name': ('CommDnsProvider', 'name'),
+        'descr': ('CommDnsProvider', 'descr'),
+    },
+    'cisco_ucs_ntp': {
+        'name': ('CommNtpProvider', 'name'),
+        'descr': ('CommNtpProvider', 'descr'),
+    },
+    'cisco_ucs_server_pool': {
+        'pool.name': ('ComputePool', 'name'),
+        'pool.descr': ('ComputePool', 'descr'),
+    },
+}
+
+# class id -> ucsmsdk property metadata
+PROP_META = {}
+
+# role vars ship with placeholders like <ntp_server_ip> for values of the site
+PLACEHOLDER_RE = re.compile(r'^<[^<>]+>$')
+
+
+def prop_meta(class_id):
+    if class_id not in PROP_META:
+        from ucsmsdk import ucscoreutils
+
+        PROP_META[class_id] = ucscoreutils.load_class(class_id).prop_meta
+    return PROP_META[class_id]
+
+
+def in_range(value, range_val):
+    for bounds in range_val:
+        first, sep, last = bounds.partition('-')
+        if first.isdigit() and last.isdigit() and int(first) <= int(value) <= int(last):
+            return True
+    return False
+
+
+def valid_value(restriction, value):
+    # MoPropertyMeta.validate_property_value accepts anything once the length fits,
+    # here the length has to fit and the value has to be in one of the ranges, the value set or the pattern
+    if restriction.min_length and len(value) < restriction.min_length:
+        return False
+    if restriction.max_length and len(value) > restriction.max_length:
+        return False
+    if not (restriction.range_val or restriction.value_set or restriction.pattern):
+        return True
+    if restriction.range_val and value.isdigit() and in_range(value, restriction.range_val):
+        return True
+    if restriction.value_set and value in restriction.value_set:
+        return True
+    return bool(restriction.pattern) and re.match('^(%s)$' % restriction.pattern, value) is not None
+
+
+def describe_restriction(restriction):
+    allowed = []
+    if restriction.range_val:
+        allowed.append('in %s' % ', '.join(restriction.range_val))
+    if restriction.value_set:
+        allowed.append('one of %s' % ', '.join(restriction.value_set))
+    if restriction.pattern:
+        allowed.append('matching %s' % restriction.pattern)
+    description = ' or '.join(allowed)
+    if restriction.min_length or restriction.max_length:
+        length = '%s to %s characters long' % (restriction.min_length or 0, restriction.max_length or 'any')
+        description = '%s, %s' % (description, length) if description else length
+    return description
+
+
+def param_values(value, path):
+    # values of a dotted path, list arguments are followed into each of their dicts
+    if isinstance(value, list):
+        values = []
+        for item in value:
+            values.extend(param_values(item, path))
+        return values
+    if not path:
+        return [value]
+    if not isinstance(value, dict):
+        return []
+    return param_values(value.get(path[0]), path[1:])
+
+
+def placeholders(value):
+    """Returns the placeholders, e.g. <ntp_server_ip>, left in the arguments of a module."""
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        found = []
+        for item in value:
+            found.extend(placeholders(item))
+        return found
+    return [value] if isinstance(value, str) and PLACEHOLDER_RE.match(value) else []
+
+
+def validate_params(module_name, params):
+    """Returns the error messages of the arguments of module_name that ucsmsdk would reject.
+
+    Arguments that are not set, set to an empty string or to a placeholder
+    of the role vars are not checked.  Modules without MODULE_PROPS entry
+    are not checked.
+    """
+    errors = []
+    for param, (class_id, prop) in sorted(MODULE_PROPS.get(module_name, {}).items()):
+        path = param.split('.')
+        meta = prop_meta(class_id)[prop]
+        for value in param_values(params.get(path[0]), path[1:]):
+            if value is None or value == '' or isinstance(value, (dict, list)):
+                continue
+            if isinstance(value, str) and PLACEHOLDER_RE.match(value):
+                continue
+            if isinstance(value, bool):
+                value = 'yes' if value else 'no'
+            if not valid_value(meta.restriction, str(value)):
+                errors.append('%s=%s is not valid for %s.%s, it has to be %s' % (
+                    param, value, class_id, meta.xml_attribute, describe_restriction(meta.restriction)))
+    return errors
+
+
+def main():
+    from ansible.module_utils.remote_management.ucs_compiler import ROLES, UCSRoleRenderer
+
+    parser = argparse.ArgumentParser(description='Checks the module arguments of the ucsm-config roles against ucsmsdk.')
+    parser.add_argument('--roles', nargs='+', default=ROLES, help='roles to check')
+    parser.add_argument('--roles-dir', default='roles', help='directory with the roles')
+    parser.add_argument('--vars', action='append', default=[], help='YAML file with extra vars, e.g. host_vars')
+    args = parser.parse_args()
+
+    import yaml
+
+    extra_vars = {}
+    for path in args.vars:
+        with open(path) as f:
+            extra_vars.update(yaml.safe_load(f) or {})
+    renderer = UCSRoleRenderer(extra_vars)
+    tasks = errors = unset = 0
+    for role in args.roles:
+        for task_name, module_name, module_args in renderer.role_tasks(os.path.join(args.roles_dir, role)):
+            tasks += 1
+            for error in validate_params(module_name, module_args):
+                errors += 1
+                print('%s: %s (%s): %s' % (role, module_name, task_name, error), file=sys.stderr)
+            for placeholder in sorted(set(placeholders(module_args))):
+                unset += 1
+                print('%s: %s (%s): %s is not set' % (role, module_name, task_name, placeholder), file=sys.stderr)
+    print('%d module runs checked, %d invalid arguments, %d placeholders not set' % (tasks, errors, unset))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
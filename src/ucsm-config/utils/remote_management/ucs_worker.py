@@ -0,0 +1,286 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign whatever license you want.
+#
+# Copyright (c) 2018 Cisco Systems
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF
+# THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Long lived worker that runs UCS modules for thin module processes.
+
+Every module run normally pays for starting Python, importing ucsmsdk and
+logging in to UCS Manager.  The worker does that once: it listens on a Unix
+socket, keeps the modules and ucsmsdk imported and keeps the UCSM sessions of
+the modules it ran logged in.  A module started with worker=yes (ucs_worker=yes
+for the cisco_ucs modules) sends its arguments over the socket and exits with
+the result the worker sends back.
+
+Start it on the Ansible controller (or wherever the modules run) with
+
+    python -m ansible.module_utils.remote_management.ucs_worker --library <role library dir>
+
+The worker forks --workers processes that accept on the same socket, so that
+many modules can run at the same time; a process runs one module at a time
+because modules share module level state.  The worker exits after
+--idle-timeout seconds without a request.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import copy
+import gc
+import io
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+
+UCS_WORKER_TIMEOUT = 3600
+
+# requests and responses are a 4 byte length followed by a JSON document
+HEADER = struct.Struct('!I')
+
+
+def send_message(sock, message):
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    header = recv_exactly(sock, HEADER.size)
+    return json.loads(recv_exactly(sock, HEADER.unpack(header)[0]).decode('utf-8'))
+
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise IOError('connection closed by the UCS worker')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def worker_request(socket_path, request, timeout=UCS_WORKER_TIMEOUT):
+    """Sends a request to the worker listening on socket_path and returns its response."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(os.path.expanduser(socket_path))
+        send_message(sock, request)
+        return recv_message(sock)
+    finally:
+        sock.close()
+
+
+class UCSModuleRunner():
+    """Loads UCS modules from library directories and runs them in process."""
+
+    def __init__(self, library):
+        self.library = [os.path.abspath(os.path.expanduser(path)) for path in library]
+        self.modules = {}
+        self.argument_spec = None
+
+    def load_module(self, module_name):
+        if module_name not in self.modules:
+            for directory in self.library:
+                path = os.path.join(directory, module_name + '.py')
+                if os.path.isfile(path):
+                    break
+            else:
+                raise ValueError('module %s not found in %s' % (module_name, ', '.join(self.library)))
+            try:
+                import importlib.util
+                spec = importlib.util.spec_from_file_location('ucs_worker_' + module_name, path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+            except ImportError:
+                import imp
+                module = imp.load_source('ucs_worker_' + module_name, path)
+            self.modules[module_name] = module
+        return self.modules[module_name]
+
+    def run_module(self, module_name, args):
+        from ansible.module_utils import basic
+        from ansible.module_utils.remote_management import ucs
+
+        module = self.load_module(module_name)
+        if self.argument_spec is None:
+            self.argument_spec = copy.deepcopy(ucs.ucs_argument_spec)
+        # modules update the shared ucs_argument_spec, so it is restored before each run
+        ucs.ucs_argument_spec.clear()
+        ucs.ucs_argument_spec.update(copy.deepcopy(self.argument_spec))
+        # Ansible passes the module name, modules are validated by it
+        args = dict(args, _ansible_module_name=args.get('_ansible_module_name') or module_name)
+        basic._ANSIBLE_ARGS = json.dumps(dict(ANSIBLE_MODULE_ARGS=args)).encode('utf-8')
+        if hasattr(basic, '_ANSIBLE_PROFILE'):
+            basic._ANSIBLE_PROFILE = 'legacy'
+
+        stdout = sys.stdout
+        sys.stdout = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+        try:
+            module.main()
+        except SystemExit:
+            pass
+        finally:
+            output, sys.stdout = sys.stdout.getvalue(), stdout
+            basic._ANSIBLE_ARGS = None
+            # UCSModule hands its session back when it is collected
+            gc.collect()
+        try:
+            return json.loads(output.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            return dict(failed=True, msg='module %s did not return a result' % module_name, module_stdout=output)
+
+
+class UCSWorker():
+    """Prefork server running UCS modules in process."""
+
+    def __init__(self, socket_path, library, workers=4, idle_timeout=600):
+        self.socket_path = os.path.expanduser(socket_path)
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.sock = None
+        self.children = []
+        self.runner = UCSModuleRunner(library)
+
+    def listen(self):
+        directory = os.path.dirname(self.socket_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(self.socket_path):
+            self.remove_stale_socket()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # the socket hands out logged in UCSM sessions, only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(64)
+
+    def remove_stale_socket(self):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except (IOError, OSError):
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise IOError('a UCS worker is already listening on %s' % self.socket_path)
+
+    def serve(self):
+        # ucsmsdk is imported once, before the worker processes are forked, instead of once per module run
+        import ucsmsdk.ucshandle  # noqa: F401
+
+        self.listen()
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            for index in range(self.workers):
+                self.fork_child()
+            while self.children:
+                pid, status = os.wait()
+                if pid in self.children:
+                    self.children.remove(pid)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            for pid in self.children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            self.sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def fork_child(self):
+        pid = os.fork()
+        if pid:
+            self.children.append(pid)
+            return
+        status = 0
+        try:
+            self.child()
+        except BaseException:
+            status = 1
+        os._exit(status)
+
+    def child(self):
+        from ansible.module_utils.remote_management import ucs
+
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        ucs.ucs_warm_sessions = ucs.UCSWarmSessions()
+        # workers share the listening socket, a worker that loses the race for a connection goes back to select
+        self.sock.setblocking(False)
+        try:
+            while True:
+                readable = select.select([self.sock], [], [], self.idle_timeout)[0]
+                if not readable:
+                    break
+                try:
+                    conn = self.sock.accept()[0]
+                except (IOError, OSError):
+                    continue
+                conn.setblocking(True)
+                try:
+                    send_message(conn, self.handle(recv_message(conn)))
+                except (IOError, OSError, ValueError):
+                    pass
+                finally:
+                    conn.close()
+        finally:
+            ucs.ucs_warm_sessions.close()
+
+    def handle(self, request):
+        if request.get('ping'):
+            return dict(pid=os.getpid(), modules=sorted(self.runner.modules))
+        try:
+            return self.runner.run_module(request['module'], request['args'])
+        except Exception as e:
+            return dict(failed=True, msg='UCS worker error: %s' % e, exception=traceback.format_exc())
+
+
+def main():
+    from ansible.module_utils.remote_management.ucs import UCS_WORKER_SOCKET
+
+    parser = argparse.ArgumentParser(description='Runs UCS modules for modules started with worker=yes.')
+    parser.add_argument('--socket', default=UCS_WORKER_SOCKET, help='Unix socket to listen on')
+    parser.add_argument('--library', action='append', required=True, help='directory with the UCS modules')
+    parser.add_argument('--workers', type=int, default=4, help='number of modules that can run at the same time')
+    parser.add_argument('--idle-timeout', type=int, default=600, help='seconds without a request before exiting')
+    args = parser.parse_args()
+
+    start = time.time()
+    UCSWorker(args.socket, args.library, args.workers, args.idle_timeout).serve()
+    print('UCS worker on %s stopped after %d seconds' % (args.socket, time.time() - start))
+
+
+if __name__ == '__main__':
+    main()